@@ -1,38 +1,137 @@
+import time
+
+import click
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
 from app.config import Config
+from app.jwt_cache import CachedJWTManager
+from app.sharding import ShardedSQLAlchemy, configurar_binds, shards_cli
+
+# Início do pacote após Flask/click (o custo desses imports aparece no
+# benchmarks.import_profile, via -X importtime)
+_INICIO_IMPORT = time.perf_counter()
+
+db = ShardedSQLAlchemy()
+jwt = CachedJWTManager()
+
+
+def em_contexto_cli():
+    """
+    True quando o app é criado por um comando `flask ...`. `flask run` serve
+    o app: conta como servidor (aquecimento, recuperação de jobs, sem Migrate).
+    """
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.command.name != "run"
 
-db = SQLAlchemy()
-migrate = Migrate()
-jwt = JWTManager()
+
+def init_migrate(app):
+    """Flask-Migrate (e o Alembic) só são carregados para a CLI."""
+    from flask_migrate import Migrate
+
+    Migrate(app, db)
 
 
 def create_app(config_class=Config):
+    inicio = time.perf_counter()
+
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # JSON
+    from app.json_provider import init_json_provider
+
+    init_json_provider(app)
+
     # Remover trailing slash
     app.url_map.strict_slashes = False
 
+    # Backend de cache (antes das extensões que criam caches)
+    from app.cache_backends import init_cache, cache_cli
+
+    init_cache(app)
+    app.cli.add_command(cache_cli)
+
     # Inicializar extensões
+    configurar_binds(app)
     db.init_app(app)
-    migrate.init_app(app, db)
     jwt.init_app(app)
 
-    # CORS
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    cli = em_contexto_cli()
+    if cli:
+        init_migrate(app)
+
+    app.cli.add_command(shards_cli)
 
-    # Middleware CORS
+    # Profiling sob demanda (dentro do CORS: preflights não são perfilados)
+    from app.profiling import init_profiling, profiling_cli
+
+    init_profiling(app)
+    app.cli.add_command(profiling_cli)
+
+    # CORS, preflights e health checks (camada WSGI)
     from app.middleware import setup_cors_middleware
+    from app.routes.auth import PING_RESPOSTA
+
+    setup_cors_middleware(app, health_checks={"/api/auth/ping": PING_RESPOSTA})
+
+    # Pub/sub de alterações (listeners de sessão)
+    from app import eventos  # noqa: F401
 
-    setup_cors_middleware(app)
+    # Idempotency-Key
+    from app.idempotencia import init_idempotencia
+
+    init_idempotencia(app)
+
+    # Documento do dia (cache invalidado pelo barramento de eventos)
+    from app.dia import init_documento_dia
+
+    init_documento_dia(app)
+
+    # Jobs em segundo plano
+    from app.jobs import init_jobs
+
+    init_jobs(app)
+
+    # Escritor único com group commit (ESCRITOR_UNICO)
+    from app.escritor import init_escritor
+
+    init_escritor(app)
+
+    # Compressão de respostas
+    from app.compressao import init_compressao
+
+    init_compressao(app)
 
     # Registrar blueprints
     from app.routes import register_blueprints
 
     register_blueprints(app)
 
+    from app.arquivo import arquivo_cli
+    from app.importacao import import_history_cmd
+    from app.upsert import upsert_cli
+    from app.provisionamento import usuarios_cli
+
+    app.cli.add_command(arquivo_cli)
+    app.cli.add_command(import_history_cmd)
+    app.cli.add_command(upsert_cli)
+    app.cli.add_command(usuarios_cli)
+
+    # Startup
+    from app.startup import aquecer, medir_primeira_requisicao
+
+    app.extensions["startup"] = {
+        "create_app_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        "desde_import_ms": round((time.perf_counter() - _INICIO_IMPORT) * 1000, 2),
+    }
+
+    if not cli:
+        from app.jobs import recuperar_orfaos
+
+        recuperar_orfaos(app)
+
+    if app.config.get("WARMUP_ON_START") and not cli:
+        aquecer(app, db)
+
+    medir_primeira_requisicao(app, _INICIO_IMPORT)
+
     return app
@@ -0,0 +1,145 @@
+"""
+Aderência anual em bitmaps: um bit por dia para cada refeição padrão e para
+a atividade física.
+
+Cada (usuário, ano) tem uma linha em `aderencia_anual` com TRILHAS × 46
+bytes (366 bits): bit i = dia i do ano (0 = 1º de janeiro), byte i // 8,
+bit i % 8 (menos significativo primeiro). marcar_refeicao e
+registrar_atividade ligam/desligam o bit do dia na mesma transação; a
+leitura não varre RotinaAlimentar. A linha é (re)construída a partir das
+linhas quentes e do arquivo só quando ainda não existe — importações em
+lote apenas a descartam.
+
+Períodos fora de PERIODOS (nomes livres enviados ao /marcar) não entram no
+bitmap.
+"""
+
+import base64
+from datetime import date
+
+from app import db
+from app.arquivo import ler_arquivo
+from app.escritor import executar_escrita
+from app.models import AderenciaAnual, AtividadeFisica, RotinaAlimentar
+
+PERIODOS = ("Café da Manhã", "Almoço", "Lanche da Tarde", "Janta", "Ceia")
+ATIVIDADE = "atividade"
+TRILHAS = PERIODOS + (ATIVIDADE,)
+
+BYTES_POR_TRILHA = 46  # ceil(366 / 8)
+
+
+def _posicao(trilha, dia):
+    bit = dia.timetuple().tm_yday - 1
+    return TRILHAS.index(trilha) * BYTES_POR_TRILHA + bit // 8, 1 << (bit % 8)
+
+
+def _ligar(bits, trilha, dia, valor):
+    indice, mascara = _posicao(trilha, dia)
+    if valor:
+        bits[indice] |= mascara
+    else:
+        bits[indice] &= ~mascara & 0xFF
+
+
+def teve_atividade(km_percorridos, calorias_perdidas):
+    return bool(km_percorridos or calorias_perdidas)
+
+
+def reconstruir(user_id, ano):
+    """Monta o bitmap do ano a partir das linhas quentes e arquivadas."""
+    user_id = int(user_id)
+    inicio, fim = date(ano, 1, 1), date(ano + 1, 1, 1)
+    bits = bytearray(BYTES_POR_TRILHA * len(TRILHAS))
+
+    refeicoes = db.session.query(RotinaAlimentar.data, RotinaAlimentar.periodo).filter(
+        RotinaAlimentar.user_id == user_id,
+        RotinaAlimentar.concluido.is_(True),
+        RotinaAlimentar.data >= inicio,
+        RotinaAlimentar.data < fim,
+    )
+    for dia, periodo in refeicoes:
+        if periodo in PERIODOS:
+            _ligar(bits, periodo, dia, True)
+
+    atividades = db.session.query(
+        AtividadeFisica.data, AtividadeFisica.km_percorridos, AtividadeFisica.calorias_perdidas
+    ).filter(
+        AtividadeFisica.user_id == user_id,
+        AtividadeFisica.data >= inicio,
+        AtividadeFisica.data < fim,
+    )
+    for dia, km, calorias in atividades:
+        if teve_atividade(km, calorias):
+            _ligar(bits, ATIVIDADE, dia, True)
+
+    # Camada fria: linhas antigas saíram das tabelas quentes
+    inicio_iso = inicio.isoformat()
+    for linha in ler_arquivo(user_id, RotinaAlimentar.__tablename__, antes=fim):
+        if linha["data"] < inicio_iso:
+            break
+        if linha.get("concluido") and linha.get("periodo") in PERIODOS:
+            _ligar(bits, linha["periodo"], date.fromisoformat(linha["data"]), True)
+    for linha in ler_arquivo(user_id, AtividadeFisica.__tablename__, antes=fim):
+        if linha["data"] < inicio_iso:
+            break
+        if teve_atividade(linha.get("km_percorridos"), linha.get("calorias_perdidas")):
+            _ligar(bits, ATIVIDADE, date.fromisoformat(linha["data"]), True)
+
+    registro = db.session.get(AderenciaAnual, (user_id, ano))
+    if registro is None:
+        registro = AderenciaAnual(user_id=user_id, ano=ano, bits=bytes(bits))
+        db.session.add(registro)
+    else:
+        registro.bits = bytes(bits)
+    return registro
+
+
+def marcar(user_id, dia, trilha, valor):
+    """
+    Liga/desliga o bit do dia. Chamar depois da escrita da linha e antes do
+    commit: no SQLite a transação já detém o lock de escrita, então o
+    read-modify-write do blob não perde atualizações concorrentes.
+    Sem linha para o ano, não faz nada (a leitura reconstrói).
+    """
+    if trilha not in TRILHAS:
+        return
+    registro = db.session.get(AderenciaAnual, (int(user_id), dia.year), with_for_update=True)
+    if registro is None:
+        return
+    bits = bytearray(registro.bits)
+    _ligar(bits, trilha, dia, valor)
+    registro.bits = bytes(bits)
+
+
+def invalidar(user_id):
+    """Descarta os bitmaps (ex.: após importação em lote); reconstruídos na leitura."""
+    AderenciaAnual.query.filter_by(user_id=int(user_id)).delete()
+
+
+def obter(user_id, ano):
+    registro = db.session.get(AderenciaAnual, (int(user_id), ano))
+    if registro is None:
+        # Reconstrução é escrita: vai pelo escritor e é relida nesta sessão
+        executar_escrita(user_id, lambda: reconstruir(user_id, ano))
+        registro = db.session.get(AderenciaAnual, (int(user_id), ano))
+    return registro
+
+
+def para_dict(registro):
+    """Trilhas em base64 (46 bytes cada) e total de dias marcados por trilha."""
+    trilhas = {}
+    totais = {}
+    for n, trilha in enumerate(TRILHAS):
+        fatia = registro.bits[n * BYTES_POR_TRILHA:(n + 1) * BYTES_POR_TRILHA]
+        trilhas[trilha] = base64.b64encode(fatia).decode()
+        totais[trilha] = int.from_bytes(fatia, "little").bit_count()
+
+    ano = registro.ano
+    return {
+        "ano": ano,
+        "dias": (date(ano + 1, 1, 1) - date(ano, 1, 1)).days,
+        "codificacao": "base64, bit i = dia i do ano (LSB primeiro)",
+        "trilhas": trilhas,
+        "totais": totais,
+    }
@@ -0,0 +1,52 @@
+"""
+Autenticação das rotas administrativas.
+
+Sem JWT de usuário: o header X-Admin-Token é comparado em tempo constante
+com ADMIN_TOKEN. Se ADMIN_TOKEN não estiver configurado, as rotas admin
+respondem 404 (desabilitadas).
+
+`assinar`/`assinatura_valida` usam o mesmo segredo (HMAC-SHA256) para
+valores que podem ser entregues a terceiros sem expor o token, como o
+header de profiling.
+"""
+
+import hashlib
+import hmac
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+HEADER = "X-Admin-Token"
+
+
+def token_admin_valido(valor):
+    esperado = current_app.config.get("ADMIN_TOKEN")
+    if not esperado or not valor:
+        return False
+    return hmac.compare_digest(valor.encode(), esperado.encode())
+
+
+def assinar(mensagem, segredo=None):
+    segredo = segredo or current_app.config.get("ADMIN_TOKEN")
+    if not segredo:
+        raise RuntimeError("ADMIN_TOKEN não configurado.")
+    return hmac.new(segredo.encode(), mensagem.encode(), hashlib.sha256).hexdigest()
+
+
+def assinatura_valida(mensagem, assinatura, segredo=None):
+    segredo = segredo or current_app.config.get("ADMIN_TOKEN")
+    if not segredo or not assinatura:
+        return False
+    return hmac.compare_digest(assinar(mensagem, segredo), assinatura)
+
+
+def admin_obrigatorio(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get("ADMIN_TOKEN"):
+            return jsonify({"error": "Não encontrado."}), 404
+        if not token_admin_valido(request.headers.get(HEADER)):
+            return jsonify({"error": "Token de administrador inválido."}), 401
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,192 @@
+"""
+Camada fria das tabelas diárias.
+
+Linhas de RotinaAlimentar, AtividadeFisica e CaloriasExtras mais antigas que
+o horizonte (ARQUIVO_HORIZONTE_DIAS) são movidas para `arquivo_diario`, um
+registro por (usuário, tabela, mês) com as linhas em JSON comprimido.
+ConsumoCalorico (os rollups diários) e MetaPeso permanecem na camada quente.
+
+Os históricos leem o arquivo de forma transparente quando o cursor passa do
+horizonte (ver `ler_arquivo`).
+"""
+
+import json
+import zlib
+from datetime import date, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app import db
+from app.models import (
+    User,
+    RotinaAlimentar,
+    AtividadeFisica,
+    CaloriasExtras,
+    ArquivoDiario,
+)
+from app.sharding import shard_do_usuario
+
+TABELAS_ARQUIVAVEIS = {
+    RotinaAlimentar.__tablename__: RotinaAlimentar,
+    AtividadeFisica.__tablename__: AtividadeFisica,
+    CaloriasExtras.__tablename__: CaloriasExtras,
+}
+
+
+# ---------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------
+def horizonte(dias=None):
+    """Primeiro dia que ainda fica na camada quente."""
+    dias = dias if dias is not None else current_app.config["ARQUIVO_HORIZONTE_DIAS"]
+    return date.today() - timedelta(days=dias)
+
+
+def inicio_mes(d):
+    return d.replace(day=1)
+
+
+def linha_para_dict(modelo, obj):
+    linha = {}
+    for coluna in modelo.__table__.c:
+        if coluna.key == "user_id":
+            continue
+        valor = getattr(obj, coluna.key)
+        linha[coluna.key] = valor.isoformat() if isinstance(valor, date) else valor
+    return linha
+
+
+def comprimir(linhas):
+    return zlib.compress(json.dumps(linhas, separators=(",", ":")).encode(), 9)
+
+
+def descomprimir(payload):
+    return json.loads(zlib.decompress(payload))
+
+
+# ---------------------------------------------------------
+# Arquivamento
+# ---------------------------------------------------------
+def arquivar_usuario(user_id, ate):
+    """
+    Move para o arquivo as linhas do usuário com data < `ate`.
+    Retorna {tabela: linhas_movidas}. Uma transação por usuário.
+    """
+    movidas = {}
+
+    with shard_do_usuario(user_id):
+        for nome, modelo in TABELAS_ARQUIVAVEIS.items():
+            antigas = (
+                modelo.query.filter(modelo.user_id == user_id, modelo.data < ate)
+                .order_by(modelo.data.asc(), modelo.id.asc())
+                .all()
+            )
+            if not antigas:
+                continue
+
+            por_mes = {}
+            for obj in antigas:
+                por_mes.setdefault(inicio_mes(obj.data), []).append(
+                    linha_para_dict(modelo, obj)
+                )
+
+            for mes, linhas in por_mes.items():
+                arquivo = ArquivoDiario.query.filter_by(
+                    user_id=user_id, tabela=nome, mes=mes
+                ).first()
+
+                if arquivo:
+                    # Mescla com o que já foi arquivado
+                    existentes = {(linha["data"], linha["id"]): linha for linha in descomprimir(arquivo.payload)}
+                    existentes.update({(linha["data"], linha["id"]): linha for linha in linhas})
+                    linhas = sorted(existentes.values(), key=lambda linha: (linha["data"], linha["id"]))
+                    arquivo.payload = comprimir(linhas)
+                    arquivo.linhas = len(linhas)
+                else:
+                    db.session.add(
+                        ArquivoDiario(
+                            user_id=user_id,
+                            tabela=nome,
+                            mes=mes,
+                            linhas=len(linhas),
+                            payload=comprimir(linhas),
+                        )
+                    )
+
+            for obj in antigas:
+                db.session.delete(obj)
+            movidas[nome] = len(antigas)
+
+        db.session.commit()
+
+    return movidas
+
+
+# ---------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------
+def ler_arquivo(user_id, tabela, antes=None, limite=None):
+    """
+    Linhas arquivadas (mais recentes primeiro) com data < `antes`.
+    Descomprime só os meses necessários para preencher `limite`.
+    """
+    with shard_do_usuario(user_id):
+        query = ArquivoDiario.query.filter_by(user_id=user_id, tabela=tabela)
+        if antes is not None:
+            query = query.filter(ArquivoDiario.mes <= inicio_mes(antes))
+        meses = query.order_by(ArquivoDiario.mes.desc()).all()
+
+    antes_iso = antes.isoformat() if antes is not None else None
+    resultado = []
+    for arquivo in meses:
+        linhas = descomprimir(arquivo.payload)
+        linhas.sort(key=lambda linha: (linha["data"], linha["id"]), reverse=True)
+        for linha in linhas:
+            if antes_iso is None or linha["data"] < antes_iso:
+                resultado.append(linha)
+                if limite is not None and len(resultado) >= limite:
+                    return resultado
+    return resultado
+
+
+# ---------------------------------------------------------
+# CLI: flask arquivo ...
+# ---------------------------------------------------------
+@click.group("arquivo")
+def arquivo_cli():
+    """Camada fria: arquivamento de linhas diárias antigas."""
+
+
+@arquivo_cli.command("executar")
+@click.option("--horizonte-dias", type=int, default=None, help="Padrão: ARQUIVO_HORIZONTE_DIAS")
+@with_appcontext
+def executar_cmd(horizonte_dias):
+    """Arquiva as linhas anteriores ao horizonte para todos os usuários."""
+    ate = horizonte(horizonte_dias)
+    totais = {}
+
+    user_ids = db.session.scalars(db.select(User.id)).all()
+    for uid in user_ids:
+        for tabela, n in arquivar_usuario(uid, ate).items():
+            totais[tabela] = totais.get(tabela, 0) + n
+
+    click.echo(f"Horizonte: {ate.isoformat()} ({len(user_ids)} usuários)")
+    for tabela in TABELAS_ARQUIVAVEIS:
+        click.echo(f"  {tabela}: {totais.get(tabela, 0)} linhas arquivadas")
+
+
+@arquivo_cli.command("status")
+@click.argument("user_id", type=int)
+@with_appcontext
+def status_cmd(user_id):
+    """Meses arquivados de um usuário."""
+    with shard_do_usuario(user_id):
+        arquivos = (
+            ArquivoDiario.query.filter_by(user_id=user_id)
+            .order_by(ArquivoDiario.tabela, ArquivoDiario.mes)
+            .all()
+        )
+        for a in arquivos:
+            click.echo(f"{a.tabela} {a.mes:%Y-%m}: {a.linhas} linhas, {len(a.payload)} bytes")
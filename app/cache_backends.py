@@ -0,0 +1,495 @@
+"""
+Backends plugáveis para os caches do app (CACHE_BACKEND).
+
+    local   LRUCache em memória (padrão; um processo)
+    sqlite  arquivo SQLite compartilhado pelos workers do mesmo host
+            (CACHE_SQLITE_PATH)
+    redis   servidor Redis (CACHE_REDIS_URL), via cliente RESP próprio;
+            `flask cache servidor-local` sobe um substituto para dev/testes
+
+Todos expõem a interface do LRUCache: get/set/delete/clear/stats.
+
+    criar_cache(app, nome, maxsize, ttl, compartilhado=False)
+
+Só caches `compartilhado=True` usam o backend configurado (respostas de
+Idempotency-Key e versões do perfil). Os demais continuam locais — objetos
+grandes ou quentes demais para serializar a cada acesso (documento do dia,
+diretório de shards) — e recebem invalidações dos outros workers:
+
+    ao_invalidar(app, "documento_dia", funcao)     # registra o handler
+    publicar_invalidacao("documento_dia", *args)   # chama nos outros workers
+
+No backend sqlite a difusão é uma tabela consultada a cada
+CACHE_INVALIDACAO_POLL_SEGUNDOS; no redis, PUBLISH/SUBSCRIBE. No local não há
+outros workers. Valores são serializados com pickle: o arquivo e o servidor
+devem ser acessíveis só pelo app.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+
+from app.cache import LRUCache
+from app.jwt_cache import jwt_cache_stats
+from app.resp import ClienteRESP, ErroRESP, ServidorRESPLocal
+
+BACKENDS = ("local", "sqlite", "redis")
+
+# Ao atingir o limite, o SQLite remove as entradas mais antigas nesta fração
+_FRACAO_PODA = 0.1
+
+
+def _chave_bytes(chave):
+    return hashlib.blake2b(repr(chave).encode(), digest_size=16).digest()
+
+
+# ---------------------------------------------------------
+# SQLite (um host)
+# ---------------------------------------------------------
+class ConexoesSQLite:
+    """Uma conexão por thread (e por processo, para sobreviver a fork)."""
+
+    ESQUEMA = (
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " nome TEXT NOT NULL, chave BLOB NOT NULL, valor BLOB NOT NULL,"
+        " expira REAL, gravado REAL NOT NULL, PRIMARY KEY (nome, chave)"
+        ") WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS ix_cache_gravado ON cache (nome, gravado)",
+        "CREATE TABLE IF NOT EXISTS cache_invalidacoes ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, criado REAL NOT NULL,"
+        " mensagem TEXT NOT NULL)",
+    )
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with self._abrir() as conn:
+            for ddl in self.ESQUEMA:
+                conn.execute(ddl)
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    def conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._abrir()
+            self._local.pid = os.getpid()
+        return conn
+
+
+class SQLiteCache:
+    def __init__(self, conexoes, nome, maxsize=1024, ttl=None):
+        self.conexoes = conexoes
+        self.nome = nome
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._escritas = 0
+
+    def get(self, chave, default=None):
+        linha = self.conexoes.conexao().execute(
+            "SELECT valor, expira FROM cache WHERE nome = ? AND chave = ?",
+            (self.nome, _chave_bytes(chave)),
+        ).fetchone()
+        if linha is None or (linha[1] is not None and linha[1] <= time.time()):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(linha[0])
+
+    def set(self, chave, valor, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        agora = time.time()
+        self.conexoes.conexao().execute(
+            "INSERT OR REPLACE INTO cache (nome, chave, valor, expira, gravado)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (
+                self.nome,
+                _chave_bytes(chave),
+                pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL),
+                agora + ttl if ttl else None,
+                agora,
+            ),
+        )
+        self._escritas += 1
+        if self._escritas % max(1, int(self.maxsize * _FRACAO_PODA)) == 0:
+            self._podar(agora)
+
+    def _podar(self, agora):
+        conn = self.conexoes.conexao()
+        conn.execute(
+            "DELETE FROM cache WHERE nome = ? AND expira <= ?", (self.nome, agora)
+        )
+        excesso = self._tamanho() - self.maxsize
+        if excesso > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE nome = ? AND chave IN ("
+                " SELECT chave FROM cache WHERE nome = ? ORDER BY gravado LIMIT ?)",
+                (self.nome, self.nome, excesso),
+            )
+            self.evictions += excesso
+
+    def _tamanho(self):
+        return self.conexoes.conexao().execute(
+            "SELECT COUNT(*) FROM cache WHERE nome = ?", (self.nome,)
+        ).fetchone()[0]
+
+    def delete(self, chave):
+        self.conexoes.conexao().execute(
+            "DELETE FROM cache WHERE nome = ? AND chave = ?",
+            (self.nome, _chave_bytes(chave)),
+        )
+
+    def clear(self):
+        self.conexoes.conexao().execute("DELETE FROM cache WHERE nome = ?", (self.nome,))
+
+    def __len__(self):
+        return self._tamanho()
+
+    def stats(self):
+        return {
+            "backend": "sqlite",
+            "tamanho": self._tamanho(),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# ---------------------------------------------------------
+# Redis
+# ---------------------------------------------------------
+class RedisCache:
+    """
+    Falhas de conexão viram miss (get) ou são ignoradas (set/delete): o
+    cache fora do ar não derruba as rotas. O limite de tamanho fica com a
+    política de memória do servidor (maxsize é só informativo).
+    """
+
+    FALHAS = (ConnectionError, OSError, ErroRESP)
+
+    def __init__(self, cliente, prefixo, nome, maxsize=1024, ttl=None):
+        self.cliente = cliente
+        self.prefixo = f"{prefixo}:{nome}:"
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.erros = 0
+
+    def _chave(self, chave):
+        return self.prefixo + _chave_bytes(chave).hex()
+
+    def get(self, chave, default=None):
+        try:
+            dados = self.cliente.get(self._chave(chave))
+        except self.FALHAS:
+            self.erros += 1
+            dados = None
+        if dados is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(dados)
+
+    def set(self, chave, valor, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        try:
+            self.cliente.set(
+                self._chave(chave),
+                pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL),
+                px=int(ttl * 1000) if ttl else None,
+            )
+        except self.FALHAS:
+            self.erros += 1
+
+    def delete(self, chave):
+        try:
+            self.cliente.delete(self._chave(chave))
+        except self.FALHAS:
+            self.erros += 1
+
+    def clear(self):
+        try:
+            self.cliente.delete(*self.cliente.keys(self.prefixo + "*"))
+        except self.FALHAS:
+            self.erros += 1
+
+    def __len__(self):
+        try:
+            return len(self.cliente.keys(self.prefixo + "*"))
+        except self.FALHAS:
+            return 0
+
+    def stats(self):
+        return {
+            "backend": "redis",
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "erros": self.erros,
+        }
+
+
+# ---------------------------------------------------------
+# Difusão de invalidações entre workers
+# ---------------------------------------------------------
+class Difusor:
+    """
+    Base (backend local): só um processo, nada a difundir.
+
+    As mensagens levam a origem (pid + id aleatório) para cada processo
+    ignorar as próprias. O ouvinte é uma thread daemon iniciada no primeiro
+    request de cada processo, depois de um eventual fork do servidor.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self._pid = None
+        self._origem = None
+        self._lock = threading.Lock()
+
+    @property
+    def origem(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._origem = f"{self._pid}-{uuid.uuid4().hex[:8]}"
+        return self._origem
+
+    def registrar(self, nome, funcao):
+        self.handlers[nome] = funcao
+
+    def publicar(self, nome, args):
+        pass
+
+    def garantir_ouvinte(self):
+        pass
+
+    def _aplicar(self, bruto):
+        try:
+            mensagem = json.loads(bruto)
+            if mensagem["o"] == self.origem:
+                return
+            funcao = self.handlers.get(mensagem["n"])
+            if funcao is not None:
+                funcao(*mensagem["a"])
+        except Exception:
+            # Mensagem inválida não derruba o ouvinte
+            pass
+
+    def _codificar(self, nome, args):
+        return json.dumps({"o": self.origem, "n": nome, "a": list(args)}, default=str)
+
+
+class DifusorSQLite(Difusor):
+    # Mensagens mais velhas que isso já foram lidas por todos os workers
+    RETENCAO_SEGUNDOS = 300
+
+    def __init__(self, conexoes, intervalo):
+        super().__init__()
+        self.conexoes = conexoes
+        self.intervalo = intervalo
+        self._ouvinte_pid = None
+
+    def publicar(self, nome, args):
+        self.conexoes.conexao().execute(
+            "INSERT INTO cache_invalidacoes (criado, mensagem) VALUES (?, ?)",
+            (time.time(), self._codificar(nome, args)),
+        )
+
+    def garantir_ouvinte(self):
+        if self._ouvinte_pid == os.getpid():
+            return
+        with self._lock:
+            if self._ouvinte_pid == os.getpid():
+                return
+            self._ouvinte_pid = os.getpid()
+            ultimo = self.conexoes.conexao().execute(
+                "SELECT COALESCE(MAX(id), 0) FROM cache_invalidacoes"
+            ).fetchone()[0]
+            threading.Thread(
+                target=self._consultar, args=(ultimo,), daemon=True,
+                name="cache-invalidacoes",
+            ).start()
+
+    def _consultar(self, ultimo):
+        rodadas = 0
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                conn = self.conexoes.conexao()
+                for ultimo, bruto in conn.execute(
+                    "SELECT id, mensagem FROM cache_invalidacoes WHERE id > ? ORDER BY id",
+                    (ultimo,),
+                ).fetchall():
+                    self._aplicar(bruto)
+
+                rodadas += 1
+                if rodadas % 100 == 0:
+                    conn.execute(
+                        "DELETE FROM cache_invalidacoes WHERE criado < ?",
+                        (time.time() - self.RETENCAO_SEGUNDOS,),
+                    )
+            except sqlite3.Error:
+                continue
+
+
+class DifusorRedis(Difusor):
+    def __init__(self, cliente, canal):
+        super().__init__()
+        self.cliente = cliente
+        self.canal = canal
+        self._ouvinte_pid = None
+
+    def publicar(self, nome, args):
+        try:
+            self.cliente.publish(self.canal, self._codificar(nome, args))
+        except RedisCache.FALHAS:
+            pass
+
+    def garantir_ouvinte(self):
+        if self._ouvinte_pid == os.getpid():
+            return
+        with self._lock:
+            if self._ouvinte_pid == os.getpid():
+                return
+            self._ouvinte_pid = os.getpid()
+            threading.Thread(
+                target=self.cliente.assinar,
+                args=(self.canal, self._aplicar, threading.Event()),
+                daemon=True,
+                name="cache-invalidacoes",
+            ).start()
+
+
+# ---------------------------------------------------------
+# Inicialização e fábrica
+# ---------------------------------------------------------
+def _varios_workers():
+    """Melhor palpite: WEB_CONCURRENCY > 1 ou servidor prefork carregado."""
+    try:
+        if int(os.environ.get("WEB_CONCURRENCY") or 1) > 1:
+            return True
+    except ValueError:
+        pass
+    return "gunicorn.arbiter" in sys.modules or "uwsgi" in sys.modules
+
+
+def init_cache(app):
+    """Chamar antes das extensões que criam caches (configurar_binds etc.)."""
+    backend = app.config["CACHE_BACKEND"]
+    if backend not in BACKENDS:
+        raise RuntimeError(f"CACHE_BACKEND inválido: {backend!r} (use {', '.join(BACKENDS)}).")
+
+    estado = {"backend": backend, "caches": {}}
+    if backend == "sqlite":
+        # Caminho relativo fica na pasta instance/, como os bancos SQLite
+        caminho = os.path.join(app.instance_path, app.config["CACHE_SQLITE_PATH"])
+        estado["conexoes"] = ConexoesSQLite(caminho)
+        estado["difusor"] = DifusorSQLite(
+            estado["conexoes"], app.config["CACHE_INVALIDACAO_POLL_SEGUNDOS"]
+        )
+    elif backend == "redis":
+        estado["cliente"] = ClienteRESP(app.config["CACHE_REDIS_URL"])
+        estado["difusor"] = DifusorRedis(
+            estado["cliente"], f"{app.config['CACHE_PREFIXO']}:invalidacoes"
+        )
+    else:
+        estado["difusor"] = Difusor()
+        if _varios_workers():
+            app.logger.warning(
+                "CACHE_BACKEND=local com servidor de vários workers: invalidações não "
+                "chegam aos outros processos (documento do dia pode ficar até "
+                "DOCUMENTO_DIA_TTL_SEGUNDOS defasado). Use CACHE_BACKEND=sqlite ou redis."
+            )
+
+    app.extensions["cache"] = estado
+    app.before_request(estado["difusor"].garantir_ouvinte)
+
+
+def criar_cache(app, nome, maxsize, ttl=None, compartilhado=False):
+    estado = app.extensions["cache"]
+    backend = estado["backend"] if compartilhado else "local"
+
+    if backend == "sqlite":
+        cache = SQLiteCache(estado["conexoes"], nome, maxsize=maxsize, ttl=ttl)
+    elif backend == "redis":
+        cache = RedisCache(
+            estado["cliente"], app.config["CACHE_PREFIXO"], nome, maxsize=maxsize, ttl=ttl
+        )
+    else:
+        cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    estado["caches"][nome] = cache
+    return cache
+
+
+def ao_invalidar(app, nome, funcao):
+    """funcao(*args) roda na thread do ouvinte, sem contexto de app."""
+    app.extensions["cache"]["difusor"].registrar(nome, funcao)
+
+
+def publicar_invalidacao(nome, *args):
+    """Repete a invalidação nos outros workers (args serializáveis em JSON)."""
+    if not has_app_context():
+        return
+    estado = current_app.extensions.get("cache")
+    if estado is not None:
+        estado["difusor"].publicar(nome, args)
+
+
+# ---------------------------------------------------------
+# CLI: flask cache ...
+# ---------------------------------------------------------
+@click.group("cache")
+def cache_cli():
+    """Backend de cache e servidor RESP local."""
+
+
+@cache_cli.command("servidor-local")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--porta", default=6390, show_default=True, type=int)
+def servidor_local_cmd(host, porta):
+    """Substituto do Redis em memória (só para dev/testes)."""
+    servidor = ServidorRESPLocal(host, porta)
+    click.echo(f"Servidor RESP local em {servidor.url} (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+@cache_cli.command("status")
+@with_appcontext
+def status_cmd():
+    """Backend configurado e estatísticas dos caches deste processo."""
+    estado = current_app.extensions["cache"]
+    click.echo(f"Backend: {estado['backend']}")
+    if estado["backend"] == "redis":
+        try:
+            click.echo(f"Redis: {estado['cliente'].comando('PING')}")
+        except RedisCache.FALHAS as e:
+            raise click.ClickException(f"Redis indisponível: {e}")
+    for nome, cache in estado["caches"].items():
+        click.echo(f"  {nome}: {cache.stats()}")
+    click.echo(f"  jwt: {jwt_cache_stats(current_app) or 'desativado'}")
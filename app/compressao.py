@@ -0,0 +1,81 @@
+"""
+Compressão de respostas JSON (gzip, e brotli quando instalado).
+
+Negociada via Accept-Encoding e aplicada só acima de COMPRESS_MIN_SIZE.
+Cada corpo recebe um ETag; o corpo comprimido fica em cache por
+(ETag, encoding), então polls repetidos não recomprimem e podem receber 304.
+"""
+
+import gzip
+import hashlib
+
+from flask import request
+
+from app.cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # dependência opcional
+    brotli = None
+
+
+def escolher_encoding():
+    aceitos = request.accept_encodings
+    if brotli is not None and aceitos.quality("br") > 0:
+        return "br"
+    if aceitos.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def comprimir(corpo, encoding, nivel):
+    if encoding == "br":
+        return brotli.compress(corpo, quality=min(nivel, 11))
+    return gzip.compress(corpo, compresslevel=nivel, mtime=0)
+
+
+def init_compressao(app):
+    cache = LRUCache(maxsize=app.config.get("COMPRESS_CACHE_SIZE", 256))
+    app.extensions["compressao"] = cache
+
+    @app.after_request
+    def comprimir_resposta(response):
+        if (
+            request.method not in ("GET", "HEAD")
+            or response.status_code != 200
+            or response.is_streamed
+            or response.direct_passthrough
+            or response.mimetype not in app.config["COMPRESS_MIMETYPES"]
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        corpo = response.get_data()
+        etag = hashlib.sha1(corpo).hexdigest()
+
+        response.vary.add("Accept-Encoding")
+
+        encoding = None
+        if len(corpo) >= app.config["COMPRESS_MIN_SIZE"]:
+            encoding = escolher_encoding()
+
+        # ETag por representação: o corpo comprimido tem tag própria
+        tag = f"{etag}-{encoding}" if encoding else etag
+        response.set_etag(tag)
+
+        if request.if_none_match.contains(tag):
+            response.status_code = 304
+            response.set_data(b"")
+            return response
+
+        if encoding is None:
+            return response
+
+        comprimido = cache.get((etag, encoding))
+        if comprimido is None:
+            comprimido = comprimir(corpo, encoding, app.config["COMPRESS_LEVEL"])
+            cache.set((etag, encoding), comprimido)
+
+        response.set_data(comprimido)
+        response.headers["Content-Encoding"] = encoding
+        return response
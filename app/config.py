@@ -2,12 +2,96 @@ import os
 from datetime import timedelta
 from dotenv import load_dotenv
 
-load_dotenv()
+# Em produção as variáveis vêm do ambiente; FLASK_SKIP_DOTENV=1 evita ler o .env
+if os.environ.get('FLASK_SKIP_DOTENV') != '1':
+    load_dotenv()
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'chave-super-secreta-mude-isso'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-chave-secreta-mude-isso'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///alfredo_fitness.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Sharding das tabelas por usuário (1 = desativado)
+    SHARD_COUNT = int(os.environ.get('SHARD_COUNT') or 1)
+    SHARD_URI_TEMPLATE = os.environ.get('SHARD_URI_TEMPLATE') or 'sqlite:///alfredo_fitness_shard{n}.db'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
-    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
\ No newline at end of file
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Tokens já verificados mantidos em LRU (0 desativa)
+    JWT_DECODE_CACHE_SIZE = int(os.environ.get('JWT_DECODE_CACHE_SIZE') or 4096)
+
+    # Startup: abre conexões e compila as queries mais usadas antes da 1ª requisição
+    WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '1') == '1'
+    WARMUP_POOL_CONNECTIONS = int(os.environ.get('WARMUP_POOL_CONNECTIONS') or 2)
+
+    # Serialização JSON: "auto" (orjson se instalado), "orjson" ou "default"
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'auto'
+
+    # Compressão de respostas JSON (gzip/brotli) acima do limite em bytes
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)
+    COMPRESS_CACHE_SIZE = int(os.environ.get('COMPRESS_CACHE_SIZE') or 256)
+    COMPRESS_MIMETYPES = ('application/json',)
+
+    # Camada fria: linhas diárias mais antigas que o horizonte vão para o arquivo
+    ARQUIVO_HORIZONTE_DIAS = int(os.environ.get('ARQUIVO_HORIZONTE_DIAS') or 365)
+
+    # Tendência de peso: tamanho da janela da média móvel (nº de registros)
+    TENDENCIA_JANELA = int(os.environ.get('TENDENCIA_JANELA') or 7)
+
+    # Eventos / SSE do dashboard
+    EVENTOS_CROSS_WORKER = os.environ.get('EVENTOS_CROSS_WORKER') == '1'
+    EVENTOS_POLL_SEGUNDOS = float(os.environ.get('EVENTOS_POLL_SEGUNDOS') or 1.0)
+    EVENTOS_HEARTBEAT_SEGUNDOS = float(os.environ.get('EVENTOS_HEARTBEAT_SEGUNDOS') or 15)
+    EVENTOS_STREAM_MAX_SEGUNDOS = float(os.environ.get('EVENTOS_STREAM_MAX_SEGUNDOS') or 300)
+
+    # Idempotency-Key nos POSTs: respostas guardadas por até TTL segundos
+    IDEMPOTENCIA_TTL_SEGUNDOS = int(os.environ.get('IDEMPOTENCIA_TTL_SEGUNDOS') or 86400)
+    IDEMPOTENCIA_MAX_CHAVES = int(os.environ.get('IDEMPOTENCIA_MAX_CHAVES') or 10000)
+    IDEMPOTENCIA_ESPERA_SEGUNDOS = float(os.environ.get('IDEMPOTENCIA_ESPERA_SEGUNDOS') or 10)
+
+    # Jobs em segundo plano: workers do pool e limite de jobs na fila
+    JOBS_MAX_WORKERS = int(os.environ.get('JOBS_MAX_WORKERS') or 2)
+    JOBS_MAX_PENDENTES = int(os.environ.get('JOBS_MAX_PENDENTES') or 100)
+    JOBS_MAX_DIAS_INTERVALO = int(os.environ.get('JOBS_MAX_DIAS_INTERVALO') or 366)
+    # Heartbeat dos jobs do processo; sem heartbeat por 3 intervalos o job vira erro
+    JOBS_HEARTBEAT_SEGUNDOS = float(os.environ.get('JOBS_HEARTBEAT_SEGUNDOS') or 10)
+
+    # Rotas admin (X-Admin-Token); vazio desabilita
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or None
+
+    # Provisionamento em lote: usuários por transação e threads de hash (0 = nº de CPUs)
+    PROVISIONAMENTO_CHUNK = int(os.environ.get('PROVISIONAMENTO_CHUNK') or 500)
+    PROVISIONAMENTO_HASH_WORKERS = int(os.environ.get('PROVISIONAMENTO_HASH_WORKERS') or 0)
+    PROVISIONAMENTO_MAX_REGISTROS = int(os.environ.get('PROVISIONAMENTO_MAX_REGISTROS') or 5000)
+
+    # Snapshot do perfil (altura, idade, profissão, peso) nas claims do access token
+    PERFIL_NO_TOKEN = os.environ.get('PERFIL_NO_TOKEN') == '1'
+    PERFIL_VERSAO_CACHE_TTL = float(os.environ.get('PERFIL_VERSAO_CACHE_TTL') or 5)
+
+    # Documento do dia (dados do usuário por dia) compartilhado entre as rotas
+    DOCUMENTO_DIA_CACHE_SIZE = int(os.environ.get('DOCUMENTO_DIA_CACHE_SIZE') or 4096)
+    # Validade máxima: rede de segurança quando a invalidação de outro worker
+    # não chega (CACHE_BACKEND=local com vários workers não difunde nada)
+    DOCUMENTO_DIA_TTL_SEGUNDOS = float(os.environ.get('DOCUMENTO_DIA_TTL_SEGUNDOS') or 5)
+
+    # Backend dos caches compartilhados entre workers: "local", "sqlite" ou "redis"
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'local'
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH') or 'cache.db'
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://127.0.0.1:6379/0'
+    CACHE_PREFIXO = os.environ.get('CACHE_PREFIXO') or 'alfredo'
+    CACHE_INVALIDACAO_POLL_SEGUNDOS = float(os.environ.get('CACHE_INVALIDACAO_POLL_SEGUNDOS') or 0.5)
+
+    # Importação de trilhas GPX/TCX: tamanho máximo do upload
+    ATIVIDADES_IMPORTAR_MAX_BYTES = int(os.environ.get('ATIVIDADES_IMPORTAR_MAX_BYTES') or 50 * 1024 * 1024)
+
+    # Profiling sob demanda: header X-Profile assinado (ADMIN_TOKEN) ou amostragem
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 0)
+    PROFILE_INTERVALO_MS = float(os.environ.get('PROFILE_INTERVALO_MS') or 5)
+    PROFILE_MAX_ARQUIVOS = int(os.environ.get('PROFILE_MAX_ARQUIVOS') or 200)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or None  # padrão: instance/profiles
+
+    # Escritor único: escritas das rotas numa thread por processo, com group commit
+    ESCRITOR_UNICO = os.environ.get('ESCRITOR_UNICO') == '1'
+    ESCRITOR_JANELA_MS = float(os.environ.get('ESCRITOR_JANELA_MS') or 2)
+    ESCRITOR_LOTE_MAX = int(os.environ.get('ESCRITOR_LOTE_MAX') or 64)
+    ESCRITOR_ESPERA_SEGUNDOS = float(os.environ.get('ESCRITOR_ESPERA_SEGUNDOS') or 30)
@@ -0,0 +1,109 @@
+"""
+Corpo da requisição lido em streaming, sem guardá-lo em memória.
+
+EntradaContada substitui o wsgi.input antes da primeira leitura: conta os
+bytes, calcula o sha256 do que passa e, com limite, levanta
+RequestEntityTooLarge assim que o passa — vale para JSON, multipart e para
+quem lê request.stream direto.
+
+    @jwt_required()
+    @limitar_corpo("ATIVIDADES_IMPORTAR_MAX_BYTES")
+    @idempotente
+    def rota(): ...
+
+O Content-Length só serve de atalho: sem ele (chunked) o limite é aplicado
+na leitura.
+"""
+
+import hashlib
+import io
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+BLOCO = 64 * 1024
+
+
+class EntradaContada(io.RawIOBase):
+    def __init__(self, entrada, limite=None):
+        self.entrada = entrada
+        self.limite = limite
+        self.lidos = 0
+        self.hash = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def _contar(self, dados):
+        self.lidos += len(dados)
+        if self.limite is not None and self.lidos > self.limite:
+            raise RequestEntityTooLarge()
+        self.hash.update(dados)
+        return dados
+
+    def read(self, tamanho=-1):
+        return self._contar(self.entrada.read(tamanho))
+
+    def readline(self, tamanho=-1):
+        return self._contar(self.entrada.readline(tamanho))
+
+    def readinto(self, buffer):
+        dados = self.read(len(buffer))
+        buffer[: len(dados)] = dados
+        return len(dados)
+
+
+def entrada_contada(limite=None):
+    """
+    EntradaContada da requisição atual (instala na primeira chamada).
+    None se o corpo já foi aberto antes: aí ele não passa mais pelo wsgi.input.
+    """
+    entrada = request.environ.get("wsgi.input")
+    if isinstance(entrada, EntradaContada):
+        if limite is not None:
+            entrada.limite = limite if entrada.limite is None else min(entrada.limite, limite)
+        return entrada
+
+    if "stream" in vars(request._get_current_object()):
+        return None
+
+    entrada = EntradaContada(entrada if entrada is not None else io.BytesIO(), limite)
+    request.environ["wsgi.input"] = entrada
+    return entrada
+
+
+def sha256_do_corpo():
+    """Digest do corpo inteiro: lê em blocos o que a rota ainda não leu."""
+    entrada = entrada_contada()
+    if entrada is None:
+        return hashlib.sha256(request.get_data()).hexdigest()
+
+    while request.stream.read(BLOCO):
+        pass
+    return entrada.hash.hexdigest()
+
+
+def _grande_demais(limite):
+    return jsonify({"error": f"Arquivo maior que o limite de {limite} bytes."}), 413
+
+
+def limitar_corpo(chave_config):
+    """Decorator: 413 quando o corpo passa de app.config[chave_config] bytes."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limite = current_app.config[chave_config]
+            if request.content_length is not None and request.content_length > limite:
+                return _grande_demais(limite)
+
+            entrada_contada(limite)
+            try:
+                return view(*args, **kwargs)
+            except RequestEntityTooLarge:
+                return _grande_demais(limite)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,193 @@
+"""
+Documento do dia: os dados de um (usuário, dia) montados uma vez e
+compartilhados entre dashboard, cálculos, rotina, atividades e calorias extras.
+
+    {"user", "meta", "atividade", "rotinas", "calorias_extras"}
+
+Tudo já em dicts (to_dict), somente leitura. O cache é um LRU por app
+(DOCUMENTO_DIA_CACHE_SIZE), invalidado pelo barramento de eventos:
+    - rotina_alimentar, atividades_fisicas, calorias_extras → só o dia alterado;
+    - users, metas_peso (a última meta entra em todos os dias) ou alteração
+      sem tabela/dia identificados → todos os dias do usuário;
+    - demais tabelas (consumo_calorico, tendência, arquivo) → nada.
+
+O cache é local ao processo; as invalidações são repetidas nos outros
+workers pela difusão do backend de cache (publicar_invalidacao). Com
+CACHE_BACKEND=local não há difusão: entre workers, o que limita um documento
+velho é o TTL (DOCUMENTO_DIA_TTL_SEGUNDOS).
+"""
+
+import threading
+from collections import defaultdict
+from datetime import date
+
+from flask import current_app, has_app_context
+
+from app import db
+from app.cache_backends import ao_invalidar, criar_cache, publicar_invalidacao
+from app.eventos import barramento
+from app.models import (
+    User,
+    MetaPeso,
+    AtividadeFisica,
+    RotinaAlimentar,
+    CaloriasExtras,
+)
+
+TABELAS_DO_DIA = {
+    RotinaAlimentar.__tablename__,
+    AtividadeFisica.__tablename__,
+    CaloriasExtras.__tablename__,
+}
+TABELAS_DO_USUARIO = {User.__tablename__, MetaPeso.__tablename__}
+
+
+class CacheDocumentos:
+    def __init__(self, docs):
+        self.docs = docs
+        # Invalidar todos os dias de um usuário = trocar a geração da chave
+        self._geracoes = defaultdict(int)
+        # Qualquer invalidação do usuário (local ou vinda de outro worker)
+        self._invalidacoes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _chave(self, user_id, dia):
+        return (user_id, dia, self._geracoes[user_id])
+
+    def obter(self, user_id, dia, construir):
+        with self._lock:
+            chave = self._chave(user_id, dia)
+            marca = self._invalidacoes[user_id]
+        doc = self.docs.get(chave)
+        if doc is None:
+            versao = barramento.versao(user_id)
+            doc = construir()
+            if doc is None:
+                return doc
+            # Escrita ou invalidação durante a montagem: não guarda um doc velho
+            with self._lock:
+                if barramento.versao(user_id) == versao and self._invalidacoes[user_id] == marca:
+                    self.docs.set(chave, doc)
+        return doc
+
+    def invalidar_dia(self, user_id, dia):
+        with self._lock:
+            self._invalidacoes[user_id] += 1
+            self.docs.delete(self._chave(user_id, dia))
+
+    def invalidar_usuario(self, user_id):
+        with self._lock:
+            self._invalidacoes[user_id] += 1
+            self._geracoes[user_id] += 1
+
+    def aplicar(self, user_id, dias):
+        """dias=None invalida todos os dias do usuário."""
+        if dias is None:
+            self.invalidar_usuario(user_id)
+            return
+        for dia in dias:
+            self.invalidar_dia(user_id, dia)
+
+
+def init_documento_dia(app):
+    cache = app.extensions["documento_dia"] = CacheDocumentos(
+        criar_cache(
+            app,
+            "documento_dia",
+            maxsize=app.config["DOCUMENTO_DIA_CACHE_SIZE"],
+            ttl=app.config["DOCUMENTO_DIA_TTL_SEGUNDOS"],
+        )
+    )
+
+    def remoto(user_id, dias):
+        cache.aplicar(user_id, None if dias is None else [date.fromisoformat(d) for d in dias])
+
+    ao_invalidar(app, "documento_dia", remoto)
+
+
+@barramento.ouvir
+def _invalidar(user_id, alteracoes):
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get("documento_dia")
+    if cache is None:
+        return
+
+    dias = set()
+    for tabela, dia in alteracoes:
+        if tabela is not None and tabela not in TABELAS_DO_DIA | TABELAS_DO_USUARIO:
+            continue
+        if tabela in TABELAS_DO_USUARIO or dia is None:
+            dias = None
+            break
+        dias.add(dia)
+
+    if dias is None or dias:
+        cache.aplicar(user_id, dias)
+        publicar_invalidacao(
+            "documento_dia", user_id, None if dias is None else [d.isoformat() for d in dias]
+        )
+
+
+def construir(user_id, dia):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    ultima_meta = (
+        MetaPeso.query.filter_by(user_id=user_id)
+        .order_by(MetaPeso.data_registro.desc())
+        .first()
+    )
+    atividade = AtividadeFisica.query.filter_by(user_id=user_id, data=dia).first()
+    rotinas = (
+        RotinaAlimentar.query.filter_by(user_id=user_id, data=dia)
+        .order_by(RotinaAlimentar.id)
+        .all()
+    )
+    extras = (
+        CaloriasExtras.query.filter_by(user_id=user_id, data=dia)
+        .order_by(CaloriasExtras.id)
+        .all()
+    )
+
+    return {
+        "user": user.to_dict(),
+        "meta": ultima_meta.to_dict() if ultima_meta else None,
+        "atividade": atividade.to_dict() if atividade else None,
+        "rotinas": [r.to_dict() for r in rotinas],
+        "calorias_extras": [e.to_dict() for e in extras],
+    }
+
+
+def documento(user_id, dia):
+    """Documento do (usuário, dia); None se o usuário não existe."""
+    user_id = int(user_id)
+    cache = current_app.extensions.get("documento_dia")
+    if cache is None:
+        return construir(user_id, dia)
+    return cache.obter(user_id, dia, lambda: construir(user_id, dia))
+
+
+# ---------------------------------------------------------
+# Derivados usados por várias rotas
+# ---------------------------------------------------------
+def peso_atual(doc):
+    meta = doc["meta"]
+    peso = meta["peso_atual"] if meta else doc["user"]["peso_inicial"]
+    try:
+        return float(peso or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def calorias_rotina(doc):
+    return sum((r["calorias"] or 0) for r in doc["rotinas"] if r["concluido"])
+
+
+def calorias_extras(doc):
+    return sum((e["calorias"] or 0) for e in doc["calorias_extras"])
+
+
+def calorias_exercicio(doc):
+    return (doc["atividade"] or {}).get("calorias_perdidas") or 0
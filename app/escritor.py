@@ -0,0 +1,160 @@
+"""
+Escritor único com group commit (opcional, ESCRITOR_UNICO=1).
+
+No SQLite só uma transação escreve por vez e cada commit custa um fsync;
+com muitas threads gravando, o tempo vai em commits e na espera pelo lock
+(busy_timeout). No modo escritor único as rotas entregam a parte que toca
+o banco — uma função sem argumentos, sem commit — a uma thread dedicada do
+processo. Ela junta as operações que chegam em ESCRITOR_JANELA_MS (até
+ESCRITOR_LOTE_MAX), roda cada uma no shard do usuário e grava todas com um
+único commit; cada requisição espera o resultado da sua.
+
+A função roda fora da requisição (sem request nem JWT) e deve devolver
+dados já serializados (to_dict antes do commit). Se uma operação do lote
+levanta exceção, o lote é desfeito e as operações são refeitas uma a uma,
+cada uma com o seu commit: a que falhou recebe a própria exceção e as
+demais seguem. Falha no commit do lote é repassada a todas.
+
+O escritor é por processo: com vários workers os commits ainda disputam o
+arquivo, mas em número bem menor. Com o modo desligado (padrão),
+executar_escrita roda a função e faz o commit na própria requisição.
+
+Toda escrita disparada por requisição ou job passa por executar_escrita
+(user_id=None: só banco principal, ex.: o User do cadastro antes de ter id).
+Ficam de fora as cargas em lote — provisionamento, import-history, arquivo
+e shards mover: transações grandes, de muitos usuários, que segurariam o
+escritor (e toda escrita das rotas) pelo lote inteiro; elas fazem commit
+por lote e disputam o lock do SQLite como qualquer outro processo.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+from flask import current_app
+
+from app import db
+from app.sharding import shard_do_usuario
+
+
+class EscritorUnico:
+    def __init__(self, app):
+        self.app = app
+        self.janela = app.config["ESCRITOR_JANELA_MS"] / 1000
+        self.lote_max = app.config["ESCRITOR_LOTE_MAX"]
+        self.espera = app.config["ESCRITOR_ESPERA_SEGUNDOS"]
+        self.fila = None
+        self.lotes = 0
+        self.operacoes = 0
+        self._pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _iniciar(self):
+        # Thread criada na primeira escrita (e de novo no filho após um fork)
+        with self._lock:
+            if self._pid != os.getpid():
+                self.fila = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._loop, args=(self.fila,), daemon=True, name="escritor"
+                )
+                self._thread.start()
+            return self.fila
+
+    def executar(self, user_id, funcao):
+        if threading.current_thread() is self._thread:
+            # Chamada de dentro de uma operação do lote: o commit dela cobre
+            return funcao()
+
+        futuro = Future()
+        self._iniciar().put((user_id, funcao, futuro))
+        try:
+            return futuro.result(timeout=self.espera)
+        except TimeoutError:
+            # Ainda na fila: não roda mais. Já em execução: o resultado se perde.
+            futuro.cancel()
+            raise
+
+    # ---------------------------------------------------------
+    # Thread do escritor
+    # ---------------------------------------------------------
+    def _coletar(self, fila):
+        lote = [fila.get()]
+        limite = time.monotonic() + self.janela
+        while len(lote) < self.lote_max:
+            try:
+                restante = limite - time.monotonic()
+                lote.append(fila.get(timeout=restante) if restante > 0 else fila.get_nowait())
+            except queue.Empty:
+                break
+        # Canceladas por timeout enquanto esperavam
+        return [op for op in lote if op[2].set_running_or_notify_cancel()]
+
+    def _loop(self, fila):
+        with self.app.app_context():
+            while True:
+                lote = self._coletar(fila)
+                if lote:
+                    self._gravar(lote)
+
+    def _gravar(self, lote):
+        self.lotes += 1
+        self.operacoes += len(lote)
+
+        if len(lote) > 1:
+            try:
+                resultados = [_rodar(user_id, funcao) for user_id, funcao, _ in lote]
+            except Exception:
+                db.session.rollback()
+            else:
+                try:
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    for _, _, futuro in lote:
+                        futuro.set_exception(e)
+                else:
+                    for (_, _, futuro), resultado in zip(lote, resultados):
+                        futuro.set_result(resultado)
+                return
+
+        # Operação sozinha, ou lote desfeito por uma delas: um commit por operação
+        for user_id, funcao, futuro in lote:
+            try:
+                resultado = _rodar(user_id, funcao)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                futuro.set_exception(e)
+            else:
+                futuro.set_result(resultado)
+
+
+def _rodar(user_id, funcao):
+    # Flush ainda no shard do usuário: o commit do lote cobre vários shards
+    with shard_do_usuario(user_id) if user_id is not None else nullcontext():
+        resultado = funcao()
+        db.session.flush()
+    return resultado
+
+
+def init_escritor(app):
+    app.extensions["escritor"] = EscritorUnico(app) if app.config["ESCRITOR_UNICO"] else None
+
+
+def executar_escrita(user_id, funcao):
+    """
+    Roda `funcao` (escritas sem commit) e faz o commit; devolve o retorno
+    de `funcao`. Com ESCRITOR_UNICO, via escritor do processo (group commit);
+    objetos ORM criados em `funcao` não valem na sessão de quem chamou.
+    """
+    escritor = current_app.extensions["escritor"]
+    if escritor is None:
+        resultado = _rodar(user_id, funcao)
+        db.session.commit()
+        return resultado
+    return escritor.executar(user_id, funcao)
@@ -0,0 +1,143 @@
+"""
+Notificação de alterações por usuário (pub/sub).
+
+Um listener de sessão registra quais usuários tiveram linhas alteradas
+(tabelas por usuário e `users`) e, após o commit, publica no barramento em
+processo. Com EVENTOS_CROSS_WORKER ativo, cada publicação também incrementa
+`notificacoes_usuario.versao` no SQLite, que os streams dos outros workers
+consultam periodicamente (lookup por chave primária).
+"""
+
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.sharding import tabela_por_usuario
+
+_CHAVE = "eventos_alterados"
+
+
+# ---------------------------------------------------------
+# Barramento em processo
+# ---------------------------------------------------------
+class Barramento:
+    def __init__(self):
+        self._versoes = defaultdict(int)
+        self._condicao = threading.Condition()
+        self._ouvintes = []
+
+    def versao(self, user_id):
+        return self._versoes[int(user_id)]
+
+    def publicar(self, user_id, alteracoes=()):
+        """`alteracoes`: pares (tabela, dia); None em qualquer um = não identificado."""
+        user_id = int(user_id)
+        with self._condicao:
+            self._versoes[user_id] += 1
+            self._condicao.notify_all()
+        for ouvinte in self._ouvintes:
+            ouvinte(user_id, alteracoes)
+
+    def aguardar(self, user_id, versao_vista, timeout):
+        """Bloqueia até uma nova versão do usuário ou o timeout. Retorna a versão atual."""
+        user_id = int(user_id)
+        with self._condicao:
+            self._condicao.wait_for(
+                lambda: self._versoes[user_id] != versao_vista, timeout=timeout
+            )
+            return self._versoes[user_id]
+
+    def ouvir(self, funcao):
+        """Registra funcao(user_id, alteracoes) chamada a cada publicação (ex.: caches)."""
+        self._ouvintes.append(funcao)
+        return funcao
+
+
+barramento = Barramento()
+
+
+# ---------------------------------------------------------
+# Coleta das alterações na sessão
+# ---------------------------------------------------------
+def _usuario_dia_tabela(obj):
+    tabela = getattr(obj, "__table__", None)
+    if tabela is None:
+        return None, None, None
+
+    if tabela.name == "users":
+        return obj.id, None, tabela.name
+
+    if not tabela_por_usuario(tabela):
+        return None, None, None
+
+    dia = getattr(obj, "data", None) or getattr(obj, "data_registro", None)
+    if isinstance(dia, datetime):
+        dia = dia.date()
+    dia = dia if isinstance(dia, date) else None
+    return getattr(obj, "user_id", None), dia, tabela.name
+
+
+def registrar_alteracao(session, user_id, dia=None, tabela=None):
+    """Para escritas que não passam pelo flush do ORM (Core, upserts, lotes)."""
+    if user_id is None:
+        return
+    session.info.setdefault(_CHAVE, {}).setdefault(int(user_id), set()).add((tabela, dia))
+
+
+@event.listens_for(Session, "after_flush")
+def _coletar(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        user_id, dia, tabela = _usuario_dia_tabela(obj)
+        registrar_alteracao(session, user_id, dia, tabela)
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar(session):
+    alterados = session.info.pop(_CHAVE, None)
+    if not alterados:
+        return
+
+    for user_id, alteracoes in alterados.items():
+        barramento.publicar(user_id, alteracoes)
+
+    if has_app_context() and current_app.config.get("EVENTOS_CROSS_WORKER"):
+        notificar_outros_workers(alterados.keys())
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CHAVE, None)
+
+
+# ---------------------------------------------------------
+# Fan-out entre workers (SQLite)
+# ---------------------------------------------------------
+def notificar_outros_workers(user_ids):
+    from app import db
+    from app.models import NotificacaoUsuario
+
+    t = NotificacaoUsuario.__table__
+    with db.engine.begin() as conn:
+        for user_id in user_ids:
+            atualizado = conn.execute(
+                t.update().where(t.c.user_id == user_id).values(versao=t.c.versao + 1)
+            ).rowcount
+            if not atualizado:
+                conn.execute(t.insert().values(user_id=user_id, versao=1))
+
+
+def versao_compartilhada(user_id):
+    from app import db
+    from app.models import NotificacaoUsuario
+
+    with db.engine.connect() as conn:
+        return conn.execute(
+            sa.select(NotificacaoUsuario.versao).where(
+                NotificacaoUsuario.user_id == int(user_id)
+            )
+        ).scalar() or 0
@@ -0,0 +1,116 @@
+"""
+Suporte ao header Idempotency-Key nos POSTs.
+
+A primeira resposta (status < 500) para uma chave é guardada num store
+limitado com TTL e reenviada nas repetições, sem executar a rota de novo.
+Requisições concorrentes com a mesma chave esperam a primeira terminar
+(a espera é por processo; o store segue CACHE_BACKEND).
+Reusar a chave com outro corpo retorna 422. O digest do corpo é calculado
+em streaming (app.corpo): uploads não são carregados inteiros na memória.
+"""
+
+import threading
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+from app.cache_backends import criar_cache
+from app.corpo import entrada_contada, sha256_do_corpo
+
+HEADER = "Idempotency-Key"
+
+
+def _store():
+    return current_app.extensions["idempotencia"]
+
+
+def init_idempotencia(app):
+    app.extensions["idempotencia"] = {
+        # Compartilhado: a repetição pode cair em outro worker
+        "respostas": criar_cache(
+            app,
+            "idempotencia",
+            maxsize=app.config["IDEMPOTENCIA_MAX_CHAVES"],
+            ttl=app.config["IDEMPOTENCIA_TTL_SEGUNDOS"],
+            compartilhado=True,
+        ),
+        "em_andamento": {},
+        "lock": threading.Lock(),
+    }
+
+
+def _identidade():
+    # Rotas sem @jwt_required (cadastro) ficam no escopo anônimo
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def idempotente(view):
+    """Decorator para rotas POST; aplicar abaixo de @jwt_required()."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        chave_cliente = request.headers.get(HEADER)
+        if not chave_cliente:
+            return view(*args, **kwargs)
+
+        if len(chave_cliente) > 255:
+            return jsonify({"error": f"{HEADER} muito longo (máx. 255)."}), 400
+
+        store = _store()
+        chave = (_identidade(), request.path, chave_cliente)
+        # Antes de qualquer leitura do corpo: a rota lê e o digest sai junto
+        entrada_contada()
+
+        while True:
+            salvo = store["respostas"].get(chave)
+            if salvo is not None:
+                return _replay(salvo, sha256_do_corpo())
+
+            with store["lock"]:
+                evento = store["em_andamento"].get(chave)
+                if evento is None:
+                    evento = threading.Event()
+                    store["em_andamento"][chave] = evento
+                    break
+            # Outra requisição com a mesma chave está em execução
+            evento.wait(timeout=current_app.config["IDEMPOTENCIA_ESPERA_SEGUNDOS"])
+            if not evento.is_set():
+                return jsonify({"error": "Requisição com esta chave ainda em andamento."}), 409
+
+        try:
+            resposta = current_app.make_response(view(*args, **kwargs))
+            if resposta.status_code < 500:
+                store["respostas"].set(
+                    chave,
+                    {
+                        "digest": sha256_do_corpo(),
+                        "status": resposta.status_code,
+                        "corpo": resposta.get_data(),
+                        "mimetype": resposta.mimetype,
+                    },
+                )
+            return resposta
+        finally:
+            with store["lock"]:
+                store["em_andamento"].pop(chave, None)
+            evento.set()
+
+    return wrapper
+
+
+def _replay(salvo, digest):
+    if salvo["digest"] != digest:
+        return (
+            jsonify({"error": f"{HEADER} já usado com outro corpo de requisição."}),
+            422,
+        )
+
+    resposta = current_app.response_class(
+        salvo["corpo"], status=salvo["status"], mimetype=salvo["mimetype"]
+    )
+    resposta.headers["Idempotent-Replayed"] = "true"
+    return resposta
@@ -0,0 +1,437 @@
+"""
+Importação em lote de históricos (CSV ou NDJSON).
+
+    flask import-history pesos.csv --tipo meta
+    flask import-history treinos.ndjson --tipo atividade --chunk 10000
+
+Lê o arquivo em streaming (memória constante), valida cada linha, resolve o
+usuário pelo `telefone` e insere em lotes com executemany, uma transação por
+shard e por lote. Após cada lote gravado, o offset em bytes e os usuários
+afetados (com o intervalo de dias) vão para `<arquivo>.offset`; uma nova
+execução continua de onde parou e o pós-importação cobre também os usuários
+dos lotes anteriores.
+
+Uma queda entre a gravação de um lote e o `.offset` não duplica linhas: na
+mesma transação do lote, `importacao_progresso` guarda o offset da última
+linha gravada de cada usuário, e a retomada pula as linhas até ele. Linhas
+rejeitadas são registradas em `<arquivo>.rejeitadas`, truncado na retomada
+de volta ao tamanho salvo no `.offset`.
+
+O pós-importação invalida os estados derivados (aderência, tendência, perfil,
+documentos do dia) e refaz o balanço — e com ele o ranking — dos dias do
+intervalo importado que já tinham ConsumoCalorico.
+
+Campos por tipo (além de `telefone`):
+    meta:      peso_atual, peso_meta, data_registro
+    atividade: data, km_percorridos, calorias_perdidas, calorias_trabalho
+    extra:     data, calorias, descricao, sincero
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import date, datetime
+
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+
+from app import db
+from app.eventos import registrar_alteracao
+from app.models import User, MetaPeso, AtividadeFisica, CaloriasExtras, ConsumoCalorico, ProgressoImportacao
+from app.sharding import (
+    engine_do_shard,
+    engines_dos_shards,
+    shard_do_usuario,
+    shard_para_usuario,
+    sharding_ativo,
+)
+from app.upsert import upsert_em_lote
+
+
+# ---------------------------------------------------------
+# Conversores
+# ---------------------------------------------------------
+def _data(valor):
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _momento(valor):
+    valor = str(valor)
+    if len(valor) == 10:
+        return datetime.combine(date.fromisoformat(valor), datetime.min.time())
+    return datetime.fromisoformat(valor)
+
+
+def _bool(valor):
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() not in ("0", "false", "nao", "não", "")
+
+
+def _opcional(conversor, padrao):
+    def converter(valor):
+        return padrao if valor in (None, "") else conversor(valor)
+
+    return converter
+
+
+# tipo → (tabela, {campo: (conversor, obrigatório)})
+TIPOS = {
+    "meta": (
+        MetaPeso.__table__,
+        {
+            "peso_atual": (float, True),
+            "peso_meta": (float, True),
+            "data_registro": (_momento, True),
+        },
+    ),
+    "atividade": (
+        AtividadeFisica.__table__,
+        {
+            "data": (_data, True),
+            "km_percorridos": (_opcional(float, 0.0), False),
+            "calorias_perdidas": (_opcional(int, 0), False),
+            "calorias_trabalho": (_opcional(int, 0), False),
+        },
+    ),
+    "extra": (
+        CaloriasExtras.__table__,
+        {
+            "data": (_data, True),
+            "calorias": (int, True),
+            "descricao": (_opcional(str, None), False),
+            "sincero": (_opcional(_bool, True), False),
+        },
+    ),
+}
+
+# Tipos com índice único por dia: o importado sobrescreve o dia (upsert)
+CHAVES_DIA = {
+    "atividade": ("user_id", "data"),
+}
+
+# Coluna com o dia de cada linha (intervalo afetado no pós-importação)
+COLUNAS_DIA = {
+    "meta": "data_registro",
+    "atividade": "data",
+    "extra": "data",
+}
+
+
+def dia_da_linha(tipo, linha):
+    valor = linha[COLUNAS_DIA[tipo]]
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def validar(registro, campos, usuarios):
+    """Retorna (linha_para_insert, None) ou (None, motivo)."""
+    telefone = str(registro.get("telefone") or "").strip()
+    user_id = usuarios.get(telefone)
+    if user_id is None:
+        return None, f"telefone não cadastrado: {telefone!r}"
+
+    linha = {"user_id": user_id}
+    for campo, (conversor, obrigatorio) in campos.items():
+        valor = registro.get(campo)
+        if obrigatorio and valor in (None, ""):
+            return None, f"campo obrigatório ausente: {campo}"
+        try:
+            linha[campo] = conversor(valor)
+        except (TypeError, ValueError):
+            return None, f"valor inválido para {campo}: {valor!r}"
+    return linha, None
+
+
+# ---------------------------------------------------------
+# Leitura em streaming com offset
+# ---------------------------------------------------------
+class LeitorComOffset:
+    """Itera linhas decodificadas mantendo o offset em bytes já consumido."""
+
+    def __init__(self, arquivo, offset):
+        self.arquivo = arquivo
+        self.offset = offset
+        arquivo.seek(offset)
+
+    def __iter__(self):
+        for bruta in self.arquivo:
+            self.offset += len(bruta)
+            yield bruta.decode("utf-8-sig")
+
+
+def registros(arquivo, formato, offset, cabecalho):
+    """Gera (registro, offset_depois_do_registro)."""
+    leitor = LeitorComOffset(arquivo, offset)
+
+    if formato == "ndjson":
+        for texto in leitor:
+            if texto.strip():
+                try:
+                    yield json.loads(texto), leitor.offset
+                except ValueError as e:
+                    yield {"__erro__": f"JSON inválido: {e}"}, leitor.offset
+        return
+
+    for valores in csv.reader(leitor):
+        if valores:
+            yield dict(zip(cabecalho, valores)), leitor.offset
+
+
+def ler_cabecalho(caminho):
+    with open(caminho, "rb") as arquivo:
+        primeira = arquivo.readline()
+    cabecalho = next(csv.reader(io.StringIO(primeira.decode("utf-8-sig"))))
+    return [c.strip() for c in cabecalho], len(primeira)
+
+
+# ---------------------------------------------------------
+# Estado (offset) para retomar
+# ---------------------------------------------------------
+def _caminho_estado(caminho):
+    return f"{caminho}.offset"
+
+
+def carregar_estado(caminho, tipo):
+    try:
+        with open(_caminho_estado(caminho), encoding="utf-8") as f:
+            estado = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if estado.get("tipo") != tipo or estado.get("tamanho_arquivo", 0) > os.path.getsize(caminho):
+        raise click.ClickException(
+            f"{_caminho_estado(caminho)} não corresponde a este arquivo/tipo; "
+            "use --do-inicio para reimportar."
+        )
+    return estado
+
+
+def salvar_estado(caminho, estado):
+    temporario = _caminho_estado(caminho) + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    os.replace(temporario, _caminho_estado(caminho))
+
+
+def chave_importacao(caminho, tipo):
+    """Identifica a importação (tipo + arquivo) em importacao_progresso."""
+    origem = f"{tipo}:{os.path.abspath(caminho)}".encode()
+    return hashlib.blake2b(origem, digest_size=20).hexdigest()
+
+
+def limpar_progresso(importacao):
+    """Apaga o progresso gravado no banco (importação concluída ou --do-inicio)."""
+    progresso = ProgressoImportacao.__table__
+    for _, engine in engines_dos_shards(db):
+        with engine.begin() as conn:
+            conn.execute(progresso.delete().where(progresso.c.importacao == importacao))
+
+
+# ---------------------------------------------------------
+# Gravação
+# ---------------------------------------------------------
+def _inserir(conn, tabela, lote, chave, importacao):
+    """Grava as linhas do lote ainda não gravadas e o progresso de cada usuário."""
+    progresso = ProgressoImportacao.__table__
+    gravados = dict(
+        conn.execute(
+            sa.select(progresso.c.user_id, progresso.c.offset).where(
+                progresso.c.importacao == importacao,
+                progresso.c.user_id.in_({linha["user_id"] for _, linha in lote}),
+            )
+        ).all()
+    )
+    # Já gravadas por uma execução que caiu antes de salvar o .offset
+    lote = [(offset, linha) for offset, linha in lote if offset > gravados.get(linha["user_id"], -1)]
+    if not lote:
+        return
+
+    linhas = [linha for _, linha in lote]
+    if chave is None:
+        conn.execute(tabela.insert(), linhas)
+    else:
+        atualizar = [coluna for coluna in linhas[0] if coluna not in chave]
+        upsert_em_lote(conn, tabela, linhas, chave, atualizar)
+
+    ultimos = {linha["user_id"]: offset for offset, linha in lote}
+    upsert_em_lote(
+        conn,
+        progresso,
+        [{"user_id": uid, "importacao": importacao, "offset": offset} for uid, offset in ultimos.items()],
+        ("user_id", "importacao"),
+        ("offset",),
+    )
+
+
+def gravar_lote(tabela, lote, importacao, chave=None):
+    """
+    lote: [(offset_depois_da_linha, linha)]. Um executemany por shard, cada
+    um na sua transação.
+    """
+    if not sharding_ativo():
+        with db.engine.begin() as conn:
+            _inserir(conn, tabela, lote, chave, importacao)
+        return
+
+    por_shard = {}
+    for offset, linha in lote:
+        shard = shard_para_usuario(db, linha["user_id"])
+        por_shard.setdefault(shard, []).append((offset, linha))
+
+    for shard, parte in por_shard.items():
+        with engine_do_shard(db, shard).begin() as conn:
+            _inserir(conn, tabela, parte, chave, importacao)
+
+
+def pos_importacao(tipo, afetados):
+    """
+    Estados derivados que dependem das linhas importadas.
+    afetados: {user_id: (primeiro_dia, ultimo_dia)}.
+    """
+    from app import aderencia, perfil, tendencia
+    from app.routes.calculos import calcular_balanco, gravar_balanco
+
+    tabela = TIPOS[tipo][0].name
+    for user_id, (inicio, fim) in afetados.items():
+        with shard_do_usuario(user_id):
+            if tipo == "atividade":
+                aderencia.invalidar(user_id)
+            if tipo == "meta":
+                tendencia.invalidar(user_id)
+                perfil.incrementar(user_id)
+            # O lote foi gravado pelo Core, sem flush do ORM: avisa o barramento
+            # (documentos do dia, aqui e nos outros workers). Um histórico cobre
+            # muitos dias: invalida todos os do usuário de uma vez.
+            registrar_alteracao(db.session, user_id, None, tabela)
+            db.session.commit()
+
+            # Dias já calculados mudaram: refaz o balanço e a posição no ranking.
+            # A última meta entra em todos os dias do usuário.
+            calculados = db.select(ConsumoCalorico.data).where(ConsumoCalorico.user_id == user_id)
+            if tipo != "meta":
+                calculados = calculados.where(ConsumoCalorico.data.between(inicio, fim))
+            user = db.session.get(User, user_id)
+            for dia in db.session.execute(calculados).scalars().all():
+                gravar_balanco(user_id, dia, calcular_balanco(user_id, user, dia))
+                db.session.commit()
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+@click.command("import-history")
+@click.argument("caminho", type=click.Path(exists=True, dir_okay=False))
+@click.option("--tipo", type=click.Choice(sorted(TIPOS)), required=True)
+@click.option(
+    "--formato",
+    type=click.Choice(["csv", "ndjson"]),
+    default=None,
+    help="Padrão: pela extensão (.ndjson/.jsonl → ndjson).",
+)
+@click.option("--chunk", type=int, default=5000, show_default=True)
+@click.option("--do-inicio", is_flag=True, help="Ignora o offset salvo.")
+@with_appcontext
+def import_history_cmd(caminho, tipo, formato, chunk, do_inicio):
+    """Importa histórico de peso, atividades ou calorias extras."""
+    formato = formato or (
+        "ndjson" if caminho.endswith((".ndjson", ".jsonl")) else "csv"
+    )
+    tabela, campos = TIPOS[tipo]
+
+    importacao = chave_importacao(caminho, tipo)
+    estado = None if do_inicio else carregar_estado(caminho, tipo)
+    if estado is None:
+        limpar_progresso(importacao)
+    cabecalho, offset = ([], 0)
+    if formato == "csv":
+        cabecalho, offset = ler_cabecalho(caminho)
+    if estado:
+        offset = estado["offset"]
+        click.echo(f"Retomando de {offset} bytes ({estado['lidas']} linhas já lidas).")
+
+    estado = estado or {
+        "tipo": tipo,
+        "offset": offset,
+        "lidas": 0,
+        "inseridas": 0,
+        "rejeitadas": 0,
+        "rejeitadas_bytes": 0,
+    }
+    # Usuários (e intervalo de dias) dos lotes já gravados, inclusive de
+    # execuções interrompidas
+    afetados = {
+        int(uid): tuple(date.fromisoformat(d) for d in dias)
+        for uid, dias in estado.get("afetados", {}).items()
+    }
+
+    usuarios = dict(db.session.execute(db.select(User.telefone, User.id)).all())
+    db.session.remove()
+
+    tamanho = os.path.getsize(caminho)
+    inicio = time.perf_counter()
+    inseridas_sessao = 0
+    lote, ultimo_offset = [], offset
+
+    with open(caminho, "rb") as arquivo, open(
+        f"{caminho}.rejeitadas", "a", encoding="utf-8"
+    ) as rejeitadas:
+        # Rejeições escritas depois do último .offset serão lidas de novo
+        rejeitadas.truncate(estado.get("rejeitadas_bytes", 0))
+
+        def descarregar():
+            nonlocal lote, inseridas_sessao
+            if lote:
+                gravar_lote(tabela, lote, importacao, CHAVES_DIA.get(tipo))
+            # Inclui as linhas puladas: gravadas por uma execução que caiu antes
+            # do .offset, não estão nos afetados nem nas inseridas salvos
+            for _, linha in lote:
+                dia = dia_da_linha(tipo, linha)
+                primeiro, ultimo = afetados.get(linha["user_id"], (dia, dia))
+                afetados[linha["user_id"]] = (min(primeiro, dia), max(ultimo, dia))
+            estado["inseridas"] += len(lote)
+            estado["afetados"] = {str(uid): [d.isoformat() for d in dias] for uid, dias in afetados.items()}
+            inseridas_sessao += len(lote)
+            estado["offset"] = ultimo_offset
+            estado["tamanho_arquivo"] = tamanho
+            rejeitadas.flush()
+            estado["rejeitadas_bytes"] = rejeitadas.tell()
+            salvar_estado(caminho, estado)
+            lote = []
+
+            decorrido = time.perf_counter() - inicio
+            click.echo(
+                f"{100 * ultimo_offset / max(tamanho, 1):5.1f}% | "
+                f"{estado['lidas']} lidas, {estado['inseridas']} inseridas, "
+                f"{estado['rejeitadas']} rejeitadas | "
+                f"{inseridas_sessao / decorrido if decorrido else 0:,.0f} linhas/s"
+            )
+
+        for registro, ultimo_offset in registros(arquivo, formato, offset, cabecalho):
+            estado["lidas"] += 1
+
+            erro = registro.get("__erro__")
+            linha = None
+            if not erro:
+                linha, erro = validar(registro, campos, usuarios)
+
+            if erro:
+                estado["rejeitadas"] += 1
+                rejeitadas.write(json.dumps({"linha": estado["lidas"], "erro": erro}, ensure_ascii=False) + "\n")
+            else:
+                lote.append((ultimo_offset, linha))
+
+            if len(lote) >= chunk:
+                descarregar()
+
+        descarregar()
+
+    pos_importacao(tipo, afetados)
+    estado["afetados"] = {}
+    salvar_estado(caminho, estado)
+    # O .offset cobre o arquivo inteiro: o progresso no banco não é mais preciso
+    limpar_progresso(importacao)
+    click.echo("Importação concluída.")
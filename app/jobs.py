@@ -0,0 +1,398 @@
+"""
+Jobs em segundo plano para trabalhos pesados (exportação, recálculo, projeção).
+
+A rota grava o Job (tabela `jobs`, banco principal) e devolve 202 com o id;
+a execução acontece num ThreadPoolExecutor do próprio processo, com no máximo
+JOBS_MAX_WORKERS jobs simultâneos e JOBS_MAX_PENDENTES na fila. O resultado
+fica no próprio Job e é consultado em GET /api/jobs/<id>.
+
+Novos tipos são registrados com @tarefa("nome", validar=...): `validar`
+normaliza os parâmetros na requisição (ValueError → 400) e a função recebe
+(user_id, **parametros) dentro de um app context já no shard do usuário.
+Tarefas que gravam usam executar_escrita (uma operação por passo, não o job
+inteiro: o escritor atende as rotas entre um passo e outro).
+
+Jobs vivem na memória do processo que os enfileirou. Cada Job guarda o
+dono (host:pid:boot) e um heartbeat (atualizado_em), renovado a cada
+JOBS_HEARTBEAT_SEGUNDOS enquanto o processo tem jobs ativos. Job pendente ou
+executando cujo dono morreu (mesmo host, pid inexistente ou de outro boot) ou
+cujo heartbeat parou por 3 intervalos vira erro: ao subir cada processo
+(recuperar_orfaos) e na leitura em GET /api/jobs (marcar_se_orfao).
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import partial
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import db
+from app.escritor import executar_escrita
+from app.json_provider import json_bytes
+from app.models import (
+    Job,
+    User,
+    MetaPeso,
+    AtividadeFisica,
+    RotinaAlimentar,
+    CaloriasExtras,
+    ConsumoCalorico,
+)
+from app.sharding import shard_do_usuario
+
+TAREFAS = {}
+
+
+class FilaCheia(Exception):
+    """Limite de JOBS_MAX_PENDENTES atingido."""
+
+
+def tarefa(nome, validar=None):
+    def registrar(funcao):
+        TAREFAS[nome] = (funcao, validar or (lambda parametros: {}))
+        return funcao
+
+    return registrar
+
+
+# ---------------------------------------------------------
+# Executor
+# ---------------------------------------------------------
+_BOOT = {}
+
+
+def processo_atual():
+    """host:pid:boot deste processo (boot novo a cada processo, inclusive após fork)."""
+    pid = os.getpid()
+    if pid not in _BOOT:
+        _BOOT.clear()
+        _BOOT[pid] = uuid.uuid4().hex[:12]
+    return f"{socket.gethostname()}:{pid}:{_BOOT[pid]}"
+
+
+def _pid_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def dono_morto(processo):
+    """True se o dono está neste host e não existe mais (pid morto ou reaproveitado)."""
+    try:
+        host, pid, boot = processo.rsplit(":", 2)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return False
+    if pid == os.getpid():
+        return processo != processo_atual()
+    return not _pid_vivo(pid)
+
+
+class ExecutorJobs:
+    def __init__(self, app):
+        self.app = app
+        self.vagas = threading.BoundedSemaphore(app.config["JOBS_MAX_PENDENTES"])
+        self.heartbeat = app.config["JOBS_HEARTBEAT_SEGUNDOS"]
+        self.ativos = set()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def pool(self):
+        # Criado só no primeiro job: comandos CLI não sobem threads à toa
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.app.config["JOBS_MAX_WORKERS"],
+                    thread_name_prefix="job",
+                )
+                threading.Thread(target=self._bater, daemon=True, name="job-heartbeat").start()
+            return self._pool
+
+    def submeter(self, job_id):
+        with self._lock:
+            self.ativos.add(job_id)
+        self.pool().submit(self._executar, job_id)
+
+    def _executar(self, job_id):
+        try:
+            with self.app.app_context():
+                executar(job_id)
+        finally:
+            with self._lock:
+                self.ativos.discard(job_id)
+            self.vagas.release()
+
+    def _bater(self):
+        while True:
+            time.sleep(self.heartbeat)
+            with self._lock:
+                ativos = list(self.ativos)
+            if not ativos:
+                continue
+            try:
+                with self.app.app_context():
+                    _atualizar_varios(ativos, atualizado_em=datetime.utcnow())
+            except Exception:
+                self.app.logger.exception("Heartbeat dos jobs falhou")
+
+
+def init_jobs(app):
+    app.extensions["jobs"] = ExecutorJobs(app)
+
+
+ATIVOS = ("pendente", "executando")
+ERRO_ORFAO = "Interrompido: o processo que executava o job foi encerrado."
+
+
+def orfao(job, agora=None):
+    """Job ativo cujo dono morreu ou parou de mandar heartbeat."""
+    if job.status not in ATIVOS:
+        return False
+    if dono_morto(job.processo):
+        return True
+    agora = agora or datetime.utcnow()
+    ultimo = job.atualizado_em or job.iniciado_em or job.criado_em
+    return ultimo < agora - timedelta(seconds=3 * current_app.config["JOBS_HEARTBEAT_SEGUNDOS"])
+
+
+def _marcar_orfaos(jobs):
+    agora = datetime.utcnow()
+    orfaos = [job for job in jobs if orfao(job, agora)]
+    for job in orfaos:
+
+        def gravar(job_id=job.id):
+            # Só se ainda ativo: o dono pode ter terminado entre a leitura e aqui
+            db.session.execute(
+                sa.update(Job)
+                .where(Job.id == job_id, Job.status.in_(ATIVOS))
+                .values(status="erro", erro=ERRO_ORFAO, concluido_em=agora)
+            )
+
+        executar_escrita(job.user_id, gravar)
+        db.session.refresh(job)
+    return orfaos
+
+
+def marcar_se_orfao(jobs):
+    """Usado nas leituras de GET /api/jobs: atualiza os órfãos antes de responder."""
+    return _marcar_orfaos([job for job in jobs if job.status in ATIVOS])
+
+
+def recuperar_orfaos(app):
+    """Ao subir o processo: marca como erro os jobs órfãos de qualquer dono."""
+    with app.app_context():
+        try:
+            ativos = Job.query.filter(Job.status.in_(ATIVOS)).all()
+        except sa.exc.OperationalError:
+            # Banco ainda sem a tabela jobs (create_all depois do create_app)
+            db.session.rollback()
+            return
+
+        orfaos = _marcar_orfaos(ativos)
+        db.session.remove()
+        if orfaos:
+            app.logger.warning("%d job(s) órfão(s) marcados como erro", len(orfaos))
+
+
+def enfileirar(user_id, tipo, parametros):
+    """
+    Valida, grava o Job e agenda a execução; devolve job.to_dict().
+    Levanta KeyError (tipo desconhecido), ValueError (parâmetros) ou FilaCheia.
+    """
+    _, validar = TAREFAS[tipo]
+    parametros = validar(parametros or {})
+
+    executor = current_app.extensions["jobs"]
+    if not executor.vagas.acquire(blocking=False):
+        raise FilaCheia()
+
+    def gravar():
+        job = Job(uuid.uuid4().hex, int(user_id), tipo, json.dumps(parametros))
+        job.processo = processo_atual()
+        job.atualizado_em = job.criado_em
+        db.session.add(job)
+        db.session.flush()
+        return job.to_dict()
+
+    try:
+        job = executar_escrita(user_id, gravar)
+        executor.submeter(job["id"])
+    except Exception:
+        executor.vagas.release()
+        raise
+    return job
+
+
+def _atualizar(job_id, user_id, **campos):
+    def gravar():
+        db.session.execute(sa.update(Job).where(Job.id == job_id).values(**campos))
+
+    executar_escrita(user_id, gravar)
+
+
+def _atualizar_varios(job_ids, **campos):
+    def gravar():
+        db.session.execute(sa.update(Job).where(Job.id.in_(job_ids)).values(**campos))
+
+    executar_escrita(None, gravar)
+
+
+def executar(job_id):
+    """Roda o job (chamado na thread do pool, dentro de um app context)."""
+    job = db.session.get(Job, job_id)
+    user_id, tipo, parametros = job.user_id, job.tipo, json.loads(job.parametros)
+    agora = datetime.utcnow()
+    _atualizar(
+        job_id,
+        user_id,
+        status="executando",
+        iniciado_em=agora,
+        atualizado_em=agora,
+        processo=processo_atual(),
+    )
+
+    funcao, _ = TAREFAS[tipo]
+    try:
+        with shard_do_usuario(user_id):
+            resultado = funcao(user_id, **parametros)
+        campos = {"resultado": json_bytes(resultado).decode(), "status": "concluido"}
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Job %s (%s) falhou", job_id, tipo)
+        campos = {"status": "erro", "erro": str(e)}
+
+    agora = datetime.utcnow()
+    _atualizar(job_id, user_id, concluido_em=agora, atualizado_em=agora, **campos)
+
+
+# ---------------------------------------------------------
+# Validação de parâmetros
+# ---------------------------------------------------------
+def validar_intervalo(parametros):
+    """{de, ate} em AAAA-MM-DD; padrão: últimos 30 dias."""
+    ate = date.fromisoformat(parametros.get("ate") or date.today().isoformat())
+    de = date.fromisoformat(parametros.get("de") or (ate - timedelta(days=29)).isoformat())
+
+    if de > ate:
+        raise ValueError("'de' deve ser anterior ou igual a 'ate'.")
+    limite = current_app.config["JOBS_MAX_DIAS_INTERVALO"]
+    if (ate - de).days + 1 > limite:
+        raise ValueError(f"Intervalo máximo de {limite} dias.")
+    return {"de": de.isoformat(), "ate": ate.isoformat()}
+
+
+def validar_recalculo(parametros):
+    """Intervalo que não alcança a camada fria: ali ConsumoCalorico só existe no arquivo."""
+    from app.arquivo import horizonte
+
+    parametros = validar_intervalo(parametros)
+    if date.fromisoformat(parametros["de"]) < horizonte():
+        raise ValueError(
+            f"'de' deve ser a partir de {horizonte().isoformat()}; dias anteriores estão arquivados."
+        )
+    return parametros
+
+
+def validar_projecao(parametros):
+    semanas = int(parametros.get("semanas", 12))
+    if not 1 <= semanas <= 104:
+        raise ValueError("'semanas' deve estar entre 1 e 104.")
+    return {"semanas": semanas}
+
+
+def _dias(de, ate):
+    dia = date.fromisoformat(de)
+    fim = date.fromisoformat(ate)
+    while dia <= fim:
+        yield dia
+        dia += timedelta(days=1)
+
+
+# ---------------------------------------------------------
+# Tarefas
+# ---------------------------------------------------------
+@tarefa("exportar", validar=validar_intervalo)
+def exportar(user_id, de, ate):
+    """Todos os registros do usuário no intervalo, incluindo a camada fria."""
+    from app.arquivo import TABELAS_ARQUIVAVEIS, horizonte, ler_arquivo, linha_para_dict
+
+    inicio, fim = date.fromisoformat(de), date.fromisoformat(ate)
+    resultado = {"de": de, "ate": ate}
+
+    metas = MetaPeso.query.filter(
+        MetaPeso.user_id == user_id,
+        MetaPeso.data_registro >= datetime.combine(inicio, datetime.min.time()),
+        MetaPeso.data_registro < datetime.combine(fim + timedelta(days=1), datetime.min.time()),
+    ).order_by(MetaPeso.data_registro)
+    resultado["metas_peso"] = [linha_para_dict(MetaPeso, m) for m in metas]
+
+    for modelo in (RotinaAlimentar, AtividadeFisica, CaloriasExtras, ConsumoCalorico):
+        tabela = modelo.__tablename__
+        linhas = [
+            linha_para_dict(modelo, obj)
+            for obj in modelo.query.filter(
+                modelo.user_id == user_id,
+                modelo.data.between(inicio, fim),
+            ).order_by(modelo.data, modelo.id)
+        ]
+        if tabela in TABELAS_ARQUIVAVEIS and inicio < horizonte():
+            arquivadas = [
+                linha for linha in ler_arquivo(user_id, tabela, antes=fim + timedelta(days=1))
+                if linha["data"] >= de
+            ]
+            linhas = arquivadas[::-1] + linhas
+        resultado[tabela] = linhas
+
+    return resultado
+
+
+@tarefa("recalcular", validar=validar_recalculo)
+def recalcular(user_id, de, ate):
+    """Refaz ConsumoCalorico dia a dia no intervalo (ex.: após importação)."""
+    from app.routes.calculos import calcular_balanco, gravar_balanco
+
+    user = db.session.get(User, user_id)
+    dias = {}
+    for dia in _dias(de, ate):
+        resultado = calcular_balanco(user_id, user, dia)
+        executar_escrita(user_id, partial(gravar_balanco, user_id, dia, resultado))
+        dias[dia.isoformat()] = resultado["balanco"]
+    return {"de": de, "ate": ate, "dias": len(dias), "balanco_por_dia": dias}
+
+
+@tarefa("projecao", validar=validar_projecao)
+def projecao(user_id, semanas):
+    """Peso estimado semana a semana pela tendência atual."""
+    from app import tendencia
+
+    estado = tendencia.obter(user_id)
+    if estado is None:
+        return {"semanas": semanas, "tendencia": None, "pontos": []}
+
+    resumo = tendencia.calcular(estado)
+    atual = resumo["peso_estimado_hoje"]
+    por_dia = resumo["inclinacao_kg_dia"]
+    pontos = []
+    if atual is not None and por_dia is not None:
+        hoje = date.today()
+        pontos = [
+            {
+                "data": (hoje + timedelta(weeks=k)).isoformat(),
+                "peso": round(atual + por_dia * 7 * k, 2),
+            }
+            for k in range(1, semanas + 1)
+        ]
+    return {"semanas": semanas, "tendencia": resumo, "pontos": pontos}
@@ -0,0 +1,66 @@
+"""
+Provedores JSON plugáveis (Config.JSON_PROVIDER).
+
+"orjson" usa o orjson quando instalado (opcional); "default" mantém o
+provedor padrão do Flask; "auto" escolhe o orjson se disponível.
+"""
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Serialização via orjson, com o mesmo fallback de tipos do Flask e a
+    mesma ordenação de chaves (app.json.sort_keys, padrão True).
+    """
+
+    opcoes = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps_bytes(self, obj, **kwargs):
+        opcoes = self.opcoes | orjson.OPT_SORT_KEYS if self.sort_keys else self.opcoes
+        return orjson.dumps(obj, default=_default, option=opcoes)
+
+    def dumps(self, obj, **kwargs):
+        # Chamadas com argumentos do json padrão (indent, etc.) caem no provedor base
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype
+        )
+
+
+def init_json_provider(app):
+    escolha = app.config.get("JSON_PROVIDER", "auto")
+
+    if escolha == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER='orjson' requer o pacote orjson instalado.")
+
+    if escolha == "orjson" or (escolha == "auto" and orjson is not None):
+        app.json = OrjsonProvider(app)
+
+
+def json_bytes(obj):
+    """Serializa obj para bytes usando o provedor ativo do app."""
+    from flask import current_app
+
+    provedor = current_app.json
+    if hasattr(provedor, "dumps_bytes"):
+        return provedor.dumps_bytes(obj)
+    return provedor.dumps(obj, separators=(",", ":")).encode("utf-8")
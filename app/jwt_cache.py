@@ -0,0 +1,75 @@
+"""
+Cache de JWTs já verificados.
+
+Requisições repetidas com o mesmo token pulam a verificação HMAC e o parse
+das claims: o resultado fica num LRU indexado pelo digest do token, com TTL
+até o `exp` (mais JWT_DECODE_LEEWAY). A cada acerto, `exp` e `nbf` são
+conferidos de novo com a mesma tolerância do PyJWT; fora da validade, o
+decode original gera o erro apropriado. A checagem de blocklist
+(token_in_blocklist_loader) e as demais verificações do Flask-JWT-Extended
+continuam rodando a cada requisição, depois do decode, então revogações são
+respeitadas normalmente.
+"""
+
+import hashlib
+import time
+from datetime import timedelta
+
+from flask import current_app
+from flask_jwt_extended import JWTManager
+
+from app.cache import LRUCache
+
+
+class CachedJWTManager(JWTManager):
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor)
+
+        tamanho = app.config.get("JWT_DECODE_CACHE_SIZE", 0)
+        if tamanho:
+            app.extensions["jwt_cache"] = LRUCache(maxsize=tamanho)
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        cache = current_app.extensions.get("jwt_cache")
+        if cache is None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        chave = (hashlib.sha256(encoded_token.encode("utf-8")).digest(), csrf_value)
+        claims = cache.get(chave)
+        leeway = _leeway()
+
+        if claims is not None:
+            if _dentro_da_validade(claims, time.time(), leeway):
+                return dict(claims)
+            # Fora da validade: deixa o decode original gerar o erro apropriado
+            cache.delete(chave)
+
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        exp = claims.get("exp")
+        ttl = int(exp) + leeway - time.time() if exp is not None else None
+        if ttl is None or ttl > 0:
+            cache.set(chave, claims, ttl=ttl)
+
+        return dict(claims)
+
+
+def _leeway():
+    leeway = current_app.config.get("JWT_DECODE_LEEWAY", 0)
+    return leeway.total_seconds() if isinstance(leeway, timedelta) else leeway
+
+
+def _dentro_da_validade(claims, agora, leeway):
+    """Mesmas comparações de jwt.decode (_validate_exp / _validate_nbf)."""
+    exp = claims.get("exp")
+    if exp is not None and int(exp) <= agora - leeway:
+        return False
+    nbf = claims.get("nbf")
+    if nbf is not None and int(nbf) > agora + leeway:
+        return False
+    return True
+
+
+def jwt_cache_stats(app):
+    cache = app.extensions.get("jwt_cache")
+    return cache.stats() if cache is not None else None
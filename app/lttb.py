@@ -0,0 +1,70 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) em streaming.
+
+Reduz uma série ordenada a `limite` pontos preservando o formato da curva.
+Recebe um iterador e o total de pontos (conhecido por um COUNT), e mantém em
+memória apenas dois buckets por vez.
+"""
+
+
+def _area(a, b, c):
+    return abs((a[0] - c[0]) * (b[1] - a[1]) - (a[0] - b[0]) * (c[1] - a[1]))
+
+
+def _escolher(anterior, candidatos, referencia):
+    """Candidato que forma o maior triângulo com o anterior e a média da referência."""
+    media = (
+        sum(p[0] for p in referencia) / len(referencia),
+        sum(p[1] for p in referencia) / len(referencia),
+    )
+    return max(candidatos, key=lambda c: _area(anterior, c[0], media))
+
+
+def lttb(pontos, total, limite, xy):
+    """
+    pontos: iterador ordenado por x; total: quantidade de pontos;
+    limite: pontos desejados na saída; xy: item → (x, y).
+    Gera os itens selecionados, na ordem original.
+    """
+    pontos = iter(pontos)
+
+    if limite >= total or limite < 3:
+        yield from pontos
+        return
+
+    # Primeiro e último ficam sozinhos; o meio é dividido em limite-2 buckets.
+    # O bucket i cobre os índices [inicio(i), inicio(i+1)).
+    # Aritmética inteira evita erro de arredondamento no último bucket.
+    def inicio(i):
+        return (i * (total - 2)) // (limite - 2) + 1
+
+    primeiro = next(pontos)
+    yield primeiro
+    anterior = xy(primeiro)
+
+    atual, proximo = [], []
+    bucket = 0  # bucket de `atual`; `proximo` é bucket + 1
+
+    for indice, item in enumerate(pontos, start=1):
+        if indice == total - 1:
+            ultimo = xy(item)
+            if proximo:
+                escolhido = _escolher(anterior, atual, [p for p, _ in proximo])
+                yield escolhido[1]
+                anterior, atual = escolhido[0], proximo
+            escolhido = _escolher(anterior, atual, [ultimo])
+            yield escolhido[1]
+            yield item
+            return
+
+        if indice >= inicio(bucket + 2):
+            # Chegou o bucket seguinte ao "próximo": decide o atual
+            escolhido = _escolher(anterior, atual, [p for p, _ in proximo])
+            yield escolhido[1]
+            anterior, atual, proximo = escolhido[0], proximo, []
+            bucket += 1
+
+        if indice >= inicio(bucket + 1):
+            proximo.append((xy(item), item))
+        else:
+            atual.append((xy(item), item))
@@ -1,28 +1,59 @@
-from flask import request, jsonify
+import json
 
+CORS_HEADERS = [
+    ("Access-Control-Allow-Origin", "*"),
+    ("Access-Control-Allow-Headers", "Content-Type,Authorization,Idempotency-Key,X-Profile"),
+    ("Access-Control-Allow-Methods", "GET,POST,PUT,DELETE,OPTIONS"),
+]
 
-def setup_cors_middleware(app):
+PREFLIGHT_HEADERS = CORS_HEADERS + [
+    ("Access-Control-Max-Age", "3600"),
+    ("Content-Length", "0"),
+]
+
+
+class FastPathMiddleware:
     """
-    Middleware para tratar CORS em todas as requisições
+    Middleware WSGI na frente do Flask.
+
+    - Preflights (OPTIONS) e health checks são respondidos com headers e
+      corpo pré-computados, sem criar contexto de requisição do Flask.
+    - Os headers CORS das demais respostas são anexados aqui, uma única vez.
     """
 
-    @app.before_request
-    def handle_preflight():
-        if request.method == "OPTIONS":
-            response = jsonify({"status": "ok"})
-            response.headers.add("Access-Control-Allow-Origin", "*")
-            response.headers.add(
-                "Access-Control-Allow-Headers", "Content-Type,Authorization"
-            )
-            response.headers.add(
-                "Access-Control-Allow-Methods", "GET,POST,PUT,DELETE,OPTIONS"
-            )
-            response.headers.add("Access-Control-Max-Age", "3600")
-            return response, 200
-
-    @app.after_request
-    def add_cors_headers(response):
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization"
-        response.headers["Access-Control-Allow-Methods"] = "GET,POST,PUT,DELETE,OPTIONS"
-        return response
+    def __init__(self, wsgi_app, health_checks=None):
+        self.wsgi_app = wsgi_app
+        self.health_checks = {}
+
+        for path, payload in (health_checks or {}).items():
+            corpo = json.dumps(payload, separators=(",", ":")).encode("utf-8") + b"\n"
+            headers = CORS_HEADERS + [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(corpo))),
+            ]
+            self.health_checks[path] = (headers, [corpo])
+
+    def __call__(self, environ, start_response):
+        metodo = environ["REQUEST_METHOD"]
+
+        if metodo == "OPTIONS":
+            start_response("204 No Content", PREFLIGHT_HEADERS)
+            return [b""]
+
+        if metodo == "GET":
+            health = self.health_checks.get(environ.get("PATH_INFO"))
+            if health is not None:
+                start_response("200 OK", health[0])
+                return health[1]
+
+        def start_response_cors(status, headers, exc_info=None):
+            return start_response(status, headers + CORS_HEADERS, exc_info)
+
+        return self.wsgi_app(environ, start_response_cors)
+
+
+def setup_cors_middleware(app, health_checks=None):
+    """
+    Instala o FastPathMiddleware, responsável por todo o tratamento de CORS
+    """
+    app.wsgi_app = FastPathMiddleware(app.wsgi_app, health_checks)
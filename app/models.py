@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, date
 from typing import Optional, Dict, Any
 
@@ -112,6 +113,7 @@ class User(db.Model):
 
 class MetaPeso(db.Model):
     __tablename__ = "metas_peso"
+    __table_args__ = {"info": {"por_usuario": True, "mover": "id"}}
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -141,6 +143,10 @@ class MetaPeso(db.Model):
 
 class RotinaAlimentar(db.Model):
     __tablename__ = "rotina_alimentar"
+    __table_args__ = (
+        db.Index("uq_rotina_alimentar_dia", "user_id", "data", "periodo", unique=True),
+        {"info": {"por_usuario": True, "mover": "id"}},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -195,6 +201,10 @@ class RotinaAlimentar(db.Model):
 
 class AtividadeFisica(db.Model):
     __tablename__ = "atividades_fisicas"
+    __table_args__ = (
+        db.Index("uq_atividades_fisicas_dia", "user_id", "data", unique=True),
+        {"info": {"por_usuario": True, "mover": "id"}},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -234,6 +244,7 @@ class AtividadeFisica(db.Model):
 
 class CaloriasExtras(db.Model):
     __tablename__ = "calorias_extras"
+    __table_args__ = {"info": {"por_usuario": True, "mover": "id"}}
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -273,6 +284,10 @@ class CaloriasExtras(db.Model):
 
 class ConsumoCalorico(db.Model):
     __tablename__ = "consumo_calorico"
+    __table_args__ = (
+        db.Index("uq_consumo_calorico_dia", "user_id", "data", unique=True),
+        {"info": {"por_usuario": True, "mover": "id"}},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -313,3 +328,222 @@ class ConsumoCalorico(db.Model):
             "balanco": self.balanco_calorico(),
             "data": self.data.isoformat(),
         }
+
+
+# ============================================================
+# TENDÊNCIA DE PESO (somas acumuladas para regressão em O(1))
+# ============================================================
+
+
+class TendenciaPeso(db.Model):
+    __tablename__ = "tendencia_peso"
+    __table_args__ = {"info": {"por_usuario": True, "mover": "natural"}}
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    origem = db.Column(db.DateTime, nullable=False)  # x = dias desde a origem
+    ultimo_registro = db.Column(db.DateTime, nullable=False)
+    n = db.Column(db.Integer, default=0, nullable=False)
+    soma_x = db.Column(db.Float, default=0.0, nullable=False)
+    soma_y = db.Column(db.Float, default=0.0, nullable=False)
+    soma_xy = db.Column(db.Float, default=0.0, nullable=False)
+    soma_xx = db.Column(db.Float, default=0.0, nullable=False)
+    janela = db.Column(db.Text, default="[]", nullable=False)  # últimos pesos (JSON)
+    peso_meta = db.Column(db.Float, nullable=True)
+
+    def __init__(self, user_id: int, origem: datetime):
+        self.user_id = user_id
+        self.origem = origem
+        self.ultimo_registro = origem
+        self.n = 0
+        self.soma_x = 0.0
+        self.soma_y = 0.0
+        self.soma_xy = 0.0
+        self.soma_xx = 0.0
+        self.janela = "[]"
+
+
+# ============================================================
+# ADERÊNCIA ANUAL (um bit por dia para cada refeição e atividade)
+# ============================================================
+
+
+class AderenciaAnual(db.Model):
+    __tablename__ = "aderencia_anual"
+    __table_args__ = {"info": {"por_usuario": True, "mover": "natural"}}
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    ano = db.Column(db.Integer, primary_key=True)
+    bits = db.Column(db.LargeBinary, nullable=False)  # trilhas × 46 bytes
+
+    def __init__(self, user_id: int, ano: int, bits: bytes):
+        self.user_id = user_id
+        self.ano = ano
+        self.bits = bits
+
+
+# ============================================================
+# ARQUIVO DIÁRIO (camada fria: linhas antigas comprimidas por mês)
+# ============================================================
+
+
+class ArquivoDiario(db.Model):
+    __tablename__ = "arquivo_diario"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "tabela", "mes", name="uq_arquivo_usuario_mes"),
+        {"info": {"por_usuario": True, "mover": "id"}},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    tabela = db.Column(db.String(50), nullable=False)
+    mes = db.Column(db.Date, nullable=False)  # primeiro dia do mês
+    linhas = db.Column(db.Integer, default=0, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)  # JSON comprimido (zlib)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __init__(self, user_id: int, tabela: str, mes: date, linhas: int, payload: bytes):
+        self.user_id = user_id
+        self.tabela = tabela
+        self.mes = mes
+        self.linhas = linhas
+        self.payload = payload
+
+
+# ============================================================
+# PROGRESSO DE IMPORTAÇÃO (offset gravado na transação do lote)
+# ============================================================
+
+
+class ProgressoImportacao(db.Model):
+    __tablename__ = "importacao_progresso"
+    __table_args__ = {"info": {"por_usuario": True, "mover": "natural"}}
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    importacao = db.Column(db.String(40), primary_key=True)  # hash de tipo + arquivo
+    offset = db.Column(db.BigInteger, nullable=False)  # fim da última linha gravada
+
+
+# ============================================================
+# RANKING DE DÉFICIT (banco principal, atualizado incrementalmente)
+# ============================================================
+
+
+class RankingDeficit(db.Model):
+    __tablename__ = "ranking_deficit"
+    __table_args__ = (
+        db.UniqueConstraint("periodo", "inicio", "user_id", name="uq_ranking_usuario"),
+        db.Index("ix_ranking_posicao", "periodo", "inicio", "posicao"),
+        # Faixas de déficit deslocadas a cada escrita (ranking._reposicionar)
+        db.Index("ix_ranking_deficit", "periodo", "inicio", "deficit"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    periodo = db.Column(db.String(10), nullable=False)  # "semana" | "mes"
+    inicio = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    deficit = db.Column(db.Integer, default=0, nullable=False)
+    dias = db.Column(db.Integer, default=0, nullable=False)
+    posicao = db.Column(db.Integer, nullable=True)
+
+    def __init__(self, periodo: str, inicio: date, user_id: int):
+        self.periodo = periodo
+        self.inicio = inicio
+        self.user_id = user_id
+        self.deficit = 0
+        self.dias = 0
+
+
+class RankingPeriodo(db.Model):
+    __tablename__ = "ranking_periodo"
+
+    periodo = db.Column(db.String(10), primary_key=True)
+    inicio = db.Column(db.Date, primary_key=True)
+    # Sempre False após a carga: as posições são mantidas a cada escrita.
+    # Mantido por compatibilidade com bancos existentes (NOT NULL).
+    sujo = db.Column(db.Boolean, default=True, nullable=False)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __init__(self, periodo: str, inicio: date):
+        self.periodo = periodo
+        self.inicio = inicio
+        self.sujo = True
+
+
+# ============================================================
+# NOTIFICAÇÕES (versão por usuário, fan-out entre workers)
+# ============================================================
+
+
+class NotificacaoUsuario(db.Model):
+    __tablename__ = "notificacoes_usuario"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, default=0, nullable=False)
+
+
+# ============================================================
+# SHARD USUÁRIOS (diretório do sharding, banco principal)
+# ============================================================
+
+
+class ShardUsuario(db.Model):
+    __tablename__ = "shard_usuarios"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    shard = db.Column(db.Integer, nullable=False)
+
+
+# ============================================================
+# JOBS (tarefas em segundo plano, banco principal)
+# ============================================================
+
+
+class Job(db.Model):
+    __tablename__ = "jobs"
+    __table_args__ = (db.Index("ix_jobs_user_criado", "user_id", "criado_em"),)
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    tipo = db.Column(db.String(30), nullable=False)
+    parametros = db.Column(db.Text, default="{}", nullable=False)  # JSON
+    status = db.Column(db.String(15), default="pendente", nullable=False)
+    resultado = db.Column(db.Text, nullable=True)  # JSON
+    erro = db.Column(db.Text, nullable=True)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime, nullable=True)
+    concluido_em = db.Column(db.DateTime, nullable=True)
+    # Dono (host:pid:boot) e heartbeat: job de processo morto vira erro
+    processo = db.Column(db.String(120), nullable=True)
+    atualizado_em = db.Column(db.DateTime, nullable=True)
+
+    def __init__(self, id: str, user_id: int, tipo: str, parametros: str):
+        self.id = id
+        self.user_id = user_id
+        self.tipo = tipo
+        self.parametros = parametros
+        self.status = "pendente"
+        self.criado_em = datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "parametros": json.loads(self.parametros),
+            "status": self.status,
+            "erro": self.erro,
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "iniciado_em": self.iniciado_em.isoformat() if self.iniciado_em else None,
+            "concluido_em": self.concluido_em.isoformat() if self.concluido_em else None,
+        }
+
+
+# ============================================================
+# VERSÃO DO PERFIL (valida o snapshot de perfil nos tokens)
+# ============================================================
+
+
+class VersaoPerfil(db.Model):
+    __tablename__ = "versao_perfil"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, default=0, nullable=False)
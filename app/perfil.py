@@ -0,0 +1,115 @@
+"""
+Snapshot do perfil nas claims do access token (PERFIL_NO_TOKEN=1).
+
+Login, refresh e cadastro embutem {"v", "altura", "idade", "profissao",
+"peso"} na claim `perfil`. As rotas de cálculo usam o snapshot em vez de
+carregar User e a última MetaPeso, desde que `v` seja igual à versão atual
+do perfil (tabela versao_perfil). update_user, criar_meta e a importação
+de pesos incrementam a versão; snapshots antigos caem no caminho do banco.
+
+A versão fica num cache com TTL curto (PERFIL_VERSAO_CACHE_TTL). Com
+CACHE_BACKEND local, outro worker pode aceitar um snapshot desatualizado por
+no máximo esse intervalo; com sqlite/redis o cache é o mesmo para todos.
+"""
+
+from types import SimpleNamespace
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_jwt_extended import get_jwt
+
+from app import db
+from app.cache_backends import criar_cache
+from app.models import MetaPeso, VersaoPerfil
+from app.sharding import shard_do_usuario
+
+CLAIM = "perfil"
+
+
+def _cache():
+    app = current_app._get_current_object()
+    cache = app.extensions.get("perfil_versoes")
+    if cache is None:
+        cache = app.extensions["perfil_versoes"] = criar_cache(
+            app,
+            "perfil_versoes",
+            maxsize=4096,
+            ttl=app.config["PERFIL_VERSAO_CACHE_TTL"],
+            compartilhado=True,
+        )
+    return cache
+
+
+def versao(user_id):
+    user_id = int(user_id)
+    cache = _cache()
+    atual = cache.get(user_id)
+    if atual is None:
+        atual = db.session.execute(
+            sa.select(VersaoPerfil.versao).where(VersaoPerfil.user_id == user_id)
+        ).scalar() or 0
+        cache.set(user_id, atual)
+    return atual
+
+
+def incrementar(user_id):
+    """Invalida snapshots emitidos antes (chamar antes do commit da alteração)."""
+    user_id = int(user_id)
+    t = VersaoPerfil.__table__
+    nova = db.session.execute(
+        t.update()
+        .where(t.c.user_id == user_id)
+        .values(versao=t.c.versao + 1)
+        .returning(t.c.versao)
+    ).scalar()
+    if nova is None:
+        nova = 1
+        db.session.execute(t.insert().values(user_id=user_id, versao=nova))
+
+    # Se a transação for desfeita, o cache fica à frente do banco: os tokens
+    # só deixam de casar com a versão e caem no caminho do banco.
+    _cache().set(user_id, nova)
+
+
+def peso_atual(user_id, user):
+    with shard_do_usuario(user_id):
+        peso = db.session.execute(
+            sa.select(MetaPeso.peso_atual)
+            .where(MetaPeso.user_id == int(user_id))
+            .order_by(MetaPeso.data_registro.desc())
+            .limit(1)
+        ).scalar()
+    try:
+        return float(peso or user.peso_inicial or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def claims(user):
+    """additional_claims para create_access_token ({} se desabilitado)."""
+    if not current_app.config.get("PERFIL_NO_TOKEN"):
+        return {}
+
+    return {
+        CLAIM: {
+            "v": versao(user.id),
+            "altura": user.altura,
+            "idade": user.idade,
+            "profissao": user.profissao,
+            "peso": peso_atual(user.id, user),
+        }
+    }
+
+
+def do_token(user_id):
+    """
+    Snapshot do token atual se ainda válido, senão None.
+    Expõe os mesmos atributos usados de User nos cálculos, mais `peso`.
+    """
+    if not current_app.config.get("PERFIL_NO_TOKEN"):
+        return None
+
+    snapshot = get_jwt().get(CLAIM)
+    if not snapshot or snapshot.get("v") != versao(user_id):
+        return None
+    return SimpleNamespace(**snapshot)
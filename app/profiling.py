@@ -0,0 +1,268 @@
+"""
+Profiling sob demanda de requisições.
+
+Uma requisição é perfilada quando:
+    - traz o header `X-Profile: <expira>.<assinatura>`, com a assinatura
+      HMAC do ADMIN_TOKEN gerada por `flask profiling assinar` (pode ser
+      entregue ao usuário que reporta a lentidão, vale até `expira`); ou
+    - cai na amostragem PROFILE_SAMPLE_RATE (0 a 1).
+
+Para cada requisição perfilada é criada uma pasta em PROFILE_DIR
+(instance/profiles) com:
+    perfil.pstats   cProfile (python -m pstats, snakeviz)
+    pilhas.folded   pilhas colapsadas de uma thread amostradora
+                    (flamegraph.pl, speedscope)
+    sql.json        linha do tempo das queries e metadados da requisição
+    resumo.txt      top 30 funções por tempo acumulado
+
+A resposta recebe `X-Profile-Id` com o nome da pasta. Sem ADMIN_TOKEN e com
+amostragem 0 nada é instalado; caso contrário, uma requisição comum custa
+um lookup de header e um sorteio, e cada query uma leitura de ContextVar.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.admin import assinar, assinatura_valida
+
+HEADER_ENVIRON = "HTTP_X_PROFILE"
+ARQUIVOS = ("perfil.pstats", "pilhas.folded", "sql.json", "resumo.txt")
+
+_sessao_atual = ContextVar("profiling_sessao", default=None)
+_listeners_instalados = False
+
+
+# ---------------------------------------------------------
+# Linha do tempo SQL
+# ---------------------------------------------------------
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    sessao = _sessao_atual.get()
+    if sessao is not None:
+        context._profiling_inicio = time.perf_counter()
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    sessao = _sessao_atual.get()
+    inicio = getattr(context, "_profiling_inicio", None)
+    if sessao is None or inicio is None:
+        return
+    agora = time.perf_counter()
+    # Sem parâmetros: podem conter hashes de senha e dados pessoais
+    sessao.sql.append(
+        {
+            "inicio_ms": round((inicio - sessao.inicio) * 1000, 3),
+            "duracao_ms": round((agora - inicio) * 1000, 3),
+            "banco": conn.engine.url.database,
+            "executemany": executemany,
+            "sql": statement[:2000],
+        }
+    )
+
+
+def _instalar_listeners():
+    global _listeners_instalados
+    if not _listeners_instalados:
+        event.listen(Engine, "before_cursor_execute", _antes_sql)
+        event.listen(Engine, "after_cursor_execute", _depois_sql)
+        _listeners_instalados = True
+
+
+# ---------------------------------------------------------
+# Amostrador de pilhas
+# ---------------------------------------------------------
+def _rotulo(frame):
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+
+class Amostrador(threading.Thread):
+    """Lê a pilha da thread da requisição a cada `intervalo` segundos."""
+
+    def __init__(self, thread_id, intervalo):
+        super().__init__(daemon=True, name="profiling-amostrador")
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None:
+                pilha.append(_rotulo(frame))
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def collapsed(self):
+        return "".join(f"{pilha} {n}\n" for pilha, n in self.pilhas.most_common())
+
+
+# ---------------------------------------------------------
+# Sessão de profiling de uma requisição
+# ---------------------------------------------------------
+class SessaoProfiling:
+    def __init__(self, environ, motivo, intervalo):
+        self.environ = environ
+        self.motivo = motivo
+        self.nome = "{}-{}-{}-{}".format(
+            time.strftime("%Y%m%d-%H%M%S"),
+            environ["REQUEST_METHOD"],
+            re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "")).strip("_")[:60],
+            uuid.uuid4().hex[:6],
+        )
+        self.sql = []
+        self.status = None
+        self.perfil = cProfile.Profile()
+        self.amostrador = Amostrador(threading.get_ident(), intervalo)
+        self.inicio = None
+        self.duracao = None
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        self.amostrador.start()
+        self.perfil.enable()
+
+    def encerrar(self):
+        self.perfil.disable()
+        self.amostrador.parar.set()
+        self.amostrador.join()
+        self.duracao = time.perf_counter() - self.inicio
+
+    def gravar(self, diretorio):
+        pasta = os.path.join(diretorio, self.nome)
+        os.makedirs(pasta, exist_ok=True)
+
+        self.perfil.dump_stats(os.path.join(pasta, "perfil.pstats"))
+
+        resumo = io.StringIO()
+        pstats.Stats(self.perfil, stream=resumo).sort_stats("cumulative").print_stats(30)
+        with open(os.path.join(pasta, "resumo.txt"), "w", encoding="utf-8") as f:
+            f.write(resumo.getvalue())
+
+        with open(os.path.join(pasta, "pilhas.folded"), "w", encoding="utf-8") as f:
+            f.write(self.amostrador.collapsed())
+
+        with open(os.path.join(pasta, "sql.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "metodo": self.environ["REQUEST_METHOD"],
+                    "caminho": self.environ.get("PATH_INFO"),
+                    "query_string": self.environ.get("QUERY_STRING"),
+                    "status": self.status,
+                    "motivo": self.motivo,
+                    "duracao_ms": round(self.duracao * 1000, 3),
+                    "total_sql_ms": round(sum(q["duracao_ms"] for q in self.sql), 3),
+                    "queries": self.sql,
+                },
+                f,
+                ensure_ascii=False,
+                indent=1,
+            )
+
+
+def podar(diretorio, maximo):
+    """Mantém só as `maximo` pastas mais recentes."""
+    try:
+        pastas = sorted(e for e in os.listdir(diretorio) if os.path.isdir(os.path.join(diretorio, e)))
+    except FileNotFoundError:
+        return
+    for nome in pastas[:-maximo] if maximo else []:
+        shutil.rmtree(os.path.join(diretorio, nome), ignore_errors=True)
+
+
+# ---------------------------------------------------------
+# Middleware WSGI
+# ---------------------------------------------------------
+class ProfilingMiddleware:
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.segredo = app.config.get("ADMIN_TOKEN")
+        self.taxa = app.config["PROFILE_SAMPLE_RATE"]
+        self.intervalo = app.config["PROFILE_INTERVALO_MS"] / 1000
+        self.maximo = app.config["PROFILE_MAX_ARQUIVOS"]
+        self.diretorio = diretorio_profiles(app)
+
+    def motivo(self, environ):
+        valor = environ.get(HEADER_ENVIRON)
+        if valor and self.segredo:
+            expira, _, assinatura = valor.partition(".")
+            if (
+                expira.isdigit()
+                and int(expira) >= time.time()
+                and assinatura_valida(expira, assinatura, self.segredo)
+            ):
+                return "header"
+        if self.taxa and random.random() < self.taxa:
+            return "amostragem"
+        return None
+
+    def __call__(self, environ, start_response):
+        motivo = self.motivo(environ)
+        if motivo is None:
+            return self.wsgi_app(environ, start_response)
+
+        sessao = SessaoProfiling(environ, motivo, self.intervalo)
+
+        def start_response_perfil(status, headers, exc_info=None):
+            sessao.status = int(status.split(" ", 1)[0])
+            return start_response(status, headers + [("X-Profile-Id", sessao.nome)], exc_info)
+
+        token = _sessao_atual.set(sessao)
+        sessao.iniciar()
+        try:
+            return self.wsgi_app(environ, start_response_perfil)
+        finally:
+            sessao.encerrar()
+            _sessao_atual.reset(token)
+            sessao.gravar(self.diretorio)
+            podar(self.diretorio, self.maximo)
+
+
+def init_profiling(app):
+    if not app.config.get("ADMIN_TOKEN") and not app.config["PROFILE_SAMPLE_RATE"]:
+        return
+    _instalar_listeners()
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app)
+
+
+def diretorio_profiles(app=None):
+    app = app or current_app
+    return app.config["PROFILE_DIR"] or os.path.join(app.instance_path, "profiles")
+
+
+# ---------------------------------------------------------
+# CLI: flask profiling ...
+# ---------------------------------------------------------
+@click.group("profiling")
+def profiling_cli():
+    """Profiling sob demanda de requisições."""
+
+
+@profiling_cli.command("assinar")
+@click.option("--minutos", default=30, show_default=True, type=int)
+@with_appcontext
+def assinar_cmd(minutos):
+    """Gera o valor do header X-Profile válido por N minutos."""
+    if not current_app.config.get("ADMIN_TOKEN"):
+        raise click.ClickException("Configure ADMIN_TOKEN para assinar o header.")
+    expira = str(int(time.time()) + minutos * 60)
+    click.echo(f"X-Profile: {expira}.{assinar(expira)}")
@@ -0,0 +1,197 @@
+"""
+Provisionamento de usuários em lote (onboarding corporativo).
+
+Diferente do /api/auth/cadastro (uma busca, um hash e dois commits por
+pessoa), cada lote faz:
+    - uma consulta IN para telefones já cadastrados;
+    - os hashes de senha em paralelo (hashlib.scrypt libera o GIL);
+    - INSERT multi-linha de users (RETURNING id) e das metas iniciais,
+      numa única transação.
+
+Usado por POST /api/admin/usuarios e por `flask usuarios provisionar`.
+"""
+
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User, MetaPeso
+from app.sharding import shard_por_hash, sharding_ativo, total_shards, usar_shard
+
+# Mesmos padrões do /api/auth/cadastro
+PADROES = {
+    "altura": 1.67,
+    "peso_inicial": 103.0,
+    "profissao": "Não informado",
+    "idade": 18,
+    "peso_meta": 85.0,
+}
+
+
+def normalizar(registro, profissao_padrao=None):
+    """Retorna (dados, None) ou (None, motivo)."""
+    nome = str(registro.get("nome") or "").strip()
+    telefone = str(registro.get("telefone") or "").strip()
+    senha = registro.get("senha")
+
+    if not nome or not telefone or not senha:
+        return None, "Nome, telefone e senha são obrigatórios."
+
+    try:
+        dados = {
+            "nome": nome,
+            "telefone": telefone,
+            "senha": str(senha),
+            "altura": float(registro.get("altura") or PADROES["altura"]),
+            "peso_inicial": float(registro.get("peso_inicial") or PADROES["peso_inicial"]),
+            "profissao": registro.get("profissao") or profissao_padrao or PADROES["profissao"],
+            "idade": int(registro.get("idade") or PADROES["idade"]),
+            "peso_meta": float(registro.get("peso_meta") or PADROES["peso_meta"]),
+        }
+    except (TypeError, ValueError):
+        return None, "Valores numéricos inválidos."
+    return dados, None
+
+
+def _telefones_existentes(telefones):
+    if not telefones:
+        return set()
+    return set(
+        db.session.scalars(sa.select(User.telefone).where(User.telefone.in_(telefones)))
+    )
+
+
+def _gravar_lote(lote, hashes):
+    """Users + metas do lote numa transação. Retorna {telefone: id}."""
+    linhas_usuarios = [
+        {
+            "nome": dados["nome"],
+            "telefone": dados["telefone"],
+            "senha_hash": senha_hash,
+            "altura": dados["altura"],
+            "peso_inicial": dados["peso_inicial"],
+            "profissao": dados["profissao"],
+            "idade": dados["idade"],
+        }
+        for dados, senha_hash in zip(lote, hashes)
+    ]
+    ids = dict(
+        db.session.execute(
+            sa.insert(User).returning(User.telefone, User.id, sort_by_parameter_order=True),
+            linhas_usuarios,
+        ).all()
+    )
+
+    # Usuários novos não têm entrada no diretório: o shard é o do hash
+    por_shard = {}
+    for dados in lote:
+        user_id = ids[dados["telefone"]]
+        shard = shard_por_hash(user_id, total_shards()) if sharding_ativo() else None
+        por_shard.setdefault(shard, []).append(
+            {
+                "user_id": user_id,
+                "peso_atual": dados["peso_inicial"],
+                "peso_meta": dados["peso_meta"],
+            }
+        )
+
+    for shard, metas in por_shard.items():
+        with usar_shard(shard):
+            db.session.execute(sa.insert(MetaPeso), metas)
+
+    db.session.commit()
+    return ids
+
+
+def provisionar(registros, chunk=None, profissao_padrao=None):
+    """
+    Cria os usuários válidos e não duplicados.
+    Retorna {"criados": [...], "duplicados": [...], "invalidos": [...]}.
+    """
+    chunk = chunk or current_app.config["PROVISIONAMENTO_CHUNK"]
+    resultado = {"criados": [], "duplicados": [], "invalidos": []}
+
+    validos, vistos = [], set()
+    for indice, registro in enumerate(registros):
+        dados, erro = normalizar(registro or {}, profissao_padrao)
+        if erro:
+            resultado["invalidos"].append({"indice": indice, "erro": erro})
+        elif dados["telefone"] in vistos:
+            resultado["duplicados"].append(dados["telefone"])
+        else:
+            vistos.add(dados["telefone"])
+            validos.append(dados)
+
+    workers = current_app.config["PROVISIONAMENTO_HASH_WORKERS"] or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for inicio in range(0, len(validos), chunk):
+            lote = validos[inicio:inicio + chunk]
+
+            # Uma nova tentativa se um cadastro concorrente ocupar um telefone
+            for tentativa in range(2):
+                existentes = _telefones_existentes([d["telefone"] for d in lote])
+                resultado["duplicados"].extend(sorted(existentes))
+                lote = [d for d in lote if d["telefone"] not in existentes]
+                if not lote:
+                    break
+
+                hashes = list(executor.map(generate_password_hash, [d["senha"] for d in lote]))
+                try:
+                    ids = _gravar_lote(lote, hashes)
+                except IntegrityError:
+                    db.session.rollback()
+                    if tentativa:
+                        raise
+                    continue
+
+                resultado["criados"].extend(
+                    {"id": ids[d["telefone"]], "telefone": d["telefone"]} for d in lote
+                )
+                break
+
+    return resultado
+
+
+# ---------------------------------------------------------
+# CLI: flask usuarios provisionar <arquivo>
+# ---------------------------------------------------------
+def ler_registros(caminho):
+    """CSV com cabeçalho, lista JSON ou NDJSON."""
+    with open(caminho, encoding="utf-8-sig") as arquivo:
+        if caminho.endswith(".csv"):
+            return list(csv.DictReader(arquivo))
+        if caminho.endswith((".ndjson", ".jsonl")):
+            return [json.loads(linha) for linha in arquivo if linha.strip()]
+        return json.load(arquivo)
+
+
+@click.group("usuarios")
+def usuarios_cli():
+    """Administração de usuários."""
+
+
+@usuarios_cli.command("provisionar")
+@click.argument("caminho", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk", type=int, default=None, help="Padrão: PROVISIONAMENTO_CHUNK.")
+@click.option("--profissao", default=None, help="Profissão para quem não informar (ex.: Estoquista).")
+@with_appcontext
+def provisionar_cmd(caminho, chunk, profissao):
+    """Cria usuários (e metas iniciais) a partir de CSV/JSON/NDJSON."""
+    resultado = provisionar(ler_registros(caminho), chunk=chunk, profissao_padrao=profissao)
+
+    click.echo(
+        f"{len(resultado['criados'])} criados, "
+        f"{len(resultado['duplicados'])} duplicados, "
+        f"{len(resultado['invalidos'])} inválidos."
+    )
+    for invalido in resultado["invalidos"][:20]:
+        click.echo(f"  registro {invalido['indice']}: {invalido['erro']}")
@@ -0,0 +1,253 @@
+"""
+Ranking de déficit calórico por período (semana/mês).
+
+`ranking_deficit` guarda o agregado e a posição de cada usuário no período.
+Cada escrita em ConsumoCalorico recalcula o agregado daquele usuário e
+ajusta as posições na mesma transação: com RANK() por déficit decrescente,
+a posição é 1 + nº de participantes com déficit maior, então só quem tem
+déficit entre o valor antigo e o novo anda uma casa. A primeira escrita de
+um período faz a carga completa (materializar).
+
+A leitura nunca escreve: período materializado é O(página) pelo índice
+(periodo, inicio, posicao) e a posição do próprio usuário é um lookup pela
+chave única; período ainda sem escritas é classificado em memória, sem gravar.
+"""
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import sqlalchemy as sa
+
+from app import db
+from app.models import ConsumoCalorico, RankingDeficit, RankingPeriodo
+from app.sharding import engines_dos_shards, shard_do_usuario
+
+PERIODOS = ("semana", "mes")
+
+
+# ---------------------------------------------------------
+# Períodos
+# ---------------------------------------------------------
+def intervalo(periodo, referencia=None):
+    """(inicio, fim) inclusivos do período que contém `referencia`."""
+    referencia = referencia or date.today()
+
+    if periodo == "semana":
+        inicio = referencia - timedelta(days=referencia.weekday())
+        return inicio, inicio + timedelta(days=6)
+
+    if periodo == "mes":
+        inicio = referencia.replace(day=1)
+        proximo = (inicio + timedelta(days=32)).replace(day=1)
+        return inicio, proximo - timedelta(days=1)
+
+    raise ValueError(f"Período inválido: {periodo}")
+
+
+def _expressao_deficit():
+    return sa.func.coalesce(
+        sa.func.sum(ConsumoCalorico.calorias_gastas - ConsumoCalorico.calorias_consumidas),
+        0,
+    )
+
+
+def _agregados(periodo, inicio):
+    """[(user_id, deficit, dias)] do período, somando todos os shards."""
+    _, fim = intervalo(periodo, inicio)
+    consulta = (
+        sa.select(ConsumoCalorico.user_id, _expressao_deficit(), sa.func.count())
+        .where(ConsumoCalorico.data.between(inicio, fim))
+        .group_by(ConsumoCalorico.user_id)
+    )
+    agregados = []
+    for _, engine in engines_dos_shards(db):
+        with engine.connect() as conn:
+            agregados += [(uid, int(deficit), int(dias)) for uid, deficit, dias in conn.execute(consulta)]
+    return agregados
+
+
+def _do_periodo(periodo, inicio):
+    t = RankingDeficit.__table__
+    return (t.c.periodo == periodo) & (t.c.inicio == inicio)
+
+
+# ---------------------------------------------------------
+# Atualização incremental
+# ---------------------------------------------------------
+def registrar_consumo(user_id, dia):
+    """
+    Atualiza agregado e posições do usuário nos períodos que contêm `dia`.
+    Chamada após gravar ConsumoCalorico, antes do commit.
+    """
+    user_id = int(user_id)
+
+    for periodo in PERIODOS:
+        inicio, fim = intervalo(periodo, dia)
+
+        if db.session.get(RankingPeriodo, (periodo, inicio)) is None:
+            # Primeira escrita do período. A carga lê por conexões próprias e
+            # não vê a escrita desta transação: o ajuste abaixo a aplica.
+            materializar(periodo, inicio)
+
+        with shard_do_usuario(user_id):
+            deficit, dias = db.session.execute(
+                sa.select(_expressao_deficit(), sa.func.count()).where(
+                    ConsumoCalorico.user_id == user_id,
+                    ConsumoCalorico.data.between(inicio, fim),
+                )
+            ).one()
+
+        linha = RankingDeficit.query.filter_by(
+            periodo=periodo, inicio=inicio, user_id=user_id
+        ).first()
+        anterior = None
+        if linha is None:
+            linha = RankingDeficit(periodo=periodo, inicio=inicio, user_id=user_id)
+            db.session.add(linha)
+        else:
+            anterior = linha.deficit
+
+        linha.deficit = int(deficit)
+        linha.dias = int(dias)
+        db.session.flush()
+        _reposicionar(periodo, inicio, linha, anterior)
+
+
+def _reposicionar(periodo, inicio, linha, anterior):
+    """
+    Ajusta as posições após o déficit do usuário ir de `anterior` (None =
+    entrou agora) para linha.deficit. Só as linhas cujo "déficit maior que o
+    meu" mudou de resposta andam uma casa.
+    """
+    t = RankingDeficit.__table__
+    outros = _do_periodo(periodo, inicio) & (t.c.id != linha.id)
+    novo = linha.deficit
+
+    if anterior is None:
+        passos = [(+1, t.c.deficit < novo)]
+    elif novo > anterior:
+        passos = [(+1, (t.c.deficit >= anterior) & (t.c.deficit < novo))]
+    elif novo < anterior:
+        passos = [(-1, (t.c.deficit >= novo) & (t.c.deficit < anterior))]
+    else:
+        passos = []
+
+    for delta, faixa in passos:
+        db.session.execute(t.update().where(outros & faixa).values(posicao=t.c.posicao + delta))
+
+    linha.posicao = 1 + db.session.scalar(
+        sa.select(sa.func.count()).select_from(t).where(outros & (t.c.deficit > novo))
+    )
+
+
+def materializar(periodo, inicio):
+    """Carga completa do período a partir de ConsumoCalorico (todos os shards)."""
+    RankingDeficit.query.filter_by(periodo=periodo, inicio=inicio).delete()
+
+    linhas = [
+        {"periodo": periodo, "inicio": inicio, "user_id": uid, "deficit": deficit, "dias": dias}
+        for uid, deficit, dias in _agregados(periodo, inicio)
+    ]
+    if linhas:
+        db.session.execute(RankingDeficit.__table__.insert(), linhas)
+
+    estado = db.session.get(RankingPeriodo, (periodo, inicio))
+    if estado is None:
+        estado = RankingPeriodo(periodo=periodo, inicio=inicio)
+        db.session.add(estado)
+    estado.atualizado_em = datetime.utcnow()
+    reclassificar(periodo, inicio)
+
+
+def reclassificar(periodo, inicio):
+    """Recalcula todas as posições do período com uma window function."""
+    t = RankingDeficit.__table__
+    posicoes = db.session.execute(
+        sa.select(
+            t.c.id,
+            sa.func.rank().over(order_by=t.c.deficit.desc()).label("posicao"),
+        ).where(_do_periodo(periodo, inicio))
+    ).all()
+
+    if posicoes:
+        db.session.execute(
+            t.update()
+            .where(t.c.id == sa.bindparam("_id"))
+            .values(posicao=sa.bindparam("_posicao")),
+            [{"_id": id_, "_posicao": posicao} for id_, posicao in posicoes],
+        )
+
+    db.session.get(RankingPeriodo, (periodo, inicio)).sujo = False
+
+
+# ---------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------
+def pagina(periodo, inicio, offset, limite):
+    from app.models import User
+
+    return db.session.execute(
+        sa.select(
+            RankingDeficit.posicao,
+            RankingDeficit.user_id,
+            User.nome,
+            RankingDeficit.deficit,
+            RankingDeficit.dias,
+        )
+        .join(User, User.id == RankingDeficit.user_id)
+        .where(RankingDeficit.periodo == periodo, RankingDeficit.inicio == inicio)
+        .order_by(RankingDeficit.posicao.asc(), RankingDeficit.user_id.asc())
+        .offset(offset)
+        .limit(limite)
+    ).all()
+
+
+def posicao_usuario(periodo, inicio, user_id):
+    return RankingDeficit.query.filter_by(
+        periodo=periodo, inicio=inicio, user_id=int(user_id)
+    ).first()
+
+
+def total_participantes(periodo, inicio):
+    return db.session.scalar(
+        sa.select(sa.func.count())
+        .select_from(RankingDeficit)
+        .where(RankingDeficit.periodo == periodo, RankingDeficit.inicio == inicio)
+    )
+
+
+def classificacao(periodo, inicio, offset, limite, user_id):
+    """(linhas da página, posição do usuário ou None, total) — só leitura."""
+    if db.session.get(RankingPeriodo, (periodo, inicio)) is not None:
+        return (
+            pagina(periodo, inicio, offset, limite),
+            posicao_usuario(periodo, inicio, user_id),
+            total_participantes(periodo, inicio),
+        )
+    return _classificacao_em_memoria(periodo, inicio, offset, limite, user_id)
+
+
+def _classificacao_em_memoria(periodo, inicio, offset, limite, user_id):
+    """Período sem escritas desde que o ranking existe: RANK() em Python, sem gravar."""
+    from app.models import User
+
+    agregados = sorted(_agregados(periodo, inicio), key=lambda a: (-a[1], a[0]))
+    classificados = []
+    for i, (uid, deficit, dias) in enumerate(agregados):
+        empatado = classificados and classificados[-1].deficit == deficit
+        posicao = classificados[-1].posicao if empatado else i + 1
+        classificados.append(SimpleNamespace(posicao=posicao, user_id=uid, deficit=deficit, dias=dias))
+
+    fatia = classificados[offset:offset + limite]
+    nomes = dict(
+        db.session.execute(
+            sa.select(User.id, User.nome).where(User.id.in_([c.user_id for c in fatia]))
+        ).all()
+    )
+    linhas = [
+        (c.posicao, c.user_id, nomes[c.user_id], c.deficit, c.dias)
+        for c in fatia
+        if c.user_id in nomes
+    ]
+    minha = next((c for c in classificados if c.user_id == int(user_id)), None)
+    return linhas, minha, len(classificados)
@@ -0,0 +1,277 @@
+"""
+Cliente mínimo do protocolo Redis (RESP2) e um servidor local substituto.
+
+O cliente cobre só o que o backend de cache usa (GET, SET PX, DEL, KEYS,
+PUBLISH, SUBSCRIBE, PING), sem dependência externa. O servidor local
+implementa os mesmos comandos em memória para desenvolvimento e testes:
+
+    flask cache servidor-local --porta 6390
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6390/0 flask run
+"""
+
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class ErroRESP(Exception):
+    """Resposta de erro (-ERR ...) do servidor."""
+
+
+# ---------------------------------------------------------
+# Codificação
+# ---------------------------------------------------------
+def _bytes(valor):
+    if isinstance(valor, bytes):
+        return valor
+    return str(valor).encode()
+
+
+def codificar_comando(*partes):
+    saida = [b"*%d\r\n" % len(partes)]
+    for parte in partes:
+        parte = _bytes(parte)
+        saida.append(b"$%d\r\n%s\r\n" % (len(parte), parte))
+    return b"".join(saida)
+
+
+def ler_resposta(arquivo):
+    linha = arquivo.readline()
+    if not linha:
+        raise ConnectionError("Conexão RESP fechada.")
+
+    tipo, resto = linha[:1], linha[1:-2]
+    if tipo == b"+":
+        return resto.decode()
+    if tipo == b"-":
+        raise ErroRESP(resto.decode())
+    if tipo == b":":
+        return int(resto)
+    if tipo == b"$":
+        tamanho = int(resto)
+        if tamanho < 0:
+            return None
+        dados = arquivo.read(tamanho + 2)
+        return dados[:-2]
+    if tipo == b"*":
+        tamanho = int(resto)
+        if tamanho < 0:
+            return None
+        return [ler_resposta(arquivo) for _ in range(tamanho)]
+    raise ConnectionError(f"Resposta RESP inválida: {linha!r}")
+
+
+# ---------------------------------------------------------
+# Cliente
+# ---------------------------------------------------------
+class ClienteRESP:
+    """Uma conexão por thread; reconecta uma vez em caso de queda."""
+
+    def __init__(self, url, timeout=2.0):
+        partes = urlparse(url)
+        self.host = partes.hostname or "127.0.0.1"
+        self.porta = partes.port or 6379
+        self.db = int((partes.path or "/0").strip("/") or 0)
+        self.senha = partes.password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conectar(self):
+        sock = socket.create_connection((self.host, self.porta), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        arquivo = sock.makefile("rb")
+        conexao = (sock, arquivo)
+        if self.senha:
+            self._enviar(conexao, "AUTH", self.senha)
+        if self.db:
+            self._enviar(conexao, "SELECT", self.db)
+        return conexao
+
+    @staticmethod
+    def _enviar(conexao, *partes):
+        sock, arquivo = conexao
+        sock.sendall(codificar_comando(*partes))
+        return ler_resposta(arquivo)
+
+    def comando(self, *partes):
+        for tentativa in range(2):
+            conexao = getattr(self._local, "conexao", None)
+            if conexao is None:
+                conexao = self._local.conexao = self._conectar()
+            try:
+                return self._enviar(conexao, *partes)
+            except (ConnectionError, OSError):
+                self.fechar()
+                if tentativa:
+                    raise
+
+    def fechar(self):
+        conexao = getattr(self._local, "conexao", None)
+        self._local.conexao = None
+        if conexao is not None:
+            try:
+                conexao[0].close()
+            except OSError:
+                pass
+
+    # Atalhos
+    def get(self, chave):
+        return self.comando("GET", chave)
+
+    def set(self, chave, valor, px=None):
+        if px:
+            return self.comando("SET", chave, valor, "PX", int(px))
+        return self.comando("SET", chave, valor)
+
+    def delete(self, *chaves):
+        return self.comando("DEL", *chaves) if chaves else 0
+
+    def keys(self, padrao):
+        return self.comando("KEYS", padrao)
+
+    def publish(self, canal, mensagem):
+        return self.comando("PUBLISH", canal, mensagem)
+
+    def assinar(self, canal, callback, parar):
+        """
+        Loop de SUBSCRIBE numa conexão própria (rodar em thread daemon).
+        callback(bytes) para cada mensagem; reconecta até `parar` ser setado.
+        """
+        while not parar.is_set():
+            try:
+                conexao = self._conectar()
+                conexao[0].settimeout(None)
+                self._enviar(conexao, "SUBSCRIBE", canal)
+                while not parar.is_set():
+                    tipo, _, mensagem = ler_resposta(conexao[1])
+                    if tipo == b"message":
+                        callback(mensagem)
+            except (ConnectionError, OSError):
+                parar.wait(1.0)
+
+
+# ---------------------------------------------------------
+# Servidor local (substituto do Redis para dev/testes)
+# ---------------------------------------------------------
+class _Estado:
+    def __init__(self):
+        self.dados = {}  # chave → (valor, expira_em | None)
+        self.assinantes = {}  # canal → set(handler)
+        self.lock = threading.Lock()
+
+    def vivo(self, chave):
+        item = self.dados.get(chave)
+        if item is None:
+            return None
+        valor, expira = item
+        if expira is not None and expira <= time.monotonic():
+            del self.dados[chave]
+            return None
+        return valor
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.lock_escrita = threading.Lock()
+
+    def escrever(self, dados):
+        with self.lock_escrita:
+            self.wfile.write(dados)
+            self.wfile.flush()
+
+    def handle(self):
+        estado = self.server.estado
+        try:
+            while True:
+                comando = ler_resposta(self.rfile)
+                if not comando:
+                    continue
+                nome = comando[0].upper()
+                resposta = self.executar(estado, nome, comando[1:])
+                if resposta is not None:
+                    self.escrever(resposta)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            with estado.lock:
+                for handlers in estado.assinantes.values():
+                    handlers.discard(self)
+
+    @staticmethod
+    def bulk(valor):
+        if valor is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(valor), valor)
+
+    def executar(self, estado, nome, args):
+        with estado.lock:
+            if nome == b"PING":
+                return b"+PONG\r\n"
+            if nome in (b"SELECT", b"AUTH"):
+                return b"+OK\r\n"
+            if nome == b"GET":
+                return self.bulk(estado.vivo(args[0]))
+            if nome == b"SET":
+                expira = None
+                opcoes = [a.upper() for a in args[2:]]
+                if b"PX" in opcoes:
+                    expira = time.monotonic() + int(args[2 + opcoes.index(b"PX") + 1]) / 1000
+                elif b"EX" in opcoes:
+                    expira = time.monotonic() + int(args[2 + opcoes.index(b"EX") + 1])
+                estado.dados[args[0]] = (args[1], expira)
+                return b"+OK\r\n"
+            if nome == b"DEL":
+                removidas = sum(estado.dados.pop(c, None) is not None for c in args)
+                return b":%d\r\n" % removidas
+            if nome == b"KEYS":
+                padrao = args[0].decode()
+                chaves = [c for c in list(estado.dados) if estado.vivo(c) is not None
+                          and fnmatch.fnmatchcase(c.decode(), padrao)]
+                return b"*%d\r\n" % len(chaves) + b"".join(self.bulk(c) for c in chaves)
+            if nome == b"FLUSHDB":
+                estado.dados.clear()
+                return b"+OK\r\n"
+            if nome == b"PUBLISH":
+                handlers = list(estado.assinantes.get(args[0], ()))
+                mensagem = codificar_comando(b"message", args[0], args[1])
+            elif nome == b"SUBSCRIBE":
+                for canal in args:
+                    estado.assinantes.setdefault(canal, set()).add(self)
+                return b"".join(
+                    b"*3\r\n" + self.bulk(b"subscribe") + self.bulk(canal) + b":%d\r\n" % (i + 1)
+                    for i, canal in enumerate(args)
+                )
+            else:
+                return b"-ERR comando nao suportado\r\n"
+
+        # PUBLISH: entrega fora do lock global
+        entregues = 0
+        for handler in handlers:
+            try:
+                handler.escrever(mensagem)
+                entregues += 1
+            except OSError:
+                pass
+        return b":%d\r\n" % entregues
+
+
+class ServidorRESPLocal(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", porta=0):
+        super().__init__((host, porta), _Handler)
+        self.estado = _Estado()
+
+    @property
+    def url(self):
+        host, porta = self.server_address[:2]
+        return f"redis://{host}:{porta}/0"
+
+    def iniciar_em_thread(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name="resp-local").start()
+        return self
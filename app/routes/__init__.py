@@ -12,6 +12,9 @@ def register_blueprints(app):
     from app.routes.calorias import calorias_bp
     from app.routes.calculos import calculos_bp
     from app.routes.dashboard import dashboard_bp
+    from app.routes.ranking import ranking_bp
+    from app.routes.jobs import jobs_bp
+    from app.routes.admin import admin_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(user_bp, url_prefix='/api/user')
@@ -20,4 +23,7 @@ def register_blueprints(app):
     app.register_blueprint(atividades_bp, url_prefix='/api/atividades')
     app.register_blueprint(calorias_bp, url_prefix='/api/calorias-extras')
     app.register_blueprint(calculos_bp, url_prefix='/api/calculos')
-    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
\ No newline at end of file
+    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(ranking_bp, url_prefix='/api/ranking')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
\ No newline at end of file
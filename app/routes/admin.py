@@ -0,0 +1,96 @@
+import json
+import os
+
+from flask import Blueprint, current_app, request, jsonify, send_from_directory
+
+from app import db
+from app.admin import admin_obrigatorio
+from app.jwt_cache import jwt_cache_stats
+from app.profiling import ARQUIVOS as ARQUIVOS_PROFILE, diretorio_profiles
+from app.provisionamento import provisionar
+
+admin_bp = Blueprint("admin", __name__)
+
+
+# ---------------------------------------------------------
+# POST /usuarios  → Provisionamento em lote
+# ---------------------------------------------------------
+@admin_bp.route("/usuarios", methods=["POST"])
+@admin_obrigatorio
+def provisionar_usuarios():
+    """
+    Header: X-Admin-Token
+    Body: {"usuarios": [{nome, telefone, senha, altura?, peso_inicial?,
+                         profissao?, idade?, peso_meta?}, ...],
+           "profissao_padrao": "Estoquista"}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        usuarios = data.get("usuarios")
+
+        if not isinstance(usuarios, list) or not usuarios:
+            return jsonify({"error": "Envie a lista 'usuarios'."}), 400
+
+        limite = current_app.config["PROVISIONAMENTO_MAX_REGISTROS"]
+        if len(usuarios) > limite:
+            return jsonify({"error": f"Máximo de {limite} usuários por requisição."}), 413
+
+        resultado = provisionar(usuarios, profissao_padrao=data.get("profissao_padrao"))
+
+        status = 201 if resultado["criados"] else 200
+        return jsonify(resultado), status
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+# ---------------------------------------------------------
+# GET /profiles  → Requisições perfiladas (mais recentes primeiro)
+# ---------------------------------------------------------
+@admin_bp.route("/profiles", methods=["GET"])
+@admin_obrigatorio
+def listar_profiles():
+    diretorio = diretorio_profiles()
+    try:
+        nomes = sorted(os.listdir(diretorio), reverse=True)
+    except FileNotFoundError:
+        nomes = []
+
+    profiles = []
+    for nome in nomes[:100]:
+        try:
+            with open(os.path.join(diretorio, nome, "sql.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta["id"] = nome
+        meta["queries"] = len(meta["queries"])
+        profiles.append(meta)
+
+    return jsonify({"profiles": profiles}), 200
+
+
+# ---------------------------------------------------------
+# GET /profiles/<id>/<arquivo>  → Download de um artefato
+# ---------------------------------------------------------
+@admin_bp.route("/profiles/<nome>/<arquivo>", methods=["GET"])
+@admin_obrigatorio
+def baixar_profile(nome, arquivo):
+    if arquivo not in ARQUIVOS_PROFILE:
+        return jsonify({"error": f"Arquivo deve ser um de: {', '.join(ARQUIVOS_PROFILE)}."}), 400
+    return send_from_directory(
+        os.path.join(diretorio_profiles(), nome), arquivo, as_attachment=True
+    )
+
+
+# ---------------------------------------------------------
+# GET /caches  → Estatísticas dos caches deste worker
+# ---------------------------------------------------------
+@admin_bp.route("/caches", methods=["GET"])
+@admin_obrigatorio
+def estatisticas_caches():
+    estado = current_app.extensions["cache"]
+    caches = {nome: cache.stats() for nome, cache in estado["caches"].items()}
+    caches["jwt"] = jwt_cache_stats(current_app)  # None = JWT_DECODE_CACHE_SIZE=0
+    return jsonify({"backend": estado["backend"], "pid": os.getpid(), "caches": caches}), 200
@@ -1,9 +1,25 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import date
+from app.arquivo import horizonte, ler_arquivo
 from sqlalchemy import desc, Column
-from app import db
+from app import db, dia, aderencia
+from app.escritor import executar_escrita
+from app.corpo import limitar_corpo
+from app.idempotencia import idempotente
 from app.models import AtividadeFisica
+from app.upsert import upsert
+from app.trilhas import TrilhaInvalida, estimar_calorias, ler_trilha
+from app.json_provider import json_bytes
+from app.serializacao import (
+    COLUNAS_ATIVIDADE,
+    atividade_para_dict,
+    projetar_linhas,
+    resposta_json,
+)
+
+LIMITE_HISTORICO = 30
 
 atividades_bp = Blueprint("atividades", __name__)
 
@@ -42,7 +58,8 @@ def get_atividade_hoje():
         user_id = get_jwt_identity()
         hoje = date.today()
 
-        atividade = AtividadeFisica.query.filter_by(user_id=user_id, data=hoje).first()
+        doc = dia.documento(user_id, hoje)
+        atividade = doc["atividade"] if doc else None
 
         if not atividade:
             vazio = {
@@ -61,7 +78,7 @@ def get_atividade_hoje():
                 200,
             )
 
-        return jsonify(atividade.to_dict()), 200
+        return jsonify(atividade), 200
 
     except Exception as e:
         return error(str(e), 500)
@@ -72,6 +89,7 @@ def get_atividade_hoje():
 # ---------------------------------------------------------
 @atividades_bp.route("/registrar", methods=["POST"])
 @jwt_required()
+@idempotente
 def registrar_atividade():
     """
     Registrar ou atualizar atividade física do dia.
@@ -85,59 +103,194 @@ def registrar_atividade():
         body = get_body()
         hoje = date.today()
 
-        atividade = AtividadeFisica.query.filter_by(user_id=user_id, data=hoje).first()
-
-        if not atividade:
-            atividade = AtividadeFisica(user_id=user_id)
-
         # Atualizar apenas os campos enviados
+        enviados = {}
         if "km_percorridos" in body:
-            atividade.km_percorridos = float(body["km_percorridos"])
+            enviados["km_percorridos"] = float(body["km_percorridos"])
 
         if "calorias_perdidas" in body:
-            atividade.calorias_perdidas = int(body["calorias_perdidas"])
+            enviados["calorias_perdidas"] = int(body["calorias_perdidas"])
 
         if "calorias_trabalho" in body:
-            atividade.calorias_trabalho = int(body["calorias_trabalho"])
+            enviados["calorias_trabalho"] = int(body["calorias_trabalho"])
 
-        db.session.add(atividade)
-        db.session.commit()
+        def gravar():
+            atividade = upsert(
+                AtividadeFisica,
+                {
+                    "user_id": int(user_id),
+                    "data": hoje,
+                    "km_percorridos": 0.0,
+                    "calorias_perdidas": 0,
+                    "calorias_trabalho": 0,
+                    **enviados,
+                },
+                chave=("user_id", "data"),
+                # Sem campos enviados: SET no-op só para o RETURNING trazer a linha
+                atualizar=tuple(enviados) or ("user_id",),
+            )
+            aderencia.marcar(
+                user_id,
+                hoje,
+                aderencia.ATIVIDADE,
+                aderencia.teve_atividade(atividade.km_percorridos, atividade.calorias_perdidas),
+            )
+            return atividade.to_dict()
+
+        atividade = executar_escrita(user_id, gravar)
 
         return (
             jsonify(
                 {
                     "message": "Atividade registrada com sucesso!",
-                    "atividade": atividade.to_dict(),
+                    "atividade": atividade,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        return error(str(e), 500)
+
+
+# ---------------------------------------------------------
+# POST /importar — Atividade a partir de uma trilha GPX/TCX
+# ---------------------------------------------------------
+@atividades_bp.route("/importar", methods=["POST"])
+@jwt_required()
+@limitar_corpo("ATIVIDADES_IMPORTAR_MAX_BYTES")
+@idempotente
+def importar_trilha():
+    """
+    Upload GPX/TCX (multipart, campo `arquivo`, ou o XML no corpo).
+    Distância pela trilha, calorias estimadas pelo peso atual; soma na
+    atividade do dia da trilha (?substituir=1 sobrescreve).
+    """
+    try:
+        user_id = get_jwt_identity()
+
+        # Limite de tamanho aplicado na leitura (@limitar_corpo)
+        arquivo = request.files.get("arquivo")
+        stream = arquivo.stream if arquivo is not None else request.stream
+
+        try:
+            trilha = ler_trilha(stream)
+        except TrilhaInvalida as e:
+            return error(f"Arquivo GPX/TCX inválido: {e}")
+
+        dia_trilha = trilha["inicio"].date() if trilha["inicio"] else date.today()
+        doc = dia.documento(user_id, dia_trilha)
+        if doc is None:
+            return error("Usuário não encontrado", 404)
+
+        modalidade, calorias = estimar_calorias(trilha, dia.peso_atual(doc))
+        km = round(trilha["km"], 2)
+        substituir = request.args.get("substituir") == "1"
+
+        def gravar():
+            atividade = upsert(
+                AtividadeFisica,
+                {
+                    "user_id": int(user_id),
+                    "data": dia_trilha,
+                    "km_percorridos": km,
+                    "calorias_perdidas": calorias,
+                    "calorias_trabalho": 0,
+                },
+                chave=("user_id", "data"),
+                atualizar=("km_percorridos", "calorias_perdidas"),
+                somar=() if substituir else ("km_percorridos", "calorias_perdidas"),
+            )
+            # Soma de floats: evita 24.259999999999998 na resposta
+            atividade.km_percorridos = round(atividade.km_percorridos, 2)
+            aderencia.marcar(
+                user_id,
+                dia_trilha,
+                aderencia.ATIVIDADE,
+                aderencia.teve_atividade(atividade.km_percorridos, atividade.calorias_perdidas),
+            )
+            return atividade.to_dict()
+
+        atividade = executar_escrita(user_id, gravar)
+
+        return (
+            jsonify(
+                {
+                    "message": "Trilha importada com sucesso!",
+                    "atividade": atividade,
+                    "trilha": {
+                        "formato": trilha["formato"],
+                        "pontos": trilha["pontos"],
+                        "km": km,
+                        "duracao_segundos": trilha["duracao_segundos"],
+                        "modalidade": modalidade,
+                        "calorias_estimadas": calorias,
+                    },
                 }
             ),
             200,
         )
 
+    except RequestEntityTooLarge:
+        # Respondido por @limitar_corpo
+        raise
     except Exception as e:
         db.session.rollback()
         return error(str(e), 500)
 
 
 # ---------------------------------------------------------
-# GET /historico — últimos 30 dias
+# GET /historico — últimos 30 registros (cursor ?antes=AAAA-MM-DD)
 # ---------------------------------------------------------
 @atividades_bp.route("/historico", methods=["GET"])
 @jwt_required()
 def get_historico_atividades():
     """
-    Obter histórico de atividades dos últimos 30 dias.
+    Obter histórico de atividades, 30 registros por página.
+    Quando os registros quentes acabam, completa com a camada arquivada.
+    O header X-Proximo-Cursor traz o valor de `antes` da próxima página.
     """
     try:
         user_id = get_jwt_identity()
 
-        atividades = (
-            AtividadeFisica.query.filter_by(user_id=user_id)
+        antes = request.args.get("antes")
+        if antes:
+            try:
+                antes = date.fromisoformat(antes)
+            except ValueError:
+                return error("Parâmetro 'antes' deve estar no formato AAAA-MM-DD.")
+
+        stmt = (
+            db.select(*COLUNAS_ATIVIDADE)
+            .filter_by(user_id=user_id)
             .order_by(desc(col(AtividadeFisica.data)))
-            .limit(30)
-            .all()
+            .limit(LIMITE_HISTORICO)
         )
+        if antes:
+            stmt = stmt.where(col(AtividadeFisica.data) < antes)
+
+        atividades = projetar_linhas(stmt, atividade_para_dict)
+
+        # O arquivo só tem dias antes do horizonte, mas a camada quente também
+        # pode ter (ainda não arquivados ou importados depois): o arquivo é lido
+        # pelo cursor da requisição, não pela última linha quente, e mesclado.
+        corte = min(antes, horizonte()) if antes else horizonte()
+        if len(atividades) < LIMITE_HISTORICO or atividades[-1]["data"] < corte.isoformat():
+            por_dia = {
+                linha["data"]: linha
+                for linha in ler_arquivo(
+                    user_id, AtividadeFisica.__tablename__, antes=corte, limite=LIMITE_HISTORICO
+                )
+            }
+            # Um registro por dia: o da camada quente prevalece
+            por_dia.update((linha["data"], linha) for linha in atividades)
+            atividades = sorted(por_dia.values(), key=lambda linha: linha["data"], reverse=True)[:LIMITE_HISTORICO]
 
-        return jsonify([a.to_dict() for a in atividades]), 200
+        resposta = resposta_json(json_bytes(atividades))
+        if len(atividades) == LIMITE_HISTORICO:
+            resposta.headers["X-Proximo-Cursor"] = atividades[-1]["data"]
+        return resposta
 
     except Exception as e:
         return error(str(e), 500)
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -6,10 +6,16 @@ from flask_jwt_extended import (
     get_jwt_identity,
 )
 from app import db
+from app.escritor import executar_escrita
+from app.idempotencia import idempotente
 from app.models import User, MetaPeso
+from app import perfil, tendencia
 
 auth_bp = Blueprint("auth", __name__)
 
+# Também servido direto pelo FastPathMiddleware (app/middleware.py)
+PING_RESPOSTA = {"message": "Pong! API Auth funcionando 🔥"}
+
 
 # ----------------------------------------
 # Helpers
@@ -25,25 +31,13 @@ def get_body():
     return data or {}
 
 
-# ----------------------------------------
-# OPTIONS
-# ----------------------------------------
-
-
-@auth_bp.route("/cadastro", methods=["OPTIONS"])
-@auth_bp.route("/login", methods=["OPTIONS"])
-@auth_bp.route("/refresh", methods=["OPTIONS"])
-@auth_bp.route("/ping", methods=["OPTIONS"])
-def handle_options():
-    return "", 204
-
-
 # ----------------------------------------
 # Cadastro
 # ----------------------------------------
 
 
 @auth_bp.route("/cadastro", methods=["POST"])
+@idempotente
 def cadastro():
     """
     Cadastrar usuário.
@@ -73,8 +67,8 @@ def cadastro():
         idade = int(data.get("idade") or 18)
         peso_meta = float(data.get("peso_meta") or 85.0)
 
-        # Criar usuário
-        user = User(
+        # Criar usuário (hash da senha aqui, fora do escritor)
+        novo = User(
             nome=nome.strip(),
             telefone=telefone.strip(),
             altura=altura,
@@ -82,23 +76,33 @@ def cadastro():
             profissao=profissao,
             idade=idade,
         )
-        user.set_password(senha)
+        novo.set_password(senha)
 
-        db.session.add(user)
-        db.session.commit()
+        def criar_usuario():
+            db.session.add(novo)
+            db.session.flush()
+            return novo.id
 
-        # Criar meta
-        meta = MetaPeso(
-            user_id=user.id,
-            peso_atual=peso_inicial,
-            peso_meta=peso_meta,
-        )
+        user_id = executar_escrita(None, criar_usuario)
+
+        # Criar meta (no shard do novo usuário)
+        def criar_meta():
+            meta = MetaPeso(
+                user_id=user_id,
+                peso_atual=peso_inicial,
+                peso_meta=peso_meta,
+            )
 
-        db.session.add(meta)
-        db.session.commit()
+            db.session.add(meta)
+            tendencia.registrar_meta(meta)
+
+        executar_escrita(user_id, criar_meta)
+        user = db.session.get(User, user_id)
 
         # Tokens
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(
+            identity=str(user.id), additional_claims=perfil.claims(user)
+        )
         refresh_token = create_refresh_token(identity=str(user.id))
 
         return (
@@ -139,7 +143,9 @@ def login():
         if not user or not user.check_password(senha):
             return error("Telefone ou senha incorretos.", 401)
 
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(
+            identity=str(user.id), additional_claims=perfil.claims(user)
+        )
         refresh_token = create_refresh_token(identity=str(user.id))
 
         return (
@@ -168,7 +174,15 @@ def login():
 def refresh():
     try:
         current_user = str(get_jwt_identity())
-        access_token = create_access_token(identity=current_user)
+
+        extras = {}
+        if current_app.config.get("PERFIL_NO_TOKEN"):
+            user = db.session.get(User, int(current_user))
+            if not user:
+                return error("Usuário não encontrado.", 404)
+            extras = perfil.claims(user)
+
+        access_token = create_access_token(identity=current_user, additional_claims=extras)
 
         return jsonify({"access_token": access_token}), 200
 
@@ -183,4 +197,4 @@ def refresh():
 
 @auth_bp.route("/ping", methods=["GET"])
 def ping():
-    return jsonify({"message": "Pong! API Auth funcionando 🔥"}), 200
+    return jsonify(PING_RESPOSTA), 200
@@ -1,19 +1,15 @@
 # app/routes/calculos.py
 from datetime import date
+from types import SimpleNamespace
 from typing import Tuple, Optional
 
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from app import db
-from app.models import (
-    User,
-    MetaPeso,
-    AtividadeFisica,
-    RotinaAlimentar,
-    CaloriasExtras,
-    ConsumoCalorico,
-)
+from app import db, dia, perfil, ranking
+from app.escritor import executar_escrita
+from app.models import User, ConsumoCalorico
+from app.upsert import upsert
 from app.utils import calcular_tmb, calcular_gasto_profissional
 
 calculos_bp = Blueprint("calculos", __name__)
@@ -32,31 +28,19 @@ def hoje() -> date:
     return date.today()
 
 
-def get_user_or_404(
-    user_id: int,
-) -> Tuple[Optional[User], Optional[Tuple]]:  # (user, error_response)
-    user = User.query.get(user_id)
-    if not user:
-        return None, json_error("Usuário não encontrado", 404)
-    return user, None
-
-
-def get_peso_atual(user_id: int, user: User) -> float:
+def perfil_para_calculo(user_id):
     """
-    Retorna o peso atual a partir da última meta, ou peso inicial do usuário.
-    Garante que sempre retorne um float (ou 0.0 como fallback).
+    (user, peso, error_response): usa o snapshot de perfil do token quando
+    válido; senão o documento do dia (cacheado) com User e a última meta.
     """
-    ultima_meta = (
-        MetaPeso.query.filter_by(user_id=user_id)
-        .order_by(MetaPeso.data_registro.desc())
-        .first()
-    )
+    snapshot = perfil.do_token(user_id)
+    if snapshot is not None:
+        return snapshot, snapshot.peso, None
 
-    peso = (ultima_meta.peso_atual if ultima_meta else user.peso_inicial) or 0.0
-    try:
-        return float(peso)
-    except (TypeError, ValueError):
-        return 0.0
+    doc = dia.documento(user_id, hoje())
+    if doc is None:
+        return None, None, json_error("Usuário não encontrado", 404)
+    return SimpleNamespace(**doc["user"]), dia.peso_atual(doc), None
 
 
 def calcular_basais(user: User, peso: float) -> Tuple[float, float]:
@@ -79,6 +63,64 @@ def calcular_basais(user: User, peso: float) -> Tuple[float, float]:
     return tmb or 0.0, gasto_prof or 0.0
 
 
+def calcular_balanco(user_id, user: User, data_atual: date, peso: Optional[float] = None) -> dict:
+    """Calcula o balanço calórico do dia a partir do documento do dia (só leitura)."""
+    doc = dia.documento(user_id, data_atual)
+
+    # Basais
+    if peso is None:
+        peso = dia.peso_atual(doc)
+    tmb, gasto_prof = calcular_basais(user, peso)
+
+    # Atividade, rotina (somente concluídas) e extras do dia
+    calorias_exercicio = dia.calorias_exercicio(doc)
+    calorias_rotina = dia.calorias_rotina(doc)
+    calorias_extras = dia.calorias_extras(doc)
+
+    # Cálculos finais
+    total_gasto = tmb + gasto_prof + (calorias_exercicio or 0)
+    total_consumido = calorias_rotina + calorias_extras
+    balanco = total_consumido - total_gasto
+    status = "deficit" if balanco < 0 else "superavit"
+
+    return {
+        "metabolismo_basal": tmb,
+        "gasto_profissional": gasto_prof,
+        "calorias_exercicio": calorias_exercicio,
+        "total_gasto": total_gasto,
+        "calorias_rotina": calorias_rotina,
+        "calorias_extras": calorias_extras,
+        "total_consumido": total_consumido,
+        "balanco": balanco,
+        "status": status,
+    }
+
+
+def gravar_balanco(user_id, data_atual: date, resultado: dict) -> None:
+    """Grava o balanço calculado em ConsumoCalorico e no ranking (sem commit)."""
+    # Upsert do dia em uma instrução
+    upsert(
+        ConsumoCalorico,
+        {
+            "user_id": int(user_id),
+            "data": data_atual,
+            "calorias_consumidas": int(resultado["total_consumido"]),
+            "calorias_gastas": int(resultado["total_gasto"]),
+            "metabolismo_basal": int(resultado["metabolismo_basal"]),
+            "gasto_profissional": int(resultado["gasto_profissional"]),
+        },
+        chave=("user_id", "data"),
+        atualizar=(
+            "calorias_consumidas",
+            "calorias_gastas",
+            "metabolismo_basal",
+            "gasto_profissional",
+        ),
+    )
+
+    ranking.registrar_consumo(user_id, data_atual)
+
+
 # -------------------------------
 # Rotas
 # -------------------------------
@@ -91,11 +133,10 @@ def calcular_tmb_user():
     try:
         user_id = get_jwt_identity()
 
-        user, err = get_user_or_404(user_id)
+        user, peso, err = perfil_para_calculo(user_id)
         if err:
             return err
 
-        peso = get_peso_atual(user_id, user)
         tmb, gasto_prof = calcular_basais(user, peso)
 
         return (
@@ -121,81 +162,15 @@ def calcular_balanco_calorico():
         user_id = get_jwt_identity()
         data_atual = hoje()
 
-        user, err = get_user_or_404(user_id)
+        user, peso, err = perfil_para_calculo(user_id)
         if err:
             return err
 
-        # Basais
-        peso = get_peso_atual(user_id, user)
-        tmb, gasto_prof = calcular_basais(user, peso)
-
-        # Atividade física do dia
-        atividade = AtividadeFisica.query.filter_by(
-            user_id=user_id, data=data_atual
-        ).first()
-        calorias_exercicio = atividade.calorias_perdidas if atividade else 0
-
-        # Rotina alimentar (somente concluídas)
-        rotinas = RotinaAlimentar.query.filter_by(
-            user_id=user_id, data=data_atual
-        ).all()
-        calorias_rotina = sum((r.calorias or 0) for r in rotinas if r.concluido)
-
-        # Calorias extras
-        extras = CaloriasExtras.query.filter_by(user_id=user_id, data=data_atual).all()
-        calorias_extras = sum((e.calorias or 0) for e in extras)
-
-        # Cálculos finais
-        total_gasto = tmb + gasto_prof + (calorias_exercicio or 0)
-        total_consumido = calorias_rotina + calorias_extras
-        balanco = total_consumido - total_gasto
-        status = "deficit" if balanco < 0 else "superavit"
-
-        # Persistência em ConsumoCalorico
-        # Observação: o modelo ConsumoCalorico original exige determinados parâmetros no __init__.
-        # Para evitar mismatch com o construtor atual, criamos/atualizamos a instância via atribuições.
-        consumo = ConsumoCalorico.query.filter_by(
-            user_id=user_id, data=data_atual
-        ).first()
-
-        if not consumo:
-            # Se o seu modelo não aceita 'data' no __init__, instancia com valores mínimos
-            # e atribui data abaixo. Isso evita erro de "argumento inesperado".
-            consumo = ConsumoCalorico(
-                user_id=user_id,
-                calorias_consumidas=int(total_consumido),
-                calorias_gastas=int(total_gasto),
-                metabolismo_basal=int(tmb),
-                gasto_profissional=int(gasto_prof),
-            )
-            # setar data explicitamente (caso o construtor não aceite)
-            consumo.data = data_atual
-            db.session.add(consumo)
-        else:
-            consumo.metabolismo_basal = int(tmb)
-            consumo.gasto_profissional = int(gasto_prof)
-            consumo.calorias_gastas = int(total_gasto)
-            consumo.calorias_consumidas = int(total_consumido)
-            consumo.data = data_atual
-
-        db.session.commit()
+        # Leitura na requisição; só a gravação passa pelo escritor
+        resultado = calcular_balanco(user_id, user, data_atual, peso=peso)
+        executar_escrita(user_id, lambda: gravar_balanco(user_id, data_atual, resultado))
 
-        return (
-            jsonify(
-                {
-                    "metabolismo_basal": tmb,
-                    "gasto_profissional": gasto_prof,
-                    "calorias_exercicio": calorias_exercicio,
-                    "total_gasto": total_gasto,
-                    "calorias_rotina": calorias_rotina,
-                    "calorias_extras": calorias_extras,
-                    "total_consumido": total_consumido,
-                    "balanco": balanco,
-                    "status": status,
-                }
-            ),
-            200,
-        )
+        return jsonify(resultado), 200
 
     except Exception as e:
         db.session.rollback()
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
+from app import db, dia
+from app.escritor import executar_escrita
+from app.idempotencia import idempotente
 from app.models import CaloriasExtras
 from datetime import date
 
@@ -29,14 +31,13 @@ def get_calorias_extras_hoje():
     try:
         user_id = get_user_id()
 
-        calorias = CaloriasExtras.query.filter_by(user_id=user_id, data=hoje()).all()
+        doc = dia.documento(user_id, hoje())
+        calorias = doc["calorias_extras"] if doc else []
 
-        total = sum(c.calorias for c in calorias)
+        total = dia.calorias_extras(doc) if doc else 0
 
         return (
-            jsonify(
-                {"calorias_extras": [c.to_dict() for c in calorias], "total": total}
-            ),
+            jsonify({"calorias_extras": calorias, "total": total}),
             200,
         )
 
@@ -46,6 +47,7 @@ def get_calorias_extras_hoje():
 
 @calorias_bp.route("/registrar", methods=["POST"])
 @jwt_required()
+@idempotente
 def registrar_calorias_extras():
     """Registrar calorias extras consumidas."""
     try:
@@ -60,22 +62,25 @@ def registrar_calorias_extras():
         except ValueError:
             return json_error("O campo 'calorias' deve ser numérico", 400)
 
-        registro = CaloriasExtras(
-            user_id=user_id,
-            descricao=data.get("descricao", ""),
-            calorias=calorias_valor,
-            sincero=bool(data.get("sincero", True)),
-            data=hoje(),
-        )
+        def gravar():
+            registro = CaloriasExtras(
+                user_id=user_id,
+                descricao=data.get("descricao", ""),
+                calorias=calorias_valor,
+                sincero=bool(data.get("sincero", True)),
+                data=hoje(),
+            )
+            db.session.add(registro)
+            db.session.flush()
+            return registro.to_dict()
 
-        db.session.add(registro)
-        db.session.commit()
+        registro = executar_escrita(user_id, gravar)
 
         return (
             jsonify(
                 {
                     "message": "Calorias extras registradas!",
-                    "caloria_extra": registro.to_dict(),
+                    "caloria_extra": registro,
                 }
             ),
             201,
@@ -93,14 +98,15 @@ def deletar_caloria_extra(id):
     try:
         user_id = get_user_id()
 
-        registro = CaloriasExtras.query.filter_by(id=id, user_id=user_id).first()
+        def apagar():
+            registro = CaloriasExtras.query.filter_by(id=id, user_id=user_id).first()
+            if registro is not None:
+                db.session.delete(registro)
+            return registro is not None
 
-        if registro is None:
+        if not executar_escrita(user_id, apagar):
             return json_error("Registro não encontrado", 404)
 
-        db.session.delete(registro)
-        db.session.commit()
-
         return jsonify({"message": "Registro deletado com sucesso!"}), 200
 
     except Exception as e:
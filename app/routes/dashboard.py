@@ -1,116 +1,157 @@
-from flask import Blueprint, jsonify
+import json
+import time
+
+from flask import Blueprint, Response, current_app, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import (
-    User,
-    MetaPeso,
-    AtividadeFisica,
-    RotinaAlimentar,
-    CaloriasExtras,
-)
+from app import db, dia
+from app.eventos import barramento, versao_compartilhada
 from app.utils import calcular_tmb, calcular_gasto_profissional
 from datetime import date
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
 
-@dashboard_bp.route("/", methods=["GET"])
-@jwt_required()
-def get_dashboard():
+def montar_dashboard(user_id, hoje):
     """
-    Retorna todos os dados consolidados para o dashboard.
+    Consolida os dados do dia do usuário a partir do documento do dia.
     Inclui:
-        - Dados do usuário
         - Última meta
         - Atividade do dia
         - Consumo alimentar
         - Calorias extras
         - Balanço calórico completo
+    Retorna None se o usuário não existe.
+    """
+    doc = dia.documento(user_id, hoje)
+    if doc is None:
+        return None
+
+    user = doc["user"]
+
+    # -----------------------------------------------------------
+    # CÁLCULOS DE BALANÇO CALÓRICO
+    # -----------------------------------------------------------
+    peso_atual = dia.peso_atual(doc)
+
+    altura = user["altura"] or 0
+    idade = user["idade"] or 30
+    profissao = user["profissao"] or "sedentario"
+
+    # Evita calculo inválido
+    if peso_atual <= 0 or altura <= 0:
+        tmb = 0
+    else:
+        tmb = calcular_tmb(peso_atual, altura, idade)
+
+    gasto_profissional = calcular_gasto_profissional(tmb, profissao)
+
+    calorias_exercicio = dia.calorias_exercicio(doc)
+    calorias_rotina = dia.calorias_rotina(doc)
+    calorias_extras = dia.calorias_extras(doc)
+
+    total_gasto = tmb + gasto_profissional + calorias_exercicio
+    total_consumido = calorias_rotina + calorias_extras
+
+    balanco = total_consumido - total_gasto
+    status = "deficit" if balanco < 0 else "superavit"
+
+    return {
+        "user": user,
+        "meta": doc["meta"],
+        "atividade": doc["atividade"],
+        "rotinas": doc["rotinas"],
+        "calorias_extras": doc["calorias_extras"],
+        "balanco_calorico": {
+            "tmb": tmb,
+            "gasto_profissional": gasto_profissional,
+            "calorias_exercicio": calorias_exercicio,
+            "total_gasto": total_gasto,
+            "calorias_rotina": calorias_rotina,
+            "calorias_extras": calorias_extras,
+            "total_consumido": total_consumido,
+            "balanco": balanco,
+            "status": status,
+        },
+    }
+
+
+@dashboard_bp.route("/", methods=["GET"])
+@jwt_required()
+def get_dashboard():
+    """
+    Retorna todos os dados consolidados para o dashboard.
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
         hoje = date.today()
 
-        if not user:
+        dashboard = montar_dashboard(user_id, hoje)
+        if dashboard is None:
             return jsonify({"error": "Usuário não encontrado"}), 404
 
-        # -----------------------------------------------------------
-        # META (pega a mais recente)
-        # -----------------------------------------------------------
-        ultima_meta = (
-            MetaPeso.query.filter_by(user_id=user_id)
-            .order_by(MetaPeso.data_registro.desc())
-            .first()
-        )
-
-        # -----------------------------------------------------------
-        # ATIVIDADE DO DIA
-        # -----------------------------------------------------------
-        atividade = AtividadeFisica.query.filter_by(user_id=user_id, data=hoje).first()
-
-        # -----------------------------------------------------------
-        # CALORIAS EXTRAS DO DIA
-        # -----------------------------------------------------------
-        extras = CaloriasExtras.query.filter_by(user_id=user_id, data=hoje).all()
-
-        # -----------------------------------------------------------
-        # ROTINA ALIMENTAR DO DIA
-        # -----------------------------------------------------------
-        rotinas = RotinaAlimentar.query.filter_by(user_id=user_id, data=hoje).all()
-
-        # -----------------------------------------------------------
-        # CÁLCULOS DE BALANÇO CALÓRICO
-        # -----------------------------------------------------------
-        peso_atual = ultima_meta.peso_atual if ultima_meta else (user.peso_inicial or 0)
-
-        altura = user.altura or 0
-        idade = user.idade or 30
-        profissao = user.profissao or "sedentario"
-
-        # Evita calculo inválido
-        if peso_atual <= 0 or altura <= 0:
-            tmb = 0
-        else:
-            tmb = calcular_tmb(peso_atual, altura, idade)
-
-        gasto_profissional = calcular_gasto_profissional(tmb, profissao)
-
-        calorias_exercicio = atividade.calorias_perdidas if atividade else 0
-        calorias_rotina = sum((r.calorias or 0) for r in rotinas if r.concluido)
-        calorias_extras = sum(e.calorias for e in extras)
-
-        total_gasto = tmb + gasto_profissional + calorias_exercicio
-        total_consumido = calorias_rotina + calorias_extras
-
-        balanco = total_consumido - total_gasto
-        status = "deficit" if balanco < 0 else "superavit"
-
-        # -----------------------------------------------------------
-        # RESPOSTA FINAL
-        # -----------------------------------------------------------
-        return (
-            jsonify(
-                {
-                    "user": user.to_dict(),
-                    "meta": ultima_meta.to_dict() if ultima_meta else None,
-                    "atividade": atividade.to_dict() if atividade else None,
-                    "rotinas": [r.to_dict() for r in rotinas],
-                    "calorias_extras": [e.to_dict() for e in extras],
-                    "balanco_calorico": {
-                        "tmb": tmb,
-                        "gasto_profissional": gasto_profissional,
-                        "calorias_exercicio": calorias_exercicio,
-                        "total_gasto": total_gasto,
-                        "calorias_rotina": calorias_rotina,
-                        "calorias_extras": calorias_extras,
-                        "total_consumido": total_consumido,
-                        "balanco": balanco,
-                        "status": status,
-                    },
-                }
-            ),
-            200,
-        )
+        return jsonify(dashboard), 200
 
     except Exception as e:
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
+
+
+# -----------------------------------------------------------
+# GET /stream  → Server-Sent Events com o balanço do dia
+# -----------------------------------------------------------
+def evento_sse(nome, dados):
+    return f"event: {nome}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+@dashboard_bp.route("/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_dashboard():
+    """
+    Envia o balanço do dia sempre que as linhas do usuário mudam.
+    EventSource não envia headers: aceita o token em ?jwt=<access_token>.
+    O stream fecha após EVENTOS_STREAM_MAX_SEGUNDOS; o cliente reconecta.
+    """
+    user_id = get_jwt_identity()
+    config = current_app.config
+
+    def balanco_atual():
+        try:
+            dashboard = montar_dashboard(user_id, date.today())
+            return dashboard["balanco_calorico"] if dashboard else None
+        finally:
+            # Não segura conexão/transação do SQLite entre eventos
+            db.session.remove()
+
+    def gerar():
+        cross_worker = config["EVENTOS_CROSS_WORKER"]
+        poll = config["EVENTOS_POLL_SEGUNDOS"]
+        heartbeat = config["EVENTOS_HEARTBEAT_SEGUNDOS"]
+        fim = time.monotonic() + config["EVENTOS_STREAM_MAX_SEGUNDOS"]
+
+        versao_local = barramento.versao(user_id)
+        versao_externa = versao_compartilhada(user_id) if cross_worker else 0
+
+        yield "retry: 3000\n\n"
+        yield evento_sse("balanco", balanco_atual())
+
+        ultimo_envio = time.monotonic()
+        while time.monotonic() < fim:
+            nova_local = barramento.aguardar(user_id, versao_local, timeout=poll)
+            nova_externa = versao_compartilhada(user_id) if cross_worker else 0
+
+            if nova_externa != versao_externa:
+                # Escrita em outro worker: o documento do dia local está velho
+                current_app.extensions["documento_dia"].invalidar_usuario(int(user_id))
+
+            if nova_local != versao_local or nova_externa != versao_externa:
+                versao_local, versao_externa = nova_local, nova_externa
+                yield evento_sse("balanco", balanco_atual())
+                ultimo_envio = time.monotonic()
+            elif time.monotonic() - ultimo_envio >= heartbeat:
+                yield ": heartbeat\n\n"
+                ultimo_envio = time.monotonic()
+
+    return Response(
+        stream_with_context(gerar()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
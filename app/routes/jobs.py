@@ -0,0 +1,94 @@
+import json
+
+from flask import Blueprint, request, jsonify, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app import db, jobs
+from app.idempotencia import idempotente
+from app.models import Job
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+# ---------------------------------------------------------
+# POST /  → Enfileira um job
+# ---------------------------------------------------------
+@jobs_bp.route("/", methods=["POST"])
+@jwt_required()
+@idempotente
+def criar_job():
+    """
+    Body: {"tipo": "exportar" | "recalcular" | "projecao", "parametros": {...}}
+        exportar, recalcular: de, ate (AAAA-MM-DD)
+        projecao: semanas
+    Retorna 202 com o id; o resultado sai em GET /api/jobs/<id>.
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+
+        tipo = data.get("tipo")
+        if tipo not in jobs.TAREFAS:
+            return jsonify({"error": f"Tipo de job inválido. Use: {', '.join(sorted(jobs.TAREFAS))}."}), 400
+
+        try:
+            job = jobs.enfileirar(user_id, tipo, data.get("parametros"))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Parâmetros inválidos: {e}"}), 400
+        except jobs.FilaCheia:
+            resposta = jsonify({"error": "Fila de jobs cheia, tente novamente em instantes."})
+            resposta.headers["Retry-After"] = "5"
+            return resposta, 503
+
+        resposta = jsonify(job)
+        resposta.headers["Location"] = url_for("jobs.obter_job", job_id=job["id"])
+        return resposta, 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+# ---------------------------------------------------------
+# GET /<id>  → Status e resultado
+# ---------------------------------------------------------
+@jobs_bp.route("/<job_id>", methods=["GET"])
+@jwt_required()
+def obter_job(job_id):
+    try:
+        user_id = int(get_jwt_identity())
+
+        job = db.session.get(Job, job_id)
+        if not job or job.user_id != user_id:
+            return jsonify({"error": "Job não encontrado."}), 404
+        jobs.marcar_se_orfao([job])
+
+        corpo = job.to_dict()
+        if job.status == "concluido":
+            corpo["resultado"] = json.loads(job.resultado)
+        return jsonify(corpo), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ---------------------------------------------------------
+# GET /  → Jobs recentes do usuário (sem resultado)
+# ---------------------------------------------------------
+@jobs_bp.route("/", methods=["GET"])
+@jwt_required()
+def listar_jobs():
+    try:
+        user_id = int(get_jwt_identity())
+
+        recentes = (
+            Job.query.filter_by(user_id=user_id)
+            .order_by(Job.criado_em.desc())
+            .limit(20)
+            .all()
+        )
+        jobs.marcar_se_orfao(recentes)
+        return jsonify([job.to_dict() for job in recentes]), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,7 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
+from app.escritor import executar_escrita
+from app.idempotencia import idempotente
 from app.models import MetaPeso
+from app import perfil, tendencia
+from app.json_provider import json_bytes
+from app.lttb import lttb
+from app.serializacao import (
+    COLUNAS_META,
+    COLUNAS_HISTORICO_PESO,
+    meta_para_dict,
+    historico_peso_para_dict,
+    serializar_linhas,
+    resposta_json,
+)
 
 metas_bp = Blueprint("metas", __name__)
 
@@ -15,13 +28,13 @@ def get_metas():
     try:
         user_id = get_jwt_identity()
 
-        metas = (
-            MetaPeso.query.filter_by(user_id=user_id)
+        stmt = (
+            db.select(*COLUNAS_META)
+            .filter_by(user_id=user_id)
             .order_by(MetaPeso.data_registro.desc())
-            .all()
         )
 
-        return jsonify([m.to_dict() for m in metas]), 200
+        return resposta_json(serializar_linhas(stmt, meta_para_dict))
 
     except Exception as e:
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
@@ -56,6 +69,7 @@ def get_ultima_meta():
 # -------------------------------------------------------
 @metas_bp.route("/criar", methods=["POST"])
 @jwt_required()
+@idempotente
 def criar_meta():
     try:
         user_id = get_jwt_identity()
@@ -75,17 +89,21 @@ def criar_meta():
         except (ValueError, TypeError):
             return jsonify({"error": "Valor inválido para peso_meta."}), 400
 
-        meta = MetaPeso(
-            user_id=user_id,
-            peso_atual=peso_atual,
-            peso_meta=peso_meta,
-        )
+        def gravar():
+            meta = MetaPeso(
+                user_id=user_id,
+                peso_atual=peso_atual,
+                peso_meta=peso_meta,
+            )
+            db.session.add(meta)
+            tendencia.registrar_meta(meta)
+            perfil.incrementar(user_id)
+            return meta.to_dict()
 
-        db.session.add(meta)
-        db.session.commit()
+        meta = executar_escrita(user_id, gravar)
 
         return (
-            jsonify({"message": "Meta criada com sucesso!", "meta": meta.to_dict()}),
+            jsonify({"message": "Meta criada com sucesso!", "meta": meta}),
             201,
         )
 
@@ -96,28 +114,92 @@ def criar_meta():
 
 # ---------------------------------------------------------------------
 # GET /historico  → Histórico completo formatado para gráficos
+#                   (?pontos=N reduz a série com LTTB)
 # ---------------------------------------------------------------------
+LOTE_KEYSET = 1000
+
+
+def iterar_historico(user_id, lote=LOTE_KEYSET):
+    """Percorre o histórico em ordem cronológica, em lotes por keyset."""
+    ultimo = None
+    while True:
+        stmt = (
+            db.select(MetaPeso.id, *COLUNAS_HISTORICO_PESO)
+            .filter_by(user_id=user_id)
+            .order_by(MetaPeso.data_registro.asc(), MetaPeso.id.asc())
+            .limit(lote)
+        )
+        if ultimo is not None:
+            stmt = stmt.where(
+                db.tuple_(MetaPeso.data_registro, MetaPeso.id) > db.tuple_(*ultimo)
+            )
+
+        linhas = db.session.execute(stmt).all()
+        for id_, *linha in linhas:
+            yield linha
+        if len(linhas) < lote:
+            return
+
+        id_, data_registro = linhas[-1][0], linhas[-1][1]
+        ultimo = (data_registro, id_)
+
+
 @metas_bp.route("/historico", methods=["GET"])
 @jwt_required()
 def historico_peso():
     try:
         user_id = get_jwt_identity()
-        metas = (
-            MetaPeso.query.filter_by(user_id=user_id)
+
+        pontos = request.args.get("pontos")
+        if pontos is not None:
+            try:
+                pontos = int(pontos)
+            except ValueError:
+                return jsonify({"error": "Parâmetro 'pontos' deve ser inteiro."}), 400
+            if pontos < 3:
+                return jsonify({"error": "Parâmetro 'pontos' deve ser >= 3."}), 400
+
+            total = db.session.scalar(
+                db.select(db.func.count()).select_from(MetaPeso).filter_by(user_id=user_id)
+            )
+
+            if pontos < total:
+                amostra = lttb(
+                    iterar_historico(user_id),
+                    total,
+                    pontos,
+                    xy=lambda linha: (linha[0].timestamp(), linha[1]),
+                )
+                historico = [historico_peso_para_dict(linha) for linha in amostra]
+                return resposta_json(json_bytes(historico))
+
+        stmt = (
+            db.select(*COLUNAS_HISTORICO_PESO)
+            .filter_by(user_id=user_id)
             .order_by(MetaPeso.data_registro.asc())
-            .all()
         )
 
-        historico = [
-            {
-                "data": m.data_registro.strftime("%d/%m/%Y"),
-                "peso": m.peso_atual,
-                "meta": m.peso_meta,
-            }
-            for m in metas
-        ]
+        return resposta_json(serializar_linhas(stmt, historico_peso_para_dict))
+
+    except Exception as e:
+        return jsonify({"error": f"Erro interno: {str(e)}"}), 500
+
 
-        return jsonify(historico), 200
+# ---------------------------------------------------------------------
+# GET /tendencia  → Média móvel, inclinação e data estimada para a meta
+# ---------------------------------------------------------------------
+@metas_bp.route("/tendencia", methods=["GET"])
+@jwt_required()
+def tendencia_peso():
+    try:
+        user_id = get_jwt_identity()
+
+        estado = tendencia.obter(user_id)
+        if estado is None:
+            return jsonify({"error": "Nenhuma meta encontrada."}), 404
+
+        return jsonify(tendencia.calcular(estado)), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
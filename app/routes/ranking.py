@@ -0,0 +1,78 @@
+from datetime import date
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app import db, ranking
+
+ranking_bp = Blueprint("ranking", __name__)
+
+
+# ---------------------------------------------------------
+# GET /  → Ranking de déficit calórico do período
+# ---------------------------------------------------------
+@ranking_bp.route("/", methods=["GET"])
+@jwt_required()
+def get_ranking():
+    """
+    Ranking de déficit (calorias gastas - consumidas) por período.
+    Query params:
+        periodo: "semana" (padrão) ou "mes"
+        data: AAAA-MM-DD dentro do período (padrão: hoje)
+        pagina, por_pagina: paginação (padrão 1 e 20, máx. 100)
+    """
+    try:
+        user_id = get_jwt_identity()
+
+        periodo = request.args.get("periodo", "semana")
+        if periodo not in ranking.PERIODOS:
+            return jsonify({"error": "Parâmetro 'periodo' deve ser 'semana' ou 'mes'."}), 400
+
+        try:
+            referencia = date.fromisoformat(request.args.get("data") or date.today().isoformat())
+            pagina = max(1, int(request.args.get("pagina", 1)))
+            por_pagina = min(100, max(1, int(request.args.get("por_pagina", 20))))
+        except ValueError:
+            return jsonify({"error": "Parâmetros de data ou paginação inválidos."}), 400
+
+        inicio, fim = ranking.intervalo(periodo, referencia)
+        linhas, minha, total = ranking.classificacao(
+            periodo, inicio, (pagina - 1) * por_pagina, por_pagina, user_id
+        )
+
+        return (
+            jsonify(
+                {
+                    "periodo": periodo,
+                    "inicio": inicio.isoformat(),
+                    "fim": fim.isoformat(),
+                    "pagina": pagina,
+                    "por_pagina": por_pagina,
+                    "total_participantes": total,
+                    "ranking": [
+                        {
+                            "posicao": posicao,
+                            "user_id": uid,
+                            "nome": nome,
+                            "deficit": deficit,
+                            "dias": dias,
+                        }
+                        for posicao, uid, nome, deficit, dias in linhas
+                    ],
+                    "minha_posicao": (
+                        {
+                            "posicao": minha.posicao,
+                            "deficit": minha.deficit,
+                            "dias": minha.dias,
+                        }
+                        if minha
+                        else None
+                    ),
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Erro interno: {str(e)}"}), 500
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
+from app import db, dia, aderencia
+from app.escritor import executar_escrita
+from app.idempotencia import idempotente
 from app.models import RotinaAlimentar
+from app.upsert import upsert, inserir_se_ausente
 from app.utils import calcular_calorias_refeicao
 from datetime import date
 
@@ -18,13 +21,16 @@ def get_rotina_hoje():
         user_id = get_jwt_identity()
         hoje = date.today()
 
-        rotinas = RotinaAlimentar.query.filter_by(user_id=user_id, data=hoje).all()
+        doc = dia.documento(user_id, hoje)
+        if doc is None:
+            return jsonify({"error": "Usuário não encontrado."}), 404
 
         # Se não tem rotinas para hoje, cria as padrão
-        if not rotinas:
-            rotinas = criar_rotina_padrao_hoje(user_id)
+        if not doc["rotinas"]:
+            criar_rotina_padrao_hoje(user_id)
+            doc = dia.documento(user_id, hoje)
 
-        return jsonify([r.to_dict() for r in rotinas]), 200
+        return jsonify(doc["rotinas"]), 200
 
     except Exception as e:
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
@@ -40,16 +46,24 @@ def criar_rotina_padrao_hoje(user_id):
         ("Ceia", "Ceia"),
     ]
 
-    rotinas = []
-    for periodo, refeicao in periodos:
-        rotina = RotinaAlimentar(
-            user_id=user_id, periodo=periodo, refeicao=refeicao, concluido=False
-        )
-        db.session.add(rotina)
-        rotinas.append(rotina)
-
-    db.session.commit()
-    return rotinas
+    hoje = date.today()
+    executar_escrita(
+        user_id,
+        lambda: inserir_se_ausente(
+            RotinaAlimentar,
+            [
+                {
+                    "user_id": int(user_id),
+                    "periodo": periodo,
+                    "refeicao": refeicao,
+                    "concluido": False,
+                    "data": hoje,
+                }
+                for periodo, refeicao in periodos
+            ],
+            chave=("user_id", "data", "periodo"),
+        ),
+    )
 
 
 # --------------------------------------------------------
@@ -57,6 +71,7 @@ def criar_rotina_padrao_hoje(user_id):
 # --------------------------------------------------------
 @rotina_bp.route("/marcar", methods=["POST"])
 @jwt_required()
+@idempotente
 def marcar_refeicao():
     try:
         user_id = get_jwt_identity()
@@ -70,37 +85,32 @@ def marcar_refeicao():
         if not periodo:
             return jsonify({"error": "O campo 'periodo' é obrigatório."}), 400
 
-        # Buscar rotina existente
-        rotina = RotinaAlimentar.query.filter_by(
-            user_id=user_id, periodo=periodo, data=hoje
-        ).first()
-
-        # Se não existir → cria CORRETAMENTE
-        if not rotina:
-            rotina = RotinaAlimentar(
-                user_id=user_id,
-                periodo=periodo,
-                refeicao=periodo,
-                proteina_selecionada=proteina,  # ✅ CORRETO
-                concluido=concluido,
-                # data é preenchida automaticamente
+        def gravar():
+            # Upsert do dia (uma instrução, sem corrida entre SELECT e INSERT)
+            rotina = upsert(
+                RotinaAlimentar,
+                {
+                    "user_id": int(user_id),
+                    "data": hoje,
+                    "periodo": periodo,
+                    "refeicao": periodo,
+                    "proteina_selecionada": proteina,
+                    "concluido": concluido,
+                    "calorias": calcular_calorias_refeicao(periodo, proteina),
+                },
+                chave=("user_id", "data", "periodo"),
+                atualizar=("proteina_selecionada", "concluido", "calorias"),
             )
-            db.session.add(rotina)
-        else:
-            # Atualizações
-            rotina.proteina_selecionada = proteina
-            rotina.concluido = concluido
+            aderencia.marcar(user_id, hoje, periodo, concluido)
+            return rotina.to_dict()
 
-        # Calcula calorias
-        rotina.calorias = calcular_calorias_refeicao(periodo, proteina)
-
-        db.session.commit()
+        rotina = executar_escrita(user_id, gravar)
 
         return (
             jsonify(
                 {
                     "message": "Refeição atualizada com sucesso!",
-                    "rotina": rotina.to_dict(),
+                    "rotina": rotina,
                 }
             ),
             200,
@@ -123,15 +133,15 @@ def get_calorias_totais():
         user_id = get_jwt_identity()
         hoje = date.today()
 
-        rotinas = RotinaAlimentar.query.filter_by(user_id=user_id, data=hoje).all()
+        doc = dia.documento(user_id, hoje)
+        rotinas = doc["rotinas"] if doc else []
 
-        concluidas = [r for r in rotinas if r.concluido]
-        total_calorias = sum((r.calorias or 0) for r in concluidas)
+        concluidas = [r for r in rotinas if r["concluido"]]
 
         return (
             jsonify(
                 {
-                    "total_calorias": total_calorias,
+                    "total_calorias": dia.calorias_rotina(doc) if doc else 0,
                     "refeicoes_concluidas": len(concluidas),
                     "total_refeicoes": len(rotinas),
                 }
@@ -141,3 +151,28 @@ def get_calorias_totais():
 
     except Exception as e:
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
+
+
+# --------------------------------------------------------------------
+# GET /heatmap?ano=AAAA  → Dias com refeições concluídas e atividade
+# --------------------------------------------------------------------
+@rotina_bp.route("/heatmap", methods=["GET"])
+@jwt_required()
+def get_heatmap():
+    try:
+        user_id = get_jwt_identity()
+
+        ano = request.args.get("ano", date.today().year)
+        try:
+            ano = int(ano)
+        except ValueError:
+            return jsonify({"error": "Parâmetro 'ano' deve ser numérico."}), 400
+        if not 1 <= ano <= 9998:
+            return jsonify({"error": "Parâmetro 'ano' inválido."}), 400
+
+        registro = aderencia.obter(user_id, ano)
+        return jsonify(aderencia.para_dict(registro)), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Erro interno: {str(e)}"}), 500
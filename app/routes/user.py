@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
+from app import db, perfil
+from app.escritor import executar_escrita
 from app.models import User
 
 user_bp = Blueprint("user", __name__)
@@ -55,20 +56,26 @@ def update_user():
         }
 
         # Atualiza apenas o que foi enviado e é válido
+        alteracoes = {}
         for campo, tipo in campos_validos.items():
             if campo in data:
                 try:
-                    setattr(user, campo, tipo(data[campo]))
+                    alteracoes[campo] = tipo(data[campo])
                 except (ValueError, TypeError):
                     return jsonify({"error": f"Valor inválido para '{campo}'."}), 400
 
-        db.session.commit()
+        def gravar():
+            user = db.session.get(User, int(user_id))
+            for campo, valor in alteracoes.items():
+                setattr(user, campo, valor)
+            perfil.incrementar(user_id)
+            return user.to_dict()
 
         return (
             jsonify(
                 {
                     "message": "Perfil atualizado com sucesso!",
-                    "user": user.to_dict(),
+                    "user": executar_escrita(user_id, gravar),
                 }
             ),
             200,
@@ -0,0 +1,93 @@
+"""
+Serialização compacta para respostas grandes (históricos e exportações).
+
+Em vez de carregar entidades ORM e chamar to_dict() linha a linha, as rotas
+selecionam apenas as colunas necessárias (tuplas simples, sem identity map)
+e codificam o resultado direto para bytes JSON com o provedor ativo.
+"""
+
+from flask import current_app
+
+from app import db
+from app.json_provider import json_bytes
+from app.models import MetaPeso, AtividadeFisica
+
+
+# ---------------------------------------------------------
+# Projeções: colunas + conversor de tupla → dict
+# ---------------------------------------------------------
+COLUNAS_META = (
+    MetaPeso.id,
+    MetaPeso.peso_atual,
+    MetaPeso.peso_meta,
+    MetaPeso.data_registro,
+)
+
+
+def meta_para_dict(linha):
+    """Equivalente a MetaPeso.to_dict() a partir de COLUNAS_META."""
+    id_, peso_atual, peso_meta, data_registro = linha
+    return {
+        "id": id_,
+        "peso_atual": peso_atual,
+        "peso_meta": peso_meta,
+        "falta_perder": round(peso_atual - peso_meta, 1),
+        "data_registro": data_registro.isoformat(),
+    }
+
+
+COLUNAS_HISTORICO_PESO = (
+    MetaPeso.data_registro,
+    MetaPeso.peso_atual,
+    MetaPeso.peso_meta,
+)
+
+
+def historico_peso_para_dict(linha):
+    data_registro, peso, meta = linha
+    return {
+        "data": data_registro.strftime("%d/%m/%Y"),
+        "peso": peso,
+        "meta": meta,
+    }
+
+
+COLUNAS_ATIVIDADE = (
+    AtividadeFisica.id,
+    AtividadeFisica.km_percorridos,
+    AtividadeFisica.calorias_perdidas,
+    AtividadeFisica.calorias_trabalho,
+    AtividadeFisica.data,
+)
+
+
+def atividade_para_dict(linha):
+    """Equivalente a AtividadeFisica.to_dict() a partir de COLUNAS_ATIVIDADE."""
+    id_, km, perdidas, trabalho, data = linha
+    return {
+        "id": id_,
+        "km_percorridos": km,
+        "calorias_perdidas": perdidas,
+        "calorias_trabalho": trabalho,
+        "data": data.isoformat(),
+    }
+
+
+# ---------------------------------------------------------
+# Execução e resposta
+# ---------------------------------------------------------
+def projetar_linhas(stmt, conversor):
+    """Executa um select de colunas e converte cada tupla com `conversor`."""
+    return [conversor(linha) for linha in db.session.execute(stmt).tuples()]
+
+
+def serializar_linhas(stmt, conversor):
+    """Executa um select de colunas e devolve a lista como bytes JSON."""
+    return json_bytes(projetar_linhas(stmt, conversor))
+
+
+def resposta_json(corpo, status=200):
+    """Response a partir de bytes JSON já codificados."""
+    return current_app.response_class(
+        corpo + b"\n", status=status, mimetype="application/json"
+    )
@@ -0,0 +1,403 @@
+"""
+Particionamento (sharding) opcional das tabelas por usuário.
+
+Com SHARD_COUNT > 1, as tabelas marcadas com info={"por_usuario": True}
+(MetaPeso, RotinaAlimentar, AtividadeFisica, CaloriasExtras,
+ConsumoCalorico, ...) passam a viver em N arquivos/binds `shard_<n>`; `users`
+e as tabelas globais continuam no banco principal. Cada uma declara também
+info["mover"] (ver MODOS_MOVER), usado por `flask shards mover`.
+
+O shard é escolhido pelo diretório `shard_usuarios` (quando o usuário foi
+movido) ou por hash(user_id) % SHARD_COUNT (blake2b, estável entre processos). A sessão roteia sozinha:
+usa o shard definido por `shard_do_usuario()` ou, dentro de uma requisição
+autenticada, o do usuário do JWT — os blueprints não mudam.
+"""
+
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import click
+import sqlalchemy as sa
+from flask import current_app, has_request_context
+from flask.cli import with_appcontext
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+
+from app.cache_backends import ao_invalidar, criar_cache, publicar_invalidacao
+
+_shard_atual = ContextVar("shard_atual", default=None)
+
+
+# ---------------------------------------------------------
+# Configuração
+# ---------------------------------------------------------
+def configurar_binds(app):
+    """Adiciona os binds shard_<n> ao SQLALCHEMY_BINDS antes do db.init_app."""
+    total = app.config.get("SHARD_COUNT", 1)
+    if total <= 1:
+        return
+
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    for n in range(total):
+        binds[nome_bind(n)] = app.config["SHARD_URI_TEMPLATE"].format(n=n)
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+    cache = app.extensions["shard_diretorio"] = criar_cache(
+        app,
+        "shard_diretorio",
+        maxsize=app.config.get("SHARD_DIRETORIO_CACHE", 100_000),
+        ttl=app.config.get("SHARD_DIRETORIO_TTL", 60),
+    )
+    ao_invalidar(app, "shard_diretorio", cache.delete)
+
+
+def nome_bind(n):
+    return f"shard_{n}"
+
+
+def total_shards(app=None):
+    return (app or current_app).config.get("SHARD_COUNT", 1)
+
+
+def sharding_ativo(app=None):
+    return total_shards(app) > 1
+
+
+def tabela_por_usuario(tabela):
+    return tabela is not None and tabela.info.get("por_usuario", False)
+
+
+def tabelas_por_usuario(metadata):
+    return [t for t in metadata.sorted_tables if tabela_por_usuario(t)]
+
+
+def shard_por_hash(user_id, total):
+    digest = hashlib.blake2b(str(int(user_id)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % total
+
+
+# ---------------------------------------------------------
+# Diretório usuário → shard
+# ---------------------------------------------------------
+def shard_do_diretorio(db, user_id):
+    """Shard registrado para o usuário (após um `flask shards mover`), ou None."""
+    from app.models import ShardUsuario
+
+    cache = current_app.extensions["shard_diretorio"]
+    user_id = int(user_id)
+
+    shard = cache.get(user_id, -1)
+    if shard == -1:
+        with db.engine.connect() as conn:
+            shard = conn.execute(
+                sa.select(ShardUsuario.shard).where(ShardUsuario.user_id == user_id)
+            ).scalar()
+        cache.set(user_id, shard)
+    return shard
+
+
+def shard_para_usuario(db, user_id):
+    total = total_shards()
+    shard = shard_do_diretorio(db, user_id)
+    if shard is None or shard >= total:
+        shard = shard_por_hash(user_id, total)
+    return shard
+
+
+@contextmanager
+def usar_shard(shard):
+    token = _shard_atual.set(shard)
+    try:
+        yield shard
+    finally:
+        _shard_atual.reset(token)
+
+
+@contextmanager
+def shard_do_usuario(user_id):
+    """Fixa o shard do usuário para as operações da sessão dentro do bloco."""
+    from app import db
+
+    if not sharding_ativo():
+        yield None
+        return
+
+    with usar_shard(shard_para_usuario(db, user_id)) as shard:
+        yield shard
+
+
+def shard_corrente(db):
+    shard = _shard_atual.get()
+    if shard is not None:
+        return shard
+
+    if has_request_context():
+        from flask_jwt_extended import get_jwt_identity
+
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:
+            user_id = None
+
+        if user_id is not None:
+            return shard_para_usuario(db, user_id)
+
+    raise RuntimeError(
+        "Operação em tabela por usuário sem shard definido "
+        "(use shard_do_usuario(user_id))."
+    )
+
+
+def engine_do_shard(db, shard):
+    if not sharding_ativo():
+        return db.engine
+    return db.engines[nome_bind(shard)]
+
+
+def engines_dos_shards(db):
+    """[(shard, engine)] de todos os shards (ou [(None, principal)])."""
+    if not sharding_ativo():
+        return [(None, db.engine)]
+    return [(n, db.engines[nome_bind(n)]) for n in range(total_shards())]
+
+
+# ---------------------------------------------------------
+# Sessão e extensão
+# ---------------------------------------------------------
+def _tabela_de(mapper, clause):
+    if mapper is not None:
+        return sa.inspect(mapper).local_table
+    if isinstance(clause, sa.Table):
+        return clause
+    if isinstance(clause, sa.sql.dml.UpdateBase) and isinstance(clause.table, sa.Table):
+        return clause.table
+    return None
+
+
+class ShardedSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and sharding_ativo():
+            if tabela_por_usuario(_tabela_de(mapper, clause)):
+                return engine_do_shard(self._db, shard_corrente(self._db))
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ShardedSQLAlchemy(SQLAlchemy):
+    """create_all/drop_all também criam as tabelas por usuário em cada shard."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("session_options", {}).setdefault("class_", ShardedSession)
+        super().__init__(**kwargs)
+
+    def _call_for_binds(self, bind_key, op_name):
+        chaves = bind_key
+        if bind_key == "__all__":
+            # `metadatas` é do objeto db (global): ignora binds shard_<n> de
+            # outro app criado no mesmo processo com mais shards
+            chaves = [chave for chave in self.metadatas if chave in self.engines]
+        super()._call_for_binds(chaves, op_name)
+
+        if bind_key in ("__all__", None) and sharding_ativo():
+            tabelas = tabelas_por_usuario(self.metadata)
+            for _, engine in engines_dos_shards(self):
+                getattr(self.metadata, op_name)(bind=engine, tables=tabelas)
+
+
+# ---------------------------------------------------------
+# CLI: flask shards ...
+# ---------------------------------------------------------
+@click.group("shards")
+def shards_cli():
+    """Gerencia o particionamento de usuários entre shards."""
+
+
+def _localizacao(db, user_id, total_anterior=None):
+    """Shard onde os dados do usuário estão hoje (None = banco principal)."""
+    shard = shard_do_diretorio(db, user_id)
+    if shard is not None:
+        return shard
+    if total_anterior is not None:
+        return None if total_anterior <= 1 else shard_por_hash(user_id, total_anterior)
+    return shard_por_hash(user_id, total_shards())
+
+
+def _engine_origem(db, shard):
+    return db.engine if shard is None else engine_do_shard(db, shard)
+
+
+def contar_linhas(engine, tabelas, user_id=None):
+    total = 0
+    with engine.connect() as conn:
+        for tabela in tabelas:
+            stmt = sa.select(sa.func.count()).select_from(tabela)
+            if user_id is not None:
+                stmt = stmt.where(tabela.c.user_id == user_id)
+            total += conn.execute(stmt).scalar()
+    return total
+
+
+# Como cada tabela por usuário é copiada (info["mover"], obrigatório):
+#   "id"       chave substituta `id` autoincremento: o destino gera outro id
+#              (ids de usuários diferentes colidem entre shards)
+#   "natural"  chave primária natural com user_id: copiada como está
+MODOS_MOVER = ("id", "natural")
+
+
+def colunas_para_mover(tabela):
+    """Colunas copiadas pelo mover, conforme o modo declarado na tabela."""
+    modo = tabela.info.get("mover")
+    chave = [c.name for c in tabela.primary_key]
+
+    if modo == "id" and chave == ["id"]:
+        return [c for c in tabela.c if c.name != "id"]
+    if modo == "natural" and "user_id" in chave:
+        return list(tabela.c)
+
+    raise RuntimeError(
+        f"Tabela por usuário '{tabela.name}' sem modo de cópia válido para o mover "
+        f"(info['mover'] em {MODOS_MOVER}; chave primária {chave})."
+    )
+
+
+def mover_usuario(db, user_id, origem, destino):
+    """
+    Copia as linhas do usuário para o shard destino, atualiza o diretório e
+    só então apaga da origem. Reexecutar após uma falha é seguro.
+    """
+    from app.models import ShardUsuario
+
+    tabelas = tabelas_por_usuario(db.metadata)
+    # Valida todas antes de copiar qualquer uma
+    colunas = {tabela.name: colunas_para_mover(tabela) for tabela in tabelas}
+    engine_origem = _engine_origem(db, origem)
+    engine_destino = engine_do_shard(db, destino)
+    movidas = 0
+
+    if engine_origem is not engine_destino:
+        with engine_origem.connect() as src, engine_destino.begin() as dst:
+            for tabela in tabelas:
+                # Remove cópias parciais de uma execução anterior interrompida
+                dst.execute(tabela.delete().where(tabela.c.user_id == user_id))
+
+                linhas = [
+                    dict(r._mapping)
+                    for r in src.execute(
+                        sa.select(*colunas[tabela.name]).where(tabela.c.user_id == user_id)
+                    )
+                ]
+                if linhas:
+                    dst.execute(tabela.insert(), linhas)
+                    movidas += len(linhas)
+
+    with db.engine.begin() as conn:
+        conn.execute(ShardUsuario.__table__.delete().where(ShardUsuario.user_id == user_id))
+        conn.execute(ShardUsuario.__table__.insert(), {"user_id": user_id, "shard": destino})
+    current_app.extensions["shard_diretorio"].delete(int(user_id))
+    publicar_invalidacao("shard_diretorio", int(user_id))
+
+    if engine_origem is not engine_destino:
+        with engine_origem.begin() as conn:
+            for tabela in reversed(tabelas):
+                conn.execute(tabela.delete().where(tabela.c.user_id == user_id))
+
+    return movidas
+
+
+def _exigir_sharding():
+    if not sharding_ativo():
+        raise click.ClickException("SHARD_COUNT <= 1: sharding desativado.")
+
+
+@shards_cli.command("status")
+@with_appcontext
+def status_cmd():
+    """Usuários e linhas por shard."""
+    from app import db
+    from app.models import User
+
+    _exigir_sharding()
+    tabelas = tabelas_por_usuario(db.metadata)
+    user_ids = db.session.scalars(sa.select(User.id)).all()
+
+    usuarios = {}
+    for uid in user_ids:
+        shard = _localizacao(db, uid)
+        usuarios[shard] = usuarios.get(shard, 0) + 1
+
+    for shard, engine in engines_dos_shards(db):
+        click.echo(
+            f"shard {shard}: {usuarios.get(shard, 0)} usuários, "
+            f"{contar_linhas(engine, tabelas)} linhas ({engine.url})"
+        )
+
+
+@shards_cli.command("mover")
+@click.argument("user_id", type=int)
+@click.argument("destino", type=int)
+@with_appcontext
+def mover_cmd(user_id, destino):
+    """Move um usuário para o shard DESTINO."""
+    from app import db
+
+    _exigir_sharding()
+    if not 0 <= destino < total_shards():
+        raise click.ClickException(f"Shard inválido: {destino}")
+
+    origem = _localizacao(db, user_id)
+    movidas = mover_usuario(db, user_id, origem, destino)
+    click.echo(f"Usuário {user_id}: shard {origem} → {destino} ({movidas} linhas)")
+
+
+@shards_cli.command("rebalancear")
+@click.option(
+    "--anterior",
+    type=int,
+    default=None,
+    help="SHARD_COUNT anterior: redistribui após mudar o número de shards "
+    "(1 = dados ainda no banco principal).",
+)
+@click.option("--dry-run", is_flag=True, help="Só mostra o que seria movido.")
+@with_appcontext
+def rebalancear_cmd(anterior, dry_run):
+    """
+    Sem --anterior, equilibra o número de usuários entre os shards movendo
+    usuários do shard mais cheio para o mais vazio.
+    """
+    from app import db
+    from app.models import User
+
+    _exigir_sharding()
+    total = total_shards()
+    user_ids = db.session.scalars(sa.select(User.id)).all()
+
+    if anterior is not None:
+        plano = [
+            (uid, _localizacao(db, uid, anterior), shard_por_hash(uid, total))
+            for uid in user_ids
+        ]
+        plano = [p for p in plano if p[1] != p[2]]
+    else:
+        por_shard = {n: [] for n in range(total)}
+        for uid in user_ids:
+            por_shard[_localizacao(db, uid)].append(uid)
+
+        plano = []
+        while True:
+            cheio = max(por_shard, key=lambda n: len(por_shard[n]))
+            vazio = min(por_shard, key=lambda n: len(por_shard[n]))
+            if len(por_shard[cheio]) - len(por_shard[vazio]) <= 1:
+                break
+            uid = por_shard[cheio].pop()
+            por_shard[vazio].append(uid)
+            plano.append((uid, cheio, vazio))
+
+    for uid, origem, destino in plano:
+        if dry_run:
+            click.echo(f"[dry-run] usuário {uid}: {origem} → {destino}")
+            continue
+        movidas = mover_usuario(db, uid, origem, destino)
+        click.echo(f"usuário {uid}: {origem} → {destino} ({movidas} linhas)")
+
+    click.echo(f"{len(plano)} usuário(s) {'a mover' if dry_run else 'movido(s)'}.")
@@ -0,0 +1,100 @@
+"""
+Aquecimento do worker: pool de conexões, mappers e queries quentes.
+Também mede o tempo até a primeira requisição atendida.
+"""
+
+import threading
+import time
+from datetime import date
+
+from flask import request
+from sqlalchemy import select, text
+from sqlalchemy.orm import configure_mappers
+
+from app.sharding import engines_dos_shards, usar_shard
+
+
+def queries_quentes():
+    """
+    Statements usados em praticamente toda requisição autenticada.
+    Executá-los uma vez (com user_id inexistente) popula o cache de
+    compilação do SQLAlchemy, que ignora os valores dos parâmetros.
+    """
+    from app.models import (
+        User,
+        MetaPeso,
+        RotinaAlimentar,
+        AtividadeFisica,
+        CaloriasExtras,
+        ConsumoCalorico,
+    )
+
+    hoje = date.today()
+    return [
+        select(User).where(User.id == 0),
+        select(MetaPeso)
+        .filter_by(user_id=0)
+        .order_by(MetaPeso.data_registro.desc())
+        .limit(1),
+        select(RotinaAlimentar).filter_by(user_id=0, data=hoje),
+        select(AtividadeFisica).filter_by(user_id=0, data=hoje).limit(1),
+        select(CaloriasExtras).filter_by(user_id=0, data=hoje),
+        select(ConsumoCalorico).filter_by(user_id=0, data=hoje).limit(1),
+    ]
+
+
+def aquecer(app, db):
+    """Pré-abre conexões do pool e compila as queries quentes."""
+    inicio = time.perf_counter()
+
+    with app.app_context():
+        try:
+            configure_mappers()
+
+            engines = [db.engine] + [
+                engine for shard, engine in engines_dos_shards(db) if shard is not None
+            ]
+            for engine in engines:
+                conexoes = [
+                    engine.connect()
+                    for _ in range(max(1, app.config.get("WARMUP_POOL_CONNECTIONS", 1)))
+                ]
+                for conexao in conexoes:
+                    conexao.close()
+
+            db.session.execute(text("SELECT 1"))
+            for shard, _ in engines_dos_shards(db):
+                with usar_shard(shard):
+                    for stmt in queries_quentes():
+                        db.session.execute(stmt).all()
+            db.session.remove()
+
+        except Exception as e:
+            # Banco ainda sem schema (ex.: antes do create_all) não impede o boot
+            app.logger.warning(f"Aquecimento incompleto: {e}")
+
+    app.extensions["startup"]["aquecimento_ms"] = round(
+        (time.perf_counter() - inicio) * 1000, 2
+    )
+
+
+def medir_primeira_requisicao(app, inicio):
+    """Registra o tempo entre o import do app e a primeira requisição."""
+    lock = threading.Lock()
+    medida = False
+
+    def primeira_requisicao():
+        # Hook fica registrado (remover durante preprocess_request altera a
+        # lista que o Flask percorre); depois da primeira, só lê a flag
+        nonlocal medida
+        if medida:
+            return
+        with lock:
+            if medida:
+                return
+            medida = True
+        ms = round((time.perf_counter() - inicio) * 1000, 2)
+        app.extensions["startup"]["primeira_requisicao_ms"] = ms
+        app.logger.info(f"Tempo até a primeira requisição: {ms} ms ({request.path})")
+
+    app.before_request(primeira_requisicao)
@@ -0,0 +1,139 @@
+"""
+Tendência de peso incremental.
+
+Cada usuário tem um registro em `tendencia_peso` com as somas da regressão
+linear (n, Σx, Σy, Σxy, Σx²) e os últimos pesos da média móvel. Cada nova
+MetaPeso atualiza o registro em O(1); a leitura não varre o histórico.
+O registro é (re)construído a partir do histórico só quando ainda não
+existe ou quando chega um ponto fora de ordem.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.escritor import executar_escrita
+from app.models import MetaPeso, TendenciaPeso
+
+
+def _dias(tendencia, momento):
+    return (momento - tendencia.origem).total_seconds() / 86400
+
+
+def _acumular(tendencia, momento, peso, peso_meta, tamanho_janela):
+    x = _dias(tendencia, momento)
+    tendencia.n += 1
+    tendencia.soma_x += x
+    tendencia.soma_y += peso
+    tendencia.soma_xy += x * peso
+    tendencia.soma_xx += x * x
+    tendencia.ultimo_registro = momento
+    tendencia.peso_meta = peso_meta
+
+    janela = json.loads(tendencia.janela)
+    janela.append(peso)
+    tendencia.janela = json.dumps(janela[-tamanho_janela:])
+
+
+def reconstruir(user_id):
+    """Recalcula as somas a partir de todo o histórico de MetaPeso."""
+    tamanho_janela = current_app.config["TENDENCIA_JANELA"]
+
+    pontos = (
+        db.session.query(MetaPeso.data_registro, MetaPeso.peso_atual, MetaPeso.peso_meta)
+        .filter(MetaPeso.user_id == user_id)
+        .order_by(MetaPeso.data_registro.asc(), MetaPeso.id.asc())
+        .all()
+    )
+
+    tendencia = db.session.get(TendenciaPeso, int(user_id))
+    if not pontos:
+        if tendencia:
+            db.session.delete(tendencia)
+        return None
+
+    if tendencia:
+        db.session.delete(tendencia)
+        db.session.flush()
+
+    tendencia = TendenciaPeso(user_id=int(user_id), origem=pontos[0][0])
+    for momento, peso, peso_meta in pontos:
+        _acumular(tendencia, momento, peso, peso_meta, tamanho_janela)
+
+    db.session.add(tendencia)
+    return tendencia
+
+
+def registrar_meta(meta):
+    """
+    Atualiza a tendência com uma MetaPeso recém-adicionada à sessão.
+    Deve ser chamada antes do commit.
+    """
+    db.session.flush()
+
+    tendencia = db.session.get(TendenciaPeso, int(meta.user_id))
+    if tendencia is None or meta.data_registro < tendencia.ultimo_registro:
+        # Sem estado ainda (ou ponto fora de ordem): uma varredura só
+        return reconstruir(meta.user_id)
+
+    _acumular(
+        tendencia,
+        meta.data_registro,
+        meta.peso_atual,
+        meta.peso_meta,
+        current_app.config["TENDENCIA_JANELA"],
+    )
+    return tendencia
+
+
+def invalidar(user_id):
+    """Descarta o estado (ex.: após importação em lote); reconstruído na leitura."""
+    TendenciaPeso.query.filter_by(user_id=int(user_id)).delete()
+
+
+def obter(user_id):
+    tendencia = db.session.get(TendenciaPeso, int(user_id))
+    if tendencia is None:
+        # Reconstrução é escrita: vai pelo escritor e é relida nesta sessão
+        executar_escrita(user_id, lambda: reconstruir(user_id))
+        tendencia = db.session.get(TendenciaPeso, int(user_id))
+    return tendencia
+
+
+def calcular(tendencia):
+    """Média móvel, inclinação da regressão e data estimada para a meta."""
+    n = tendencia.n
+    janela = json.loads(tendencia.janela)
+    media_movel = round(sum(janela) / len(janela), 2) if janela else None
+
+    inclinacao = None
+    peso_estimado = None
+    data_estimada = None
+
+    denominador = n * tendencia.soma_xx - tendencia.soma_x**2
+    if n >= 2 and denominador > 1e-12:
+        inclinacao = (n * tendencia.soma_xy - tendencia.soma_x * tendencia.soma_y) / denominador
+        intercepto = (tendencia.soma_y - inclinacao * tendencia.soma_x) / n
+
+        x_hoje = _dias(tendencia, datetime.utcnow())
+        peso_estimado = round(intercepto + inclinacao * x_hoje, 2)
+
+        meta = tendencia.peso_meta
+        if meta is not None and inclinacao != 0:
+            x_meta = (meta - intercepto) / inclinacao
+            # Só faz sentido se a reta caminha na direção da meta
+            if x_meta >= x_hoje:
+                data_estimada = (tendencia.origem + timedelta(days=x_meta)).date()
+
+    return {
+        "pontos": n,
+        "janela_media_movel": len(janela),
+        "media_movel": media_movel,
+        "inclinacao_kg_dia": round(inclinacao, 4) if inclinacao is not None else None,
+        "inclinacao_kg_semana": round(inclinacao * 7, 3) if inclinacao is not None else None,
+        "peso_estimado_hoje": peso_estimado,
+        "peso_meta": tendencia.peso_meta,
+        "data_estimada_meta": data_estimada.isoformat() if data_estimada else None,
+    }
@@ -0,0 +1,179 @@
+"""
+Leitura incremental de trilhas GPX/TCX.
+
+O XML é lido com iterparse direto do stream do upload; cada ponto (e cada
+segmento) é removido do pai assim que termina, então a memória fica
+constante mesmo em trilhas de várias horas. A distância é a soma das
+distâncias haversine entre pontos consecutivos do mesmo segmento (trkseg no
+GPX, Track no TCX).
+
+Calorias: estimativa líquida de kcal por kg por km conforme a modalidade
+(tipo/Sport do arquivo ou, sem ele, a velocidade média).
+"""
+
+import math
+from datetime import datetime
+from xml.etree.ElementTree import ParseError, iterparse
+
+RAIO_TERRA_KM = 6371.0088
+
+# kcal por kg de peso por km percorrido (aproximações usuais)
+FATORES_KCAL = {
+    "caminhada": 0.5,
+    "corrida": 1.0,
+    "ciclismo": 0.3,
+}
+
+# Nomes usados em <type> (GPX) e Sport= (TCX)
+MODALIDADES = {
+    "walking": "caminhada",
+    "hiking": "caminhada",
+    "caminhada": "caminhada",
+    "running": "corrida",
+    "run": "corrida",
+    "corrida": "corrida",
+    "biking": "ciclismo",
+    "cycling": "ciclismo",
+    "ciclismo": "ciclismo",
+}
+
+
+class TrilhaInvalida(ValueError):
+    """Arquivo que não é GPX/TCX ou sem pontos com coordenadas."""
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(a))
+
+
+def _nome(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _momento(texto):
+    try:
+        return datetime.fromisoformat(texto.strip()) if texto else None
+    except ValueError:
+        return None
+
+
+def _filho(elem, nome):
+    for filho in elem:
+        if _nome(filho.tag) == nome:
+            return filho
+    return None
+
+
+def _ponto_gpx(elem):
+    lat, lon = elem.get("lat"), elem.get("lon")
+    if lat is None or lon is None:
+        return None
+    tempo = _filho(elem, "time")
+    return float(lat), float(lon), _momento(tempo.text if tempo is not None else None)
+
+
+def _ponto_tcx(elem):
+    posicao = _filho(elem, "Position")
+    if posicao is None:
+        return None  # pausa: Trackpoint sem coordenadas
+    lat = _filho(posicao, "LatitudeDegrees")
+    lon = _filho(posicao, "LongitudeDegrees")
+    if lat is None or lon is None:
+        return None
+    tempo = _filho(elem, "Time")
+    return float(lat.text), float(lon.text), _momento(tempo.text if tempo is not None else None)
+
+
+PONTOS = {"trkpt": _ponto_gpx, "Trackpoint": _ponto_tcx}
+SEGMENTOS = {"trkseg", "Track"}
+
+
+def ler_trilha(arquivo):
+    """Resumo da trilha: formato, pontos, km, início, fim e modalidade do arquivo."""
+    formato = None
+    modalidade = None
+    pontos = 0
+    km = 0.0
+    inicio = fim = None
+    anterior = None
+    caminho = []  # ancestrais do elemento atual
+
+    try:
+        for evento, elem in iterparse(arquivo, events=("start", "end")):
+            nome = _nome(elem.tag)
+
+            if evento == "start":
+                if formato is None:
+                    if nome not in ("gpx", "TrainingCenterDatabase"):
+                        raise TrilhaInvalida("O arquivo não é GPX nem TCX.")
+                    formato = "gpx" if nome == "gpx" else "tcx"
+                elif nome == "Activity" and elem.get("Sport"):
+                    modalidade = modalidade or elem.get("Sport")
+                caminho.append(elem)
+                continue
+
+            caminho.pop()
+
+            if nome in PONTOS:
+                ponto = PONTOS[nome](elem)
+                if ponto is not None:
+                    lat, lon, momento = ponto
+                    pontos += 1
+                    if anterior is not None:
+                        km += haversine_km(anterior[0], anterior[1], lat, lon)
+                    anterior = (lat, lon)
+                    if momento is not None:
+                        inicio = inicio or momento
+                        fim = momento
+            elif nome in SEGMENTOS:
+                anterior = None
+            else:
+                if nome == "type" and formato == "gpx" and elem.text:
+                    modalidade = modalidade or elem.text.strip()
+                continue
+
+            if caminho:
+                caminho[-1].remove(elem)
+    except ParseError as e:
+        raise TrilhaInvalida(f"XML inválido: {e}")
+    except ValueError as e:
+        if isinstance(e, TrilhaInvalida):
+            raise
+        raise TrilhaInvalida(f"Coordenada inválida: {e}")
+
+    if not pontos:
+        raise TrilhaInvalida("Nenhum ponto com coordenadas no arquivo.")
+
+    duracao = (fim - inicio).total_seconds() if inicio and fim else None
+    return {
+        "formato": formato,
+        "pontos": pontos,
+        "km": km,
+        "inicio": inicio,
+        "fim": fim,
+        "duracao_segundos": duracao,
+        "modalidade": MODALIDADES.get((modalidade or "").lower()),
+    }
+
+
+def modalidade_por_velocidade(km, duracao_segundos):
+    if not duracao_segundos:
+        return "caminhada"
+    velocidade = km / (duracao_segundos / 3600)
+    if velocidade < 7:
+        return "caminhada"
+    if velocidade < 16:
+        return "corrida"
+    return "ciclismo"
+
+
+def estimar_calorias(trilha, peso):
+    modalidade = trilha["modalidade"] or modalidade_por_velocidade(
+        trilha["km"], trilha["duracao_segundos"]
+    )
+    return modalidade, round(FATORES_KCAL[modalidade] * peso * trilha["km"])
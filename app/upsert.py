@@ -0,0 +1,170 @@
+"""
+Upserts em uma instrução para as escritas por dia.
+
+    INSERT ... ON CONFLICT (chave) DO UPDATE SET ... RETURNING *
+
+A chave é o índice único do dia (ex.: user_id + data). Evita o
+SELECT-then-INSERT em Python e a corrida que gerava linhas duplicadas.
+SQLite (>= 3.35) e PostgreSQL usam o upsert nativo; outros dialetos caem
+no caminho antigo (SELECT + INSERT/UPDATE).
+
+Bancos criados antes dos índices únicos:
+
+    flask upsert preparar [--dry-run]
+
+remove duplicatas (fica a linha de menor id, a que as rotas atualizavam)
+e cria os índices em cada shard.
+"""
+
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.eventos import registrar_alteracao
+from app.models import RotinaAlimentar, AtividadeFisica, ConsumoCalorico
+from app.sharding import engines_dos_shards
+
+INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Tabelas com índice único por dia
+MODELOS_POR_DIA = (RotinaAlimentar, AtividadeFisica, ConsumoCalorico)
+
+
+def _insert_nativo(modelo):
+    dialeto = db.session.get_bind(mapper=modelo).dialect.name
+    return INSERTS.get(dialeto)
+
+
+def upsert(modelo, valores, chave, atualizar, somar=()):
+    """
+    Insere `valores` ou, se a chave já existe, atualiza só as colunas em
+    `atualizar` — as que também estão em `somar` recebem valor atual + novo.
+    Retorna a instância ORM resultante (sem commit).
+    """
+    insert = _insert_nativo(modelo)
+    filtro = {coluna: valores[coluna] for coluna in chave}
+
+    if insert is not None:
+        stmt = insert(modelo).values(**valores)
+        novos = {}
+        for coluna in atualizar:
+            novos[coluna] = stmt.excluded[coluna]
+            if coluna in somar:
+                atual = getattr(modelo.__table__.c, coluna)
+                novos[coluna] = sa.func.coalesce(atual, 0) + stmt.excluded[coluna]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(chave),
+            set_=novos,
+        ).returning(modelo)
+        obj = db.session.scalars(
+            stmt, execution_options={"populate_existing": True}
+        ).one()
+    else:
+        existente = db.session.scalars(sa.select(modelo).filter_by(**filtro)).first()
+        if existente is None:
+            db.session.execute(sa.insert(modelo).values(**valores))
+        else:
+            for coluna in atualizar:
+                valor = valores[coluna]
+                if coluna in somar:
+                    valor = (getattr(existente, coluna) or 0) + valor
+                setattr(existente, coluna, valor)
+            db.session.flush()
+        obj = db.session.scalars(
+            sa.select(modelo).filter_by(**filtro),
+            execution_options={"populate_existing": True},
+        ).one()
+
+    # Core não passa pelo after_flush: avisa o barramento explicitamente
+    registrar_alteracao(db.session, valores["user_id"], valores.get("data"), modelo.__tablename__)
+    return obj
+
+
+def inserir_se_ausente(modelo, linhas, chave):
+    """INSERT ... ON CONFLICT DO NOTHING para várias linhas (sem commit)."""
+    insert = _insert_nativo(modelo)
+
+    if insert is not None:
+        db.session.execute(
+            insert(modelo).on_conflict_do_nothing(index_elements=list(chave)),
+            linhas,
+        )
+    else:
+        for linha in linhas:
+            filtro = {coluna: linha[coluna] for coluna in chave}
+            if db.session.scalars(sa.select(modelo).filter_by(**filtro)).first() is None:
+                db.session.execute(sa.insert(modelo).values(**linha))
+
+    for linha in linhas:
+        registrar_alteracao(db.session, linha["user_id"], linha.get("data"), modelo.__tablename__)
+
+
+def upsert_em_lote(conn, tabela, linhas, chave, atualizar):
+    """
+    Versão Core para importações (executemany numa conexão já aberta).
+    Linhas repetidas no mesmo lote: vale a última.
+    """
+    insert = INSERTS.get(conn.dialect.name)
+    if insert is None:
+        raise click.ClickException(f"Upsert em lote não suportado em {conn.dialect.name}.")
+
+    unicas = {tuple(linha[coluna] for coluna in chave): linha for linha in linhas}
+    stmt = insert(tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(chave),
+        set_={coluna: stmt.excluded[coluna] for coluna in atualizar},
+    )
+    conn.execute(stmt, list(unicas.values()))
+
+
+# ---------------------------------------------------------
+# CLI: flask upsert preparar
+# ---------------------------------------------------------
+def _indice_unico(modelo):
+    return next(indice for indice in modelo.__table__.indexes if indice.unique)
+
+
+def _duplicatas(conn, tabela, colunas):
+    agrupado = (
+        sa.select(sa.func.min(tabela.c.id))
+        .group_by(*[tabela.c[c] for c in colunas])
+        .scalar_subquery()
+    )
+    excedentes = sa.select(sa.func.count()).where(tabela.c.id.not_in(agrupado))
+    return conn.execute(excedentes).scalar(), sa.delete(tabela).where(tabela.c.id.not_in(agrupado))
+
+
+@click.group("upsert")
+def upsert_cli():
+    """Índices únicos usados pelos upserts por dia."""
+
+
+@upsert_cli.command("preparar")
+@click.option("--dry-run", is_flag=True, help="Só conta as duplicatas.")
+@with_appcontext
+def preparar_cmd(dry_run):
+    """Remove linhas duplicadas por dia e cria os índices únicos."""
+    for shard, engine in engines_dos_shards(db):
+        rotulo = "principal" if shard is None else f"shard {shard}"
+        with engine.begin() as conn:
+            for modelo in MODELOS_POR_DIA:
+                tabela = modelo.__table__
+                indice = _indice_unico(modelo)
+                colunas = [coluna.name for coluna in indice.columns]
+
+                excedentes, remover = _duplicatas(conn, tabela, colunas)
+                click.echo(f"[{rotulo}] {tabela.name}: {excedentes} duplicata(s)")
+                if dry_run:
+                    continue
+
+                if excedentes:
+                    conn.execute(remover)
+                indice.create(bind=conn, checkfirst=True)
+
+    if not dry_run:
+        click.echo("Índices únicos prontos.")
@@ -0,0 +1,3 @@
+"""
+Ferramentas de benchmark da API (fora do pacote da aplicação).
+"""
@@ -0,0 +1,375 @@
+"""
+Benchmark ponta a ponta de todos os blueprints.
+
+Semeia um SQLite descartável, gera JWTs reais e dispara cada endpoint pelo
+test client do Flask, medindo latência (p50/p95/p99), throughput e número de
+queries SQL por requisição (em todos os engines: principal e shards). O
+resultado sai em JSON para comparar releases.
+
+Rotas /api do app.url_map sem entrada em ENDPOINTS nem em NAO_MEDIDOS saem
+em meta.nao_medidas (e um aviso no stderr): rota nova entra no benchmark.
+Streams SSE são medidos até o primeiro evento.
+
+Uso:
+    python -m benchmarks.bench_endpoints --usuarios 50 --dias 90 --iteracoes 200
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import event
+
+from app import create_app, db
+from benchmarks.seed import (
+    SENHA_PADRAO,
+    bench_config,
+    remover_bancos,
+    semear,
+    telefone_usuario,
+)
+
+
+# ---------------------------------------------------------
+# Endpoints medidos
+# ---------------------------------------------------------
+GPX_EXEMPLO = b"""<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="bench"><trk><trkseg>
+<trkpt lat="-23.5500" lon="-46.6300"><time>2026-03-02T07:00:00</time></trkpt>
+<trkpt lat="-23.5600" lon="-46.6300"><time>2026-03-02T07:06:00</time></trkpt>
+<trkpt lat="-23.5700" lon="-46.6300"><time>2026-03-02T07:12:00</time></trkpt>
+</trkseg></trk></gpx>"""
+
+# (nome, método, rota, tipo de token, corpo). A rota aceita {job_id} (job do
+# usuário criado antes da medição); corpo bytes é enviado como GPX.
+ENDPOINTS = [
+    ("auth.ping", "GET", "/api/auth/ping", None, None),
+    ("auth.cadastro", "POST", "/api/auth/cadastro", None, "cadastro"),
+    ("auth.login", "POST", "/api/auth/login", None, "login"),
+    ("auth.refresh", "POST", "/api/auth/refresh", "refresh", None),
+    ("user.me", "GET", "/api/user/me", "access", None),
+    ("user.update", "PUT", "/api/user/update", "access", {"idade": 31}),
+    ("metas.listar", "GET", "/api/metas/", "access", None),
+    ("metas.ultima", "GET", "/api/metas/ultima", "access", None),
+    ("metas.historico", "GET", "/api/metas/historico", "access", None),
+    ("metas.tendencia", "GET", "/api/metas/tendencia", "access", None),
+    (
+        "metas.criar",
+        "POST",
+        "/api/metas/criar",
+        "access",
+        {"peso_atual": 90.5, "peso_meta": 80.0},
+    ),
+    ("rotina.hoje", "GET", "/api/rotina/hoje", "access", None),
+    (
+        "rotina.marcar",
+        "POST",
+        "/api/rotina/marcar",
+        "access",
+        {
+            "periodo": "Almoço",
+            "proteina_selecionada": "Frango grelhado 150g",
+            "concluido": True,
+        },
+    ),
+    ("rotina.calorias_totais", "GET", "/api/rotina/calorias-totais", "access", None),
+    ("rotina.heatmap", "GET", "/api/rotina/heatmap", "access", None),
+    ("atividades.hoje", "GET", "/api/atividades/hoje", "access", None),
+    (
+        "atividades.registrar",
+        "POST",
+        "/api/atividades/registrar",
+        "access",
+        {"km_percorridos": 5.2, "calorias_perdidas": 320},
+    ),
+    ("atividades.historico", "GET", "/api/atividades/historico", "access", None),
+    ("atividades.importar", "POST", "/api/atividades/importar", "access", GPX_EXEMPLO),
+    ("calorias_extras.hoje", "GET", "/api/calorias-extras/hoje", "access", None),
+    (
+        "calorias_extras.registrar",
+        "POST",
+        "/api/calorias-extras/registrar",
+        "access",
+        {"descricao": "Chocolate", "calorias": 210},
+    ),
+    ("calculos.tmb", "GET", "/api/calculos/tmb", "access", None),
+    (
+        "calculos.balanco_calorico",
+        "GET",
+        "/api/calculos/balanco-calorico",
+        "access",
+        None,
+    ),
+    ("dashboard", "GET", "/api/dashboard/", "access", None),
+    ("dashboard.stream", "GET", "/api/dashboard/stream", "access", None),
+    ("ranking.semana", "GET", "/api/ranking/?periodo=semana", "access", None),
+    ("ranking.mes", "GET", "/api/ranking/?periodo=mes", "access", None),
+    (
+        "jobs.criar",
+        "POST",
+        "/api/jobs/",
+        "access",
+        {"tipo": "projecao", "parametros": {"semanas": 12}},
+    ),
+    ("jobs.listar", "GET", "/api/jobs/", "access", None),
+    ("jobs.obter", "GET", "/api/jobs/{job_id}", "access", None),
+]
+
+# Endpoints do app fora do benchmark, com o motivo
+NAO_MEDIDOS = {
+    "calorias.deletar_caloria_extra": "consome o registro a cada iteração",
+    "admin.provisionar_usuarios": "rota administrativa (X-Admin-Token)",
+    "admin.listar_profiles": "rota administrativa (X-Admin-Token)",
+    "admin.baixar_profile": "rota administrativa (X-Admin-Token)",
+    "admin.estatisticas_caches": "rota administrativa (X-Admin-Token)",
+}
+
+
+# ---------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------
+def percentil(valores, p):
+    """Percentil por interpolação linear (valores já ordenados)."""
+    if not valores:
+        return 0.0
+    k = (len(valores) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(valores) - 1)
+    return valores[f] + (valores[c] - valores[f]) * (k - f)
+
+
+class ContadorQueries:
+    """Conta statements SQL emitidos pelos engines (principal, shards, binds)."""
+
+    def __init__(self, engines):
+        self.total = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.total += 1
+
+    @contextmanager
+    def medir(self):
+        inicio = self.total
+        resultado = {"queries": 0}
+        yield resultado
+        resultado["queries"] = self.total - inicio
+
+
+def gerar_tokens(app, user_ids):
+    with app.app_context():
+        return {
+            uid: {
+                "access": create_access_token(identity=str(uid)),
+                "refresh": create_refresh_token(identity=str(uid)),
+            }
+            for uid in user_ids
+        }
+
+
+_cadastros = itertools.count()
+
+
+def montar_corpo(corpo, indice_usuario):
+    if corpo == "login":
+        return {"telefone": telefone_usuario(indice_usuario), "senha": SENHA_PADRAO}
+    if corpo == "cadastro":
+        # Telefones fora da faixa dos usuários semeados
+        return {"nome": "Bench", "telefone": f"21{next(_cadastros):09d}", "senha": SENHA_PADRAO}
+    return corpo
+
+
+def endpoints_nao_medidos(app):
+    """Endpoints /api do url_map sem entrada em ENDPOINTS nem em NAO_MEDIDOS."""
+    adaptador = app.url_map.bind("localhost")
+    medidos = {
+        adaptador.match(rota.split("?")[0].format(job_id="0"), method=metodo)[0]
+        for _, metodo, rota, _, _ in ENDPOINTS
+    }
+    return sorted(
+        regra.endpoint
+        for regra in app.url_map.iter_rules()
+        if regra.rule.startswith("/api/")
+        and regra.endpoint not in medidos
+        and regra.endpoint not in NAO_MEDIDOS
+    )
+
+
+def criar_jobs(client, tokens, user_ids):
+    """Um job por usuário para as rotas com {job_id}."""
+    contexto = {}
+    for uid in user_ids:
+        resposta = client.post(
+            "/api/jobs/",
+            json={"tipo": "projecao", "parametros": {"semanas": 4}},
+            headers={"Authorization": f"Bearer {tokens[uid]['access']}"},
+        )
+        contexto[uid] = {"job_id": resposta.get_json()["id"]}
+    return contexto
+
+
+def requisitar(client, metodo, rota, headers, corpo):
+    if isinstance(corpo, bytes):
+        resposta = client.open(
+            rota, method=metodo, headers=headers, data=corpo, content_type="application/gpx+xml"
+        )
+    else:
+        resposta = client.open(rota, method=metodo, headers=headers, json=corpo, buffered=False)
+
+    if resposta.mimetype == "text/event-stream":
+        # Stream: mede até o primeiro evento e desconecta
+        for pedaco in resposta.response:
+            if b"event:" in (pedaco if isinstance(pedaco, bytes) else pedaco.encode()):
+                break
+    else:
+        resposta.get_data()
+    resposta.close()
+    return resposta
+
+
+# ---------------------------------------------------------
+# Execução
+# ---------------------------------------------------------
+def medir_endpoint(client, contador, endpoint, user_ids, tokens, contexto, iteracoes, rnd):
+    nome, metodo, rota, tipo_token, corpo = endpoint
+    latencias, queries, erros = [], [], 0
+
+    inicio_total = time.perf_counter()
+    for _ in range(iteracoes):
+        indice = rnd.randrange(len(user_ids))
+        uid = user_ids[indice]
+
+        headers = {}
+        if tipo_token:
+            headers["Authorization"] = f"Bearer {tokens[uid][tipo_token]}"
+
+        with contador.medir() as q:
+            t0 = time.perf_counter()
+            resposta = requisitar(
+                client,
+                metodo,
+                rota.format(**contexto[uid]),
+                headers,
+                montar_corpo(corpo, indice),
+            )
+            latencias.append((time.perf_counter() - t0) * 1000)
+        queries.append(q["queries"])
+
+        if resposta.status_code >= 400:
+            erros += 1
+    duracao = time.perf_counter() - inicio_total
+
+    latencias.sort()
+    return {
+        "endpoint": nome,
+        "metodo": metodo,
+        "rota": rota,
+        "iteracoes": iteracoes,
+        "erros": erros,
+        "latencia_ms": {
+            "p50": round(percentil(latencias, 50), 3),
+            "p95": round(percentil(latencias, 95), 3),
+            "p99": round(percentil(latencias, 99), 3),
+            "max": round(latencias[-1], 3),
+        },
+        "throughput_rps": round(iteracoes / duracao, 1) if duracao else None,
+        "queries_por_requisicao": round(sum(queries) / len(queries), 2),
+    }
+
+
+def executar(usuarios, dias, iteracoes, caminho_db=None, filtro=None, seed=42):
+    temporario = caminho_db is None
+    if temporario:
+        fd, caminho_db = tempfile.mkstemp(prefix="bench_", suffix=".db")
+        os.close(fd)
+
+    try:
+        return _executar(usuarios, dias, iteracoes, caminho_db, filtro, seed)
+    finally:
+        if temporario:
+            remover_bancos(caminho_db)
+
+
+def _executar(usuarios, dias, iteracoes, caminho_db, filtro, seed):
+    app = create_app(bench_config(caminho_db))
+
+    t0 = time.perf_counter()
+    user_ids = semear(app, usuarios=usuarios, dias=dias, seed=seed)
+    tempo_seed = time.perf_counter() - t0
+
+    tokens = gerar_tokens(app, user_ids)
+    client = app.test_client()
+    rnd = random.Random(seed)
+
+    nao_medidos = endpoints_nao_medidos(app)
+    if nao_medidos:
+        sys.stderr.write(f"Endpoints sem medição: {', '.join(nao_medidos)}\n")
+
+    with app.app_context():
+        contador = ContadorQueries(db.engines.values())
+        contexto = criar_jobs(client, tokens, user_ids)
+
+        resultados = [
+            medir_endpoint(client, contador, ep, user_ids, tokens, contexto, iteracoes, rnd)
+            for ep in ENDPOINTS
+            if not filtro or filtro in ep[0]
+        ]
+
+        app.extensions["jobs"].pool().shutdown(wait=True)
+        for engine in db.engines.values():
+            engine.dispose()
+
+    return {
+        "meta": {
+            "usuarios": usuarios,
+            "dias": dias,
+            "iteracoes": iteracoes,
+            "seed": seed,
+            "tempo_seed_s": round(tempo_seed, 3),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "nao_medidos": nao_medidos,
+        },
+        "endpoints": resultados,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--iteracoes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Caminho do SQLite (padrão: arquivo temporário)")
+    parser.add_argument("--filtro", help="Mede apenas endpoints cujo nome contém o texto")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    relatorio = executar(
+        args.usuarios,
+        args.dias,
+        args.iteracoes,
+        caminho_db=args.db,
+        filtro=args.filtro,
+        seed=args.seed,
+    )
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        sys.stdout.write(texto + "\n")
+
+
+if __name__ == "__main__":
+    main()
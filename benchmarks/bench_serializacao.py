@@ -0,0 +1,113 @@
+"""
+Benchmark de serialização: to_dict() + jsonify vs. projeção de colunas.
+
+Mede linhas/segundo para a listagem de MetaPeso de um usuário com histórico
+longo em três caminhos:
+  - orm_to_dict:        entidades ORM + to_dict() + provedor JSON padrão
+  - projecao_default:   tuplas de colunas + provedor JSON padrão
+  - projecao_orjson:    tuplas de colunas + OrjsonProvider (se instalado)
+
+Uso:
+    python -m benchmarks.bench_serializacao --dias 3000 --repeticoes 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app, db
+from app.json_provider import OrjsonProvider, json_bytes, orjson
+from app.models import MetaPeso
+from app.serializacao import COLUNAS_META, meta_para_dict, serializar_linhas
+from benchmarks.seed import bench_config, remover_bancos, semear
+
+
+def caminho_orm(user_id):
+    metas = (
+        MetaPeso.query.filter_by(user_id=user_id)
+        .order_by(MetaPeso.data_registro.desc())
+        .all()
+    )
+    return json_bytes([m.to_dict() for m in metas])
+
+
+def caminho_projecao(user_id):
+    stmt = (
+        db.select(*COLUNAS_META)
+        .filter_by(user_id=user_id)
+        .order_by(MetaPeso.data_registro.desc())
+    )
+    return serializar_linhas(stmt, meta_para_dict)
+
+
+def medir(app, funcao, user_id, repeticoes):
+    tempos, tamanho, linhas = [], 0, 0
+    for _ in range(repeticoes):
+        with app.app_context():
+            t0 = time.perf_counter()
+            corpo = funcao(user_id)
+            tempos.append(time.perf_counter() - t0)
+            db.session.remove()
+        tamanho = len(corpo)
+        linhas = len(json.loads(corpo))
+
+    tempos.sort()
+    mediana = tempos[len(tempos) // 2]
+    return {
+        "linhas": linhas,
+        "bytes": tamanho,
+        "mediana_ms": round(mediana * 1000, 3),
+        "linhas_por_segundo": round(linhas / mediana) if mediana else None,
+    }
+
+
+def executar(dias, repeticoes):
+    fd, caminho_db = tempfile.mkstemp(prefix="bench_ser_", suffix=".db")
+    os.close(fd)
+    try:
+        app = create_app(bench_config(caminho_db))
+        user_id = semear(app, usuarios=1, dias=dias)[0]
+
+        resultados = {}
+
+        app.json = DefaultJSONProvider(app)
+        resultados["orm_to_dict"] = medir(app, caminho_orm, user_id, repeticoes)
+        resultados["projecao_default"] = medir(
+            app, caminho_projecao, user_id, repeticoes
+        )
+
+        if orjson is not None:
+            app.json = OrjsonProvider(app)
+            resultados["projecao_orjson"] = medir(
+                app, caminho_projecao, user_id, repeticoes
+            )
+
+        base = resultados["orm_to_dict"]["linhas_por_segundo"]
+        for nome, r in resultados.items():
+            r["speedup"] = round(r["linhas_por_segundo"] / base, 2) if base else None
+
+        with app.app_context():
+            db.engine.dispose()
+
+        return {"dias": dias, "repeticoes": repeticoes, "resultados": resultados}
+    finally:
+        remover_bancos(caminho_db)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dias", type=int, default=3000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.dias, args.repeticoes)
+    sys.stdout.write(json.dumps(relatorio, indent=2, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Perfil de cold start do worker.
+
+Executa um interpretador novo com `-X importtime`, cria o app sobre um SQLite
+descartável e atende uma requisição. Reporta em JSON os imports mais caros
+(tempo cumulativo), o tempo de create_app, do aquecimento e até a primeira
+requisição.
+
+Uso:
+    python -m benchmarks.import_profile --top 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ALVO = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+from benchmarks.seed import bench_config
+class ColdConfig(bench_config(sys.argv[1])):
+    WARMUP_ON_START = True
+app = create_app(ColdConfig)
+t1 = time.perf_counter()
+app.test_client().get("/api/auth/ping")
+t2 = time.perf_counter()
+startup = dict(app.extensions["startup"])
+startup["import_e_create_app_ms"] = round((t1 - t0) * 1000, 2)
+startup["primeira_requisicao_total_ms"] = round((t2 - t0) * 1000, 2)
+print("__STARTUP__" + json.dumps(startup))
+"""
+
+
+def parse_importtime(stderr):
+    """Converte as linhas do -X importtime em (módulo, self_us, cumulativo_us)."""
+    modulos = []
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        self_us, cumulativo_us, nome = linha[len("import time:"):].split("|")
+        # Um espaço separa a coluna; a indentação restante indica a profundidade
+        modulos.append((nome[1:], int(self_us), int(cumulativo_us)))
+    return modulos
+
+
+def criar_schema(caminho_db):
+    """Cria as tabelas antes do processo medido, para o aquecimento ser real."""
+    from app import create_app, db
+    from benchmarks.seed import bench_config
+
+    app = create_app(bench_config(caminho_db))
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+
+def perfilar(top=20, skip_dotenv=False):
+    from benchmarks.seed import remover_bancos
+
+    fd, caminho_db = tempfile.mkstemp(prefix="cold_", suffix=".db")
+    os.close(fd)
+
+    criar_schema(caminho_db)
+
+    env = dict(os.environ)
+    if skip_dotenv:
+        env["FLASK_SKIP_DOTENV"] = "1"
+
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", ALVO, caminho_db],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+    finally:
+        remover_bancos(caminho_db)
+
+    startup = {}
+    for linha in proc.stdout.splitlines():
+        if linha.startswith("__STARTUP__"):
+            startup = json.loads(linha[len("__STARTUP__"):])
+
+    modulos = parse_importtime(proc.stderr)
+    raiz = [m for m in modulos if not m[0].startswith(" ")]
+    raiz.sort(key=lambda m: m[2], reverse=True)
+
+    por_pacote = {}
+    for nome, self_us, _ in modulos:
+        pacote = nome.strip().split(".")[0]
+        por_pacote[pacote] = por_pacote.get(pacote, 0) + self_us
+
+    return {
+        "startup": startup,
+        "imports_total_ms": round(sum(m[2] for m in raiz) / 1000, 2),
+        "modulos_importados": len(modulos),
+        "top_imports": [
+            {"modulo": nome.strip(), "self_ms": s / 1000, "cumulativo_ms": c / 1000}
+            for nome, s, c in raiz[:top]
+        ],
+        "top_pacotes": [
+            {"pacote": pacote, "self_ms": us / 1000}
+            for pacote, us in sorted(
+                por_pacote.items(), key=lambda p: p[1], reverse=True
+            )[:top]
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--skip-dotenv", action="store_true")
+    args = parser.parse_args(argv)
+
+    relatorio = perfilar(top=args.top, skip_dotenv=args.skip_dotenv)
+    sys.stdout.write(json.dumps(relatorio, indent=2, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Geração de base SQLite semeada para benchmarks.
+
+Cria N usuários × M dias de MetaPeso, RotinaAlimentar, AtividadeFisica e
+CaloriasExtras usando inserts em lote (executemany), sem passar pelo ORM.
+"""
+
+import glob
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.config import Config
+from app.models import (
+    User,
+    MetaPeso,
+    RotinaAlimentar,
+    AtividadeFisica,
+    CaloriasExtras,
+)
+from app.sharding import shard_do_usuario
+from app.utils import calcular_calorias_refeicao
+
+SENHA_PADRAO = "senha-benchmark"
+
+PERIODOS = ["Café da Manhã", "Almoço", "Lanche da Tarde", "Janta", "Ceia"]
+PROTEINAS = [
+    None,
+    "Frango grelhado 150g",
+    "Carne vermelha magra 120g",
+    "Frango desfiado 120g",
+]
+
+
+def bench_config(caminho_db):
+    """
+    Retorna uma classe de configuração apontando para o SQLite informado.
+    Shards e cache SQLite ficam ao lado dele: semear() faz drop_all e não
+    pode alcançar os bancos de instance/.
+    """
+    base = os.path.splitext(os.path.abspath(caminho_db))[0]
+
+    class BenchConfig(Config):
+        TESTING = True
+        WARMUP_ON_START = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.abspath(caminho_db)}"
+        SHARD_URI_TEMPLATE = f"sqlite:///{base}_shard{{n}}.db"
+        CACHE_SQLITE_PATH = f"{base}_cache.db"
+
+    return BenchConfig
+
+
+def remover_bancos(caminho_db):
+    """Apaga o SQLite do benchmark e os shards/cache criados ao lado dele."""
+    base = os.path.splitext(os.path.abspath(caminho_db))[0]
+    for caminho in [caminho_db] + glob.glob(f"{glob.escape(base)}_shard*.db") + [f"{base}_cache.db"]:
+        for arquivo in (caminho, f"{caminho}-wal", f"{caminho}-shm"):
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+
+
+def telefone_usuario(indice):
+    return f"11{indice:09d}"
+
+
+def semear(app, usuarios=50, dias=90, seed=42):
+    """
+    Recria o schema e insere o dataset sintético.
+    Retorna a lista de ids dos usuários criados.
+    """
+    rnd = random.Random(seed)
+    hoje = date.today()
+    senha_hash = generate_password_hash(SENHA_PADRAO)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        db.session.execute(
+            User.__table__.insert(),
+            [
+                {
+                    "nome": f"Usuário {i}",
+                    "telefone": telefone_usuario(i),
+                    "senha_hash": senha_hash,
+                    "altura": round(rnd.uniform(1.55, 1.95), 2),
+                    "peso_inicial": round(rnd.uniform(60, 130), 1),
+                    "profissao": rnd.choice(["Estoquista", "Analista", "Motorista"]),
+                    "idade": rnd.randint(18, 65),
+                    "data_cadastro": datetime.utcnow() - timedelta(days=dias),
+                }
+                for i in range(usuarios)
+            ],
+        )
+        user_ids = [uid for (uid,) in db.session.execute(db.select(User.id))]
+
+        metas, rotinas, atividades, extras = [], [], [], []
+        for uid in user_ids:
+            peso = rnd.uniform(70, 130)
+            meta = peso - rnd.uniform(5, 25)
+
+            for d in range(dias, -1, -1):
+                dia = hoje - timedelta(days=d)
+                momento = datetime.combine(dia, datetime.min.time()) + timedelta(
+                    hours=rnd.randint(6, 22)
+                )
+
+                peso = max(meta, peso - rnd.uniform(-0.2, 0.35))
+                metas.append(
+                    {
+                        "user_id": uid,
+                        "peso_atual": round(peso, 1),
+                        "peso_meta": round(meta, 1),
+                        "data_registro": momento,
+                    }
+                )
+
+                for periodo in PERIODOS:
+                    proteina = rnd.choice(PROTEINAS)
+                    rotinas.append(
+                        {
+                            "user_id": uid,
+                            "periodo": periodo,
+                            "refeicao": periodo,
+                            "proteina_selecionada": proteina,
+                            "gramas_proteina": None,
+                            "calorias": calcular_calorias_refeicao(periodo, proteina),
+                            "concluido": rnd.random() < 0.8,
+                            "data": dia,
+                        }
+                    )
+
+                atividades.append(
+                    {
+                        "user_id": uid,
+                        "km_percorridos": round(rnd.uniform(0, 12), 2),
+                        "calorias_perdidas": rnd.randint(0, 800),
+                        "calorias_trabalho": rnd.randint(0, 600),
+                        "data": dia,
+                    }
+                )
+
+                for _ in range(rnd.randint(0, 2)):
+                    extras.append(
+                        {
+                            "user_id": uid,
+                            "descricao": "Lanche extra",
+                            "calorias": rnd.randint(50, 600),
+                            "sincero": True,
+                            "data": dia,
+                        }
+                    )
+
+        db.session.commit()
+
+        # Tabelas por usuário: cada lote vai para o shard do dono
+        for tabela, linhas in (
+            (MetaPeso.__table__, metas),
+            (RotinaAlimentar.__table__, rotinas),
+            (AtividadeFisica.__table__, atividades),
+            (CaloriasExtras.__table__, extras),
+        ):
+            por_usuario = {}
+            for linha in linhas:
+                por_usuario.setdefault(linha["user_id"], []).append(linha)
+
+            for uid, lote in por_usuario.items():
+                with shard_do_usuario(uid):
+                    db.session.execute(tabela.insert(), lote)
+                    db.session.commit()
+
+    return user_ids
@@ -0,0 +1,382 @@
+"""
+Soak test de concorrência: tráfego misto de leitura/escrita contra um SQLite
+semeado, de várias threads e processos, por um tempo fixo.
+
+Cada processo cria o próprio app (conexões próprias ao mesmo arquivo) e roda
+N threads, cada uma com seu test client; com --url o tráfego vai por HTTP a
+um servidor já rodando (ex.: `flask run --with-threads`, gunicorn). Erros
+"database is locked" são contados à parte e podem ser repetidos no cliente
+(--retries, backoff exponencial). O relatório JSON traz throughput total e
+por segundo, erros de lock, retries e latência p50/p95/p99 por operação
+(incluindo as repetições, como o usuário percebe).
+
+Uso:
+    python -m benchmarks.soak --duracao 60 --processos 2 --threads 8
+    python -m benchmarks.soak --mix rotina.marcar=1,calculos.balanco_calorico=1
+    python -m benchmarks.soak --url http://127.0.0.1:5000 --db instance/bench.db --sem-semear
+
+Com --url, os tokens são assinados localmente: o servidor precisa do mesmo
+JWT_SECRET_KEY e do mesmo banco (--db).
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+from benchmarks.bench_endpoints import gerar_tokens, percentil
+from benchmarks.seed import PERIODOS, PROTEINAS, bench_config, remover_bancos, semear
+
+ERRO_LOCK = b"database is locked"
+
+
+# ---------------------------------------------------------
+# Operações do mix
+# ---------------------------------------------------------
+def _corpo_marcar(rnd):
+    return {
+        "periodo": rnd.choice(PERIODOS),
+        "proteina_selecionada": rnd.choice(PROTEINAS),
+        "concluido": rnd.random() < 0.8,
+    }
+
+
+def _corpo_atividade(rnd):
+    return {"km_percorridos": round(rnd.uniform(0, 12), 2), "calorias_perdidas": rnd.randint(0, 700)}
+
+
+def _corpo_extra(rnd):
+    return {"descricao": "Soak", "calorias": rnd.randint(50, 400)}
+
+
+# nome → (método, rota, gerador do corpo | None)
+OPERACOES = {
+    "rotina.marcar": ("POST", "/api/rotina/marcar", _corpo_marcar),
+    "calculos.balanco_calorico": ("GET", "/api/calculos/balanco-calorico", None),
+    "atividades.registrar": ("POST", "/api/atividades/registrar", _corpo_atividade),
+    "calorias_extras.registrar": ("POST", "/api/calorias-extras/registrar", _corpo_extra),
+    "dashboard": ("GET", "/api/dashboard/", None),
+    "rotina.hoje": ("GET", "/api/rotina/hoje", None),
+}
+
+MIX_PADRAO = {
+    "rotina.marcar": 4,
+    "calculos.balanco_calorico": 4,
+    "atividades.registrar": 1,
+    "calorias_extras.registrar": 1,
+    "dashboard": 2,
+    "rotina.hoje": 2,
+}
+
+
+def ler_mix(texto):
+    if not texto:
+        return dict(MIX_PADRAO)
+    mix = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip()
+        if nome not in OPERACOES:
+            raise SystemExit(f"Operação desconhecida: {nome} (use {', '.join(OPERACOES)})")
+        mix[nome] = float(peso or 1)
+    return mix
+
+
+# ---------------------------------------------------------
+# Clientes (test client do Flask ou HTTP)
+# ---------------------------------------------------------
+class ClienteFlask:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def enviar(self, metodo, rota, headers, corpo):
+        resposta = self.client.open(rota, method=metodo, headers=headers, json=corpo)
+        return resposta.status_code, resposta.get_data()
+
+
+class ClienteHTTP:
+    """Uma conexão keep-alive por thread; reconecta após falhas."""
+
+    def __init__(self, url):
+        partes = urlparse(url)
+        self.host, self.porta = partes.hostname, partes.port or 80
+        self.conexao = None
+
+    def enviar(self, metodo, rota, headers, corpo):
+        dados = None
+        if corpo is not None:
+            dados = json.dumps(corpo).encode()
+            headers = {**headers, "Content-Type": "application/json"}
+        try:
+            if self.conexao is None:
+                self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=30)
+            self.conexao.request(metodo, rota, body=dados, headers=headers)
+            resposta = self.conexao.getresponse()
+            return resposta.status, resposta.read()
+        except (OSError, http.client.HTTPException):
+            if self.conexao is not None:
+                self.conexao.close()
+            self.conexao = None
+            raise
+
+
+# ---------------------------------------------------------
+# Worker (um processo, N threads)
+# ---------------------------------------------------------
+class Resultados:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.status = defaultdict(Counter)
+        self.erros_lock = Counter()
+        self.falhas_lock = Counter()
+        self.retries = Counter()
+        self.excecoes = Counter()
+        self.por_segundo = Counter()
+
+    def para_dict(self):
+        return {
+            "latencias": dict(self.latencias),
+            "status": {k: dict(v) for k, v in self.status.items()},
+            "erros_lock": dict(self.erros_lock),
+            "falhas_lock": dict(self.falhas_lock),
+            "retries": dict(self.retries),
+            "excecoes": dict(self.excecoes),
+            "por_segundo": dict(self.por_segundo),
+        }
+
+
+def _thread(cliente, usuarios, mix, inicio, fim, retries, backoff, resultados, seed):
+    rnd = random.Random(seed)
+    nomes = list(mix)
+    pesos = [mix[n] for n in nomes]
+
+    while time.time() < fim:
+        nome = rnd.choices(nomes, pesos)[0]
+        metodo, rota, gerar = OPERACOES[nome]
+        _, token = rnd.choice(usuarios)
+        headers = {"Authorization": f"Bearer {token}"}
+        corpo = gerar(rnd) if gerar else None
+
+        t0 = time.perf_counter()
+        tentativa = 0
+        while True:
+            try:
+                status, dados = cliente.enviar(metodo, rota, headers, corpo)
+            except Exception as e:
+                status, dados = None, type(e).__name__.encode()
+
+            travado = ERRO_LOCK in dados
+            if travado:
+                with resultados.lock:
+                    resultados.erros_lock[nome] += 1
+            if not travado or tentativa >= retries:
+                break
+            tentativa += 1
+            with resultados.lock:
+                resultados.retries[nome] += 1
+            time.sleep(backoff * 2 ** (tentativa - 1))
+
+        latencia = (time.perf_counter() - t0) * 1000
+        with resultados.lock:
+            resultados.latencias[nome].append(latencia)
+            if status is None:
+                resultados.excecoes[dados.decode()] += 1
+            else:
+                resultados.status[nome][str(status)] += 1
+            if travado:
+                resultados.falhas_lock[nome] += 1
+            resultados.por_segundo[int(time.time() - inicio)] += 1
+
+
+def worker(indice, caminho_db, url, usuarios, mix, threads, inicio, fim, retries, backoff, fila):
+    if url:
+        fabrica = lambda: ClienteHTTP(url)  # noqa: E731
+    else:
+        from app import create_app
+
+        app = create_app(bench_config(caminho_db))
+        fabrica = lambda: ClienteFlask(app)  # noqa: E731
+
+    resultados = Resultados()
+    pool = [
+        threading.Thread(
+            target=_thread,
+            args=(fabrica(), usuarios, mix, inicio, fim, retries, backoff, resultados,
+                  indice * 1000 + n),
+        )
+        for n in range(threads)
+    ]
+    # Espera o início combinado: todos os processos começam juntos
+    time.sleep(max(0.0, inicio - time.time()))
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    fila.put(resultados.para_dict())
+
+
+# ---------------------------------------------------------
+# Agregação
+# ---------------------------------------------------------
+def agregar(parciais, mix, duracao):
+    latencias = defaultdict(list)
+    status = defaultdict(Counter)
+    contadores = {c: Counter() for c in ("erros_lock", "falhas_lock", "retries", "excecoes", "por_segundo")}
+
+    for parcial in parciais:
+        for nome, valores in parcial["latencias"].items():
+            latencias[nome].extend(valores)
+        for nome, por_status in parcial["status"].items():
+            status[nome].update(por_status)
+        for chave, contador in contadores.items():
+            contador.update({k if chave != "por_segundo" else int(k): v
+                             for k, v in parcial[chave].items()})
+
+    operacoes = []
+    for nome in mix:
+        valores = sorted(latencias.get(nome, []))
+        operacoes.append(
+            {
+                "operacao": nome,
+                "metodo": OPERACOES[nome][0],
+                "rota": OPERACOES[nome][1],
+                "requisicoes": len(valores),
+                "throughput_rps": round(len(valores) / duracao, 1),
+                "status": dict(status.get(nome, {})),
+                "erros_lock": contadores["erros_lock"][nome],
+                "falhas_apos_retries": contadores["falhas_lock"][nome],
+                "retries": contadores["retries"][nome],
+                "latencia_ms": {
+                    "p50": round(percentil(valores, 50), 3),
+                    "p95": round(percentil(valores, 95), 3),
+                    "p99": round(percentil(valores, 99), 3),
+                    "max": round(valores[-1], 3) if valores else 0.0,
+                },
+            }
+        )
+
+    total = sum(o["requisicoes"] for o in operacoes)
+    segundos = int(duracao)
+    return {
+        "total": {
+            "requisicoes": total,
+            "throughput_rps": round(total / duracao, 1),
+            "erros_lock": sum(contadores["erros_lock"].values()),
+            "falhas_apos_retries": sum(contadores["falhas_lock"].values()),
+            "retries": sum(contadores["retries"].values()),
+            "excecoes": dict(contadores["excecoes"]),
+        },
+        "por_segundo": [contadores["por_segundo"][s] for s in range(segundos)],
+        "operacoes": operacoes,
+    }
+
+
+# ---------------------------------------------------------
+# Execução
+# ---------------------------------------------------------
+def executar(args):
+    mix = ler_mix(args.mix)
+
+    temporario = args.db is None
+    caminho_db = args.db
+    if temporario:
+        fd, caminho_db = tempfile.mkstemp(prefix="soak_", suffix=".db")
+        os.close(fd)
+
+    try:
+        from app import create_app, db
+
+        app = create_app(bench_config(caminho_db))
+        if args.sem_semear:
+            with app.app_context():
+                user_ids = [uid for (uid,) in db.session.execute(db.text("SELECT id FROM users"))]
+        else:
+            user_ids = semear(app, usuarios=args.usuarios, dias=args.dias, seed=args.seed)
+        tokens = gerar_tokens(app, user_ids)
+        usuarios = [(uid, tokens[uid]["access"]) for uid in user_ids]
+        with app.app_context():
+            db.engine.dispose()
+
+        # spawn: cada processo abre as próprias conexões, sem herdar as do pai
+        contexto = multiprocessing.get_context("spawn")
+        fila = contexto.Queue()
+        inicio = time.time() + args.aquecimento
+        fim = inicio + args.duracao
+        processos = [
+            contexto.Process(
+                target=worker,
+                args=(i, caminho_db, args.url, usuarios, mix, args.threads, inicio, fim,
+                      args.retries, args.backoff_ms / 1000, fila),
+            )
+            for i in range(args.processos)
+        ]
+        for p in processos:
+            p.start()
+        parciais = [fila.get() for _ in processos]
+        for p in processos:
+            p.join()
+
+        relatorio = agregar(parciais, mix, args.duracao)
+        relatorio["meta"] = {
+            "duracao_s": args.duracao,
+            "processos": args.processos,
+            "threads_por_processo": args.threads,
+            "alvo": args.url or "test client (em processo)",
+            "mix": mix,
+            "retries": args.retries,
+            "backoff_ms": args.backoff_ms,
+            "usuarios": len(user_ids),
+            "dias": None if args.sem_semear else args.dias,
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+        }
+        return relatorio
+    finally:
+        if temporario:
+            remover_bancos(caminho_db)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duracao", type=float, default=30, help="Segundos de tráfego")
+    parser.add_argument("--processos", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="Threads por processo")
+    parser.add_argument("--mix", help="operacao=peso,... (padrão: escrita e leitura meio a meio)")
+    parser.add_argument("--retries", type=int, default=3, help="Repetições após 'database is locked'")
+    parser.add_argument("--backoff-ms", type=float, default=20)
+    parser.add_argument("--aquecimento", type=float, default=2.0,
+                        help="Segundos para os processos subirem antes do início")
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Caminho do SQLite (padrão: arquivo temporário)")
+    parser.add_argument("--sem-semear", action="store_true", help="Usa os usuários já existentes em --db")
+    parser.add_argument("--url", help="Servidor já rodando (usa o mesmo --db para tokens/usuários)")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.url and args.db is None:
+        parser.error("--url exige --db (o banco que o servidor usa)")
+
+    relatorio = executar(args)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        sys.stdout.write(texto + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 from app import create_app, db
-from app.models import (
-    User,
-    MetaPeso,
-    RotinaAlimentar,
-    AtividadeFisica,
-    CaloriasExtras,
-    ConsumoCalorico,
-)
 
 app = create_app()
 
 
 @app.shell_context_processor
 def make_shell_context():
+    # Import tardio: os modelos só são necessários no `flask shell`
+    from app.models import (
+        User,
+        MetaPeso,
+        RotinaAlimentar,
+        AtividadeFisica,
+        CaloriasExtras,
+        ConsumoCalorico,
+    )
+
     return {
         "db": db,
         "User": User,
@@ -0,0 +1,71 @@
+import pytest
+
+from app import create_app, db
+from app.config import Config
+
+
+@pytest.fixture
+def criar_app(tmp_path):
+    """
+    Fábrica de apps com SQLite (e shards) em tmp_path. Atributos extras
+    sobrescrevem a Config: criar_app(SHARD_COUNT=2, ESCRITOR_UNICO=True).
+    """
+    apps = []
+
+    def criar(**config):
+        atributos = {
+            "TESTING": True,
+            "WARMUP_ON_START": False,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'principal.db'}",
+            "SHARD_COUNT": 1,
+            "SHARD_URI_TEMPLATE": f"sqlite:///{tmp_path}/shard{{n}}.db",
+            "CACHE_BACKEND": "local",
+            "ADMIN_TOKEN": None,
+            "PROFILE_SAMPLE_RATE": 0,
+            "ESCRITOR_UNICO": False,
+        }
+        atributos.update(config)
+        app = create_app(type("ConfigTeste", (Config,), atributos))
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield criar
+
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(criar_app):
+    return criar_app()
+
+
+@pytest.fixture
+def criar_usuarios():
+    """criar_usuarios(n) → ids (dentro de um app context)."""
+
+    def criar(n, senha="senha-teste"):
+        from app.models import User
+
+        usuarios = []
+        for i in range(n):
+            user = User(
+                nome=f"Usuário {i}",
+                telefone=f"11{i:09d}",
+                altura=1.75,
+                peso_inicial=90.0,
+                profissao="Analista",
+                idade=30,
+            )
+            user.set_password(senha)
+            db.session.add(user)
+            usuarios.append(user)
+        db.session.commit()
+        return [u.id for u in usuarios]
+
+    return criar
@@ -0,0 +1,21 @@
+from flask_jwt_extended import create_access_token
+
+
+def test_caches_inclui_cache_de_jwt(criar_app, criar_usuarios):
+    app = criar_app(ADMIN_TOKEN="segredo", JWT_DECODE_CACHE_SIZE=10)
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        cabecalho = {"Authorization": f"Bearer {create_access_token(identity=str(uid))}"}
+
+    cliente = app.test_client()
+    for _ in range(3):
+        assert cliente.get("/api/user/me", headers=cabecalho).status_code == 200
+
+    assert cliente.get("/api/admin/caches").status_code == 401
+    resposta = cliente.get("/api/admin/caches", headers={"X-Admin-Token": "segredo"})
+    assert resposta.status_code == 200
+    jwt = resposta.get_json()["caches"]["jwt"]
+    assert jwt["misses"] == 1 and jwt["hits"] == 2
+
+    saida = app.test_cli_runner().invoke(args=["cache", "status"]).output
+    assert "jwt: {" in saida
@@ -0,0 +1,113 @@
+import io
+from datetime import date, timedelta
+
+import flask
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.arquivo import arquivar_usuario, horizonte
+from app.models import AtividadeFisica
+from app.sharding import shard_do_usuario
+
+GPX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="teste"><trk><trkseg>
+<trkpt lat="-23.5500" lon="-46.6300"><time>2026-03-02T07:00:00</time></trkpt>
+<trkpt lat="-23.5600" lon="-46.6300"><time>2026-03-02T07:06:00</time></trkpt>
+<trkpt lat="-23.5700" lon="-46.6300"><time>2026-03-02T07:12:00</time></trkpt>
+</trkseg></trk></gpx>"""
+
+
+@pytest.fixture
+def cabecalho(app, criar_usuarios):
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        return {"Authorization": f"Bearer {create_access_token(identity=str(uid))}"}
+
+
+@pytest.fixture
+def sem_buffer(monkeypatch):
+    """Falha se alguém carregar o corpo inteiro com request.get_data()."""
+
+    def get_data(self, *args, **kwargs):
+        raise AssertionError("corpo carregado inteiro na memória")
+
+    monkeypatch.setattr(flask.Request, "get_data", get_data)
+
+
+def _importar(cliente, cabecalho, corpo, chave=None, chunked=False):
+    headers = dict(cabecalho, **({"Idempotency-Key": chave} if chave else {}))
+    if chunked:
+        # Sem Content-Length: o limite só pode ser aplicado na leitura
+        return cliente.post(
+            "/api/atividades/importar",
+            input_stream=io.BytesIO(corpo),
+            headers=dict(headers, **{"Transfer-Encoding": "chunked"}),
+            content_type="application/gpx+xml",
+            environ_overrides={"wsgi.input_terminated": True},
+        )
+    return cliente.post("/api/atividades/importar", data=corpo, headers=headers, content_type="application/gpx+xml")
+
+
+def test_importar_repete_resposta_sem_carregar_o_corpo(app, cabecalho, sem_buffer):
+    cliente = app.test_client()
+
+    primeira = _importar(cliente, cabecalho, GPX, chave="trilha-1")
+    assert primeira.status_code == 200, primeira.get_json()
+    assert primeira.get_json()["trilha"]["pontos"] == 3
+
+    repetida = _importar(cliente, cabecalho, GPX, chave="trilha-1")
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert repetida.get_data() == primeira.get_data()
+
+    outro_corpo = _importar(cliente, cabecalho, GPX.replace(b"07:12", b"07:13"), chave="trilha-1")
+    assert outro_corpo.status_code == 422
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_importar_recusa_corpo_acima_do_limite(app, cabecalho, sem_buffer, chunked):
+    app.config["ATIVIDADES_IMPORTAR_MAX_BYTES"] = len(GPX) - 1
+    cliente = app.test_client()
+
+    for chave in (None, "trilha-grande"):
+        resposta = _importar(cliente, cabecalho, GPX, chave=chave, chunked=chunked)
+        assert resposta.status_code == 413
+        assert "limite" in resposta.get_json()["error"]
+
+
+def test_historico_mescla_arquivo_com_linhas_quentes_antigas(criar_app, criar_usuarios):
+    app = criar_app(ARQUIVO_HORIZONTE_DIAS=30)
+    hoje = date.today()
+
+    def registrar(uid, dias_atras, km):
+        db.session.add(AtividadeFisica(user_id=uid, km_percorridos=km, data=hoje - timedelta(days=dias_atras)))
+
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        with shard_do_usuario(uid):
+            for dias_atras in range(40, 46):
+                registrar(uid, dias_atras, 1.0)
+            db.session.commit()
+        arquivar_usuario(uid, horizonte())
+
+        with shard_do_usuario(uid):
+            # Depois do arquivamento: recentes, um dia mais antigo que o arquivo
+            # e um dia que já está arquivado (a linha quente prevalece)
+            for dias_atras in range(1, 6):
+                registrar(uid, dias_atras, 2.0)
+            registrar(uid, 60, 3.0)
+            registrar(uid, 42, 4.0)
+            db.session.commit()
+        cabecalho = {"Authorization": f"Bearer {create_access_token(identity=str(uid))}"}
+
+    cliente = app.test_client()
+    historico = cliente.get("/api/atividades/historico", headers=cabecalho).get_json()
+    assert [hoje - date.fromisoformat(a["data"]) for a in historico] == [
+        timedelta(days=d) for d in [1, 2, 3, 4, 5, 40, 41, 42, 43, 44, 45, 60]
+    ]
+    assert {a["km_percorridos"] for a in historico if a["data"] == (hoje - timedelta(days=42)).isoformat()} == {4.0}
+
+    # Cursor antes do horizonte: só o que é mais antigo que ele
+    antes = (hoje - timedelta(days=43)).isoformat()
+    pagina = cliente.get(f"/api/atividades/historico?antes={antes}", headers=cabecalho).get_json()
+    assert [hoje - date.fromisoformat(a["data"]) for a in pagina] == [timedelta(days=d) for d in [44, 45, 60]]
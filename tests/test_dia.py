@@ -0,0 +1,64 @@
+import time
+from datetime import date
+
+from app import db, dia
+from app.cache import LRUCache
+from app.dia import CacheDocumentos
+from app.models import CaloriasExtras
+
+DIA = date(2026, 3, 2)
+
+
+def test_invalidacao_durante_a_montagem_nao_guarda_doc_velho():
+    cache = CacheDocumentos(LRUCache(maxsize=16))
+    montagens = []
+
+    def construir_com_invalidacao(aplicar):
+        def construir():
+            montagens.append(1)
+            # Invalidação remota chegando enquanto o documento é montado
+            if len(montagens) == 1:
+                aplicar()
+            return {"versao": len(montagens)}
+
+        return construir
+
+    # Só o dia e todos os dias do usuário
+    for user_id, dias in ((1, [DIA]), (2, None)):
+        montagens.clear()
+
+        def aplicar():
+            cache.aplicar(user_id, dias)
+
+        for esperado in (1, 2, 2):
+            assert cache.obter(user_id, DIA, construir_com_invalidacao(aplicar)) == {"versao": esperado}
+        assert len(montagens) == 2
+
+
+def test_documento_de_outro_worker_expira_pelo_ttl(criar_app, criar_usuarios):
+    # Dois apps no mesmo banco: dois workers com CACHE_BACKEND=local
+    worker_a = criar_app(DOCUMENTO_DIA_TTL_SEGUNDOS=0.2)
+    worker_b = criar_app(DOCUMENTO_DIA_TTL_SEGUNDOS=0.2)
+
+    with worker_a.app_context():
+        (uid,) = criar_usuarios(1)
+
+    with worker_b.app_context():
+        assert dia.documento(uid, DIA)["calorias_extras"] == []
+
+    with worker_a.app_context():
+        db.session.add(CaloriasExtras(user_id=uid, descricao="Pão", calorias=320, data=DIA))
+        db.session.commit()
+
+    with worker_b.app_context():
+        # Sem difusão no backend local: ainda o documento em cache...
+        assert dia.documento(uid, DIA)["calorias_extras"] == []
+        time.sleep(0.25)
+        # ...até o TTL
+        assert [e["calorias"] for e in dia.documento(uid, DIA)["calorias_extras"]] == [320]
+
+
+def test_backend_local_com_varios_workers_avisa(criar_app, monkeypatch, caplog):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    criar_app()
+    assert "CACHE_BACKEND=local" in caplog.text
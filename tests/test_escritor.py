@@ -0,0 +1,81 @@
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from app import db, tendencia
+from app.escritor import executar_escrita
+from app.models import ConsumoCalorico, TendenciaPeso, User
+from app.sharding import shard_do_usuario
+
+
+@pytest.fixture(params=[False, True], ids=["direto", "escritor"])
+def app_escritor(request, criar_app):
+    return criar_app(SHARD_COUNT=2, ESCRITOR_UNICO=request.param)
+
+
+def _esperar_job(cliente, cabecalho, job_id):
+    for _ in range(200):
+        job = cliente.get(f"/api/jobs/{job_id}", headers=cabecalho).get_json()
+        if job["status"] in ("concluido", "erro"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} não terminou: {job}")
+
+
+def test_escritas_das_rotas_passam_pelo_escritor(app_escritor):
+    cliente = app_escritor.test_client()
+
+    cadastro = cliente.post(
+        "/api/auth/cadastro",
+        json={"nome": "Ana", "telefone": "11999990000", "senha": "segredo", "peso_inicial": 95},
+    )
+    assert cadastro.status_code == 201, cadastro.get_json()
+    uid = cadastro.get_json()["user"]["id"]
+    cabecalho = {"Authorization": f"Bearer {cadastro.get_json()['access_token']}"}
+
+    atualizado = cliente.put("/api/user/update", json={"altura": 1.81, "idade": 41}, headers=cabecalho)
+    assert atualizado.get_json()["user"]["altura"] == 1.81
+
+    # Reconstrução preguiçosa da tendência após invalidar
+    with app_escritor.app_context(), shard_do_usuario(uid):
+        tendencia.invalidar(uid)
+        db.session.commit()
+    assert cliente.get("/api/metas/tendencia", headers=cabecalho).status_code == 200
+
+    ontem = date.today() - timedelta(days=1)
+    job = cliente.post(
+        "/api/jobs",
+        json={"tipo": "recalcular", "parametros": {"de": ontem.isoformat()}},
+        headers=cabecalho,
+    )
+    assert job.status_code == 202, job.get_json()
+    assert _esperar_job(cliente, cabecalho, job.get_json()["id"])["status"] == "concluido"
+
+    with app_escritor.app_context():
+        assert db.session.get(User, uid).idade == 41
+        with shard_do_usuario(uid):
+            assert db.session.get(TendenciaPeso, uid).n == 1
+            assert ConsumoCalorico.query.filter_by(user_id=uid).count() == 2
+
+    escritor = app_escritor.extensions["escritor"]
+    if escritor is not None:
+        assert escritor.operacoes >= 6
+
+
+def test_escrita_aninhada_no_escritor_nao_trava(criar_app, criar_usuarios):
+    app = criar_app(ESCRITOR_UNICO=True, ESCRITOR_ESPERA_SEGUNDOS=5)
+
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+
+        def alterar_idade():
+            db.session.get(User, uid).idade = 50
+
+        def externa():
+            executar_escrita(uid, alterar_idade)
+            return "ok"
+
+        assert executar_escrita(uid, externa) == "ok"
+        db.session.expire_all()
+        assert db.session.get(User, uid).idade == 50
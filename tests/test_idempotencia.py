@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import CaloriasExtras
+from app.sharding import shard_do_usuario
+
+ROTA = "/api/calorias-extras/registrar"
+
+
+@pytest.fixture
+def usuarios(app, criar_usuarios):
+    with app.app_context():
+        uids = criar_usuarios(2)
+        return [(uid, {"Authorization": f"Bearer {create_access_token(identity=str(uid))}"}) for uid in uids]
+
+
+def _registros(app, uid):
+    with app.app_context(), shard_do_usuario(uid):
+        return db.session.query(CaloriasExtras).filter_by(user_id=uid).count()
+
+
+def test_repeticao_devolve_a_primeira_resposta(app, usuarios):
+    (uid, cabecalho), (outro_uid, outro_cabecalho) = usuarios
+    cliente = app.test_client()
+    com_chave = dict(cabecalho, **{"Idempotency-Key": "extra-1"})
+
+    primeira = cliente.post(ROTA, json={"calorias": 300}, headers=com_chave)
+    repetida = cliente.post(ROTA, json={"calorias": 300}, headers=com_chave)
+
+    assert primeira.status_code == repetida.status_code == 201
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in primeira.headers
+    assert repetida.get_data() == primeira.get_data()
+    assert _registros(app, uid) == 1
+
+    # Mesma chave, outro corpo
+    assert cliente.post(ROTA, json={"calorias": 301}, headers=com_chave).status_code == 422
+
+    # Chaves são por usuário; sem chave, cada POST executa
+    outro = cliente.post(ROTA, json={"calorias": 300}, headers=dict(outro_cabecalho, **{"Idempotency-Key": "extra-1"}))
+    assert outro.status_code == 201 and "Idempotent-Replayed" not in outro.headers
+    cliente.post(ROTA, json={"calorias": 300}, headers=cabecalho)
+    assert _registros(app, uid) == 2
+    assert _registros(app, outro_uid) == 1
+
+
+def test_repeticoes_concorrentes_executam_uma_vez(app, usuarios):
+    (uid, cabecalho), _ = usuarios
+    com_chave = dict(cabecalho, **{"Idempotency-Key": "extra-concorrente"})
+
+    def enviar(_):
+        resposta = app.test_client().post(ROTA, json={"calorias": 150}, headers=com_chave)
+        return resposta.status_code, resposta.get_json()["caloria_extra"]["id"]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        respostas = list(pool.map(enviar, range(8)))
+
+    assert {status for status, _ in respostas} == {201}
+    assert len({id_ for _, id_ in respostas}) == 1
+    assert _registros(app, uid) == 1
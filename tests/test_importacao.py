@@ -0,0 +1,129 @@
+import json
+from datetime import date
+
+import pytest
+
+from app import db, dia, importacao
+from app.models import CaloriasExtras, ConsumoCalorico, ProgressoImportacao, RankingDeficit, User
+from app.routes.calculos import calcular_balanco, gravar_balanco
+from app.sharding import shard_do_usuario
+
+
+def _telefones(uids):
+    return [db.session.get(User, uid).telefone for uid in uids]
+
+
+def test_retomada_cobre_usuarios_dos_lotes_anteriores(app, criar_usuarios, tmp_path, monkeypatch):
+    with app.app_context():
+        uids = criar_usuarios(3)
+        telefones = _telefones(uids)
+
+    caminho = tmp_path / "pesos.csv"
+    caminho.write_text(
+        "telefone,peso_atual,peso_meta,data_registro\n"
+        + "".join(f"{tel},{90 - i},80,2026-03-0{i + 1}\n" for i, tel in enumerate(telefones)),
+        encoding="utf-8",
+    )
+    argumentos = ["import-history", str(caminho), "--tipo", "meta", "--chunk", "1"]
+
+    processados = []
+    monkeypatch.setattr(importacao, "pos_importacao", lambda tipo, ids: processados.append(set(ids)))
+
+    # Primeira execução cai no segundo lote, depois de gravar o primeiro
+    gravar_lote = importacao.gravar_lote
+    chamadas = []
+
+    def gravar_e_cair(*args, **kwargs):
+        chamadas.append(1)
+        if len(chamadas) == 2:
+            raise RuntimeError("queda simulada")
+        gravar_lote(*args, **kwargs)
+
+    monkeypatch.setattr(importacao, "gravar_lote", gravar_e_cair)
+    resultado = app.test_cli_runner().invoke(args=argumentos)
+    assert isinstance(resultado.exception, RuntimeError)
+    assert processados == []
+
+    monkeypatch.setattr(importacao, "gravar_lote", gravar_lote)
+    resultado = app.test_cli_runner().invoke(args=argumentos)
+    assert resultado.exit_code == 0, resultado.output
+    assert "Retomando" in resultado.output
+
+    assert processados == [set(uids)]
+    estado = json.loads((tmp_path / "pesos.csv.offset").read_text(encoding="utf-8"))
+    assert estado["inseridas"] == 3
+    assert estado["afetados"] == {}
+
+
+@pytest.mark.parametrize("shards", [1, 2])
+def test_queda_antes_do_offset_nao_duplica(criar_app, criar_usuarios, tmp_path, monkeypatch, shards):
+    app = criar_app(SHARD_COUNT=shards)
+    with app.app_context():
+        uids = criar_usuarios(4)
+        telefones = _telefones(uids)
+
+    caminho = tmp_path / "extras.csv"
+    linhas = [f"{tel},{100 + i},2026-03-0{i + 1}\n" for i, tel in enumerate(telefones)]
+    linhas.insert(2, "11000000999,50,2026-03-01\n")
+    caminho.write_text("telefone,calorias,data\n" + "".join(linhas), encoding="utf-8")
+    argumentos = ["import-history", str(caminho), "--tipo", "extra", "--chunk", "2"]
+
+    # Segundo lote (com a linha rejeitada) gravado, mas a execução cai antes do .offset
+    salvar_estado = importacao.salvar_estado
+    chamadas = []
+
+    def salvar_e_cair(*args):
+        chamadas.append(1)
+        if len(chamadas) == 2:
+            raise RuntimeError("queda simulada")
+        salvar_estado(*args)
+
+    monkeypatch.setattr(importacao, "salvar_estado", salvar_e_cair)
+    resultado = app.test_cli_runner().invoke(args=argumentos)
+    assert isinstance(resultado.exception, RuntimeError)
+
+    monkeypatch.setattr(importacao, "salvar_estado", salvar_estado)
+    resultado = app.test_cli_runner().invoke(args=argumentos)
+    assert resultado.exit_code == 0, resultado.output
+
+    with app.app_context():
+        for i, uid in enumerate(uids):
+            with shard_do_usuario(uid):
+                calorias = [c.calorias for c in CaloriasExtras.query.filter_by(user_id=uid)]
+            assert calorias == [100 + i]
+        with shard_do_usuario(uids[0]):
+            assert ProgressoImportacao.query.count() == 0
+
+    rejeitadas = (tmp_path / "extras.csv.rejeitadas").read_text(encoding="utf-8").splitlines()
+    assert len(rejeitadas) == 1 and "não cadastrado" in rejeitadas[0]
+    assert json.loads((tmp_path / "extras.csv.offset").read_text(encoding="utf-8"))["inseridas"] == 4
+
+
+def test_pos_importacao_refaz_dia_e_ranking(app, criar_usuarios, tmp_path):
+    dia_calculado = date(2026, 3, 2)
+
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        (telefone,) = _telefones([uid])
+        with shard_do_usuario(uid):
+            user = db.session.get(User, uid)
+            gravar_balanco(uid, dia_calculado, calcular_balanco(uid, user, dia_calculado))
+            db.session.commit()
+            antes = db.session.get(ConsumoCalorico, 1).calorias_consumidas
+            # Documento do dia em cache antes da importação
+            assert dia.documento(uid, dia_calculado)["calorias_extras"] == []
+        deficit = RankingDeficit.query.filter_by(periodo="semana", user_id=uid).one().deficit
+
+    caminho = tmp_path / "extras.csv"
+    caminho.write_text(
+        f"telefone,calorias,data\n{telefone},400,2026-03-02\n{telefone},250,2026-03-20\n",
+        encoding="utf-8",
+    )
+    resultado = app.test_cli_runner().invoke(args=["import-history", str(caminho), "--tipo", "extra"])
+    assert resultado.exit_code == 0, resultado.output
+
+    with app.app_context():
+        with shard_do_usuario(uid):
+            assert len(dia.documento(uid, dia_calculado)["calorias_extras"]) == 1
+            assert ConsumoCalorico.query.filter_by(user_id=uid).one().calorias_consumidas == antes + 400
+        assert RankingDeficit.query.filter_by(periodo="semana", user_id=uid).one().deficit == deficit - 400
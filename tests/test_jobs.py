@@ -0,0 +1,133 @@
+import os
+import socket
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db, jobs
+from app.models import ConsumoCalorico, Job
+from app.sharding import shard_do_usuario
+
+
+def test_recalcular_recusa_intervalo_antes_do_horizonte(criar_app, criar_usuarios):
+    app = criar_app(ARQUIVO_HORIZONTE_DIAS=30)
+    hoje = date.today()
+    arquivado = hoje - timedelta(days=40)
+
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        with shard_do_usuario(uid):
+            db.session.add(ConsumoCalorico(user_id=uid, calorias_consumidas=2325, calorias_gastas=2000, data=arquivado))
+            db.session.commit()
+        token = create_access_token(identity=str(uid))
+
+        with pytest.raises(ValueError, match="arquivados"):
+            jobs.validar_recalculo({"de": arquivado.isoformat(), "ate": hoje.isoformat()})
+        assert jobs.validar_recalculo({"de": (hoje - timedelta(days=30)).isoformat()})["ate"] == hoje.isoformat()
+
+    resposta = app.test_client().post(
+        "/api/jobs",
+        json={"tipo": "recalcular", "parametros": {"de": arquivado.isoformat(), "ate": hoje.isoformat()}},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert resposta.status_code == 400
+
+    with app.app_context():
+        assert Job.query.count() == 0
+        with shard_do_usuario(uid):
+            consumo = ConsumoCalorico.query.filter_by(user_id=uid, data=arquivado).one()
+        assert consumo.calorias_consumidas == 2325
+
+
+def _job(uid, i, status="executando", processo=None, atualizado_em=None):
+    job = Job(f"job{i}", uid, "projecao", "{}")
+    job.status = status
+    job.processo = processo or jobs.processo_atual()
+    job.atualizado_em = atualizado_em or datetime.utcnow()
+    return job
+
+
+def test_recuperar_orfaos_marca_jobs_interrompidos(criar_app, criar_usuarios):
+    app = criar_app(JOBS_HEARTBEAT_SEGUNDOS=10)
+    host = socket.gethostname()
+    boot = jobs.processo_atual().rsplit(":", 1)[1]
+
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        db.session.add_all(
+            [
+                # Pid inexistente neste host
+                _job(uid, 0, processo=f"{host}:{2 ** 22 + 1}:{boot}"),
+                # Processo vivo, heartbeat em dia
+                _job(uid, 1),
+                # Outro host sem heartbeat há 2 minutos
+                _job(uid, 2, processo="outro:1:abc", atualizado_em=datetime.utcnow() - timedelta(minutes=2)),
+                _job(uid, 3, status="concluido", processo="outro:1:abc", atualizado_em=datetime(2026, 1, 1)),
+                # Mesmo pid, boot anterior (pid reaproveitado no container)
+                _job(uid, 4, status="pendente", processo=f"{host}:{os.getpid()}:anterior"),
+                # Outro host, heartbeat em dia
+                _job(uid, 5, processo="outro:1:abc"),
+            ]
+        )
+        db.session.commit()
+
+    jobs.recuperar_orfaos(app)
+
+    with app.app_context():
+        status = dict(db.session.execute(db.select(Job.id, Job.status)).all())
+        assert status == {
+            "job0": "erro",
+            "job1": "executando",
+            "job2": "erro",
+            "job3": "concluido",
+            "job4": "erro",
+            "job5": "executando",
+        }
+        assert "Interrompido" in db.session.get(Job, "job0").erro
+
+
+def test_consulta_marca_job_sem_heartbeat(criar_app, criar_usuarios):
+    app = criar_app(JOBS_HEARTBEAT_SEGUNDOS=10)
+
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        db.session.add(_job(uid, 0, processo="outro:1:abc"))
+        db.session.commit()
+        cabecalho = {"Authorization": f"Bearer {create_access_token(identity=str(uid))}"}
+
+    cliente = app.test_client()
+    assert cliente.get("/api/jobs/job0", headers=cabecalho).get_json()["status"] == "executando"
+
+    # O worker que rodava o job parou de bater
+    with app.app_context():
+        db.session.execute(
+            db.update(Job).where(Job.id == "job0").values(atualizado_em=datetime.utcnow() - timedelta(seconds=31))
+        )
+        db.session.commit()
+
+    job = cliente.get("/api/jobs/job0", headers=cabecalho).get_json()
+    assert job["status"] == "erro" and "Interrompido" in job["erro"]
+    assert cliente.get("/api/jobs", headers=cabecalho).get_json()[0]["status"] == "erro"
+
+
+def test_heartbeat_renova_jobs_ativos(criar_app, criar_usuarios):
+    app = criar_app(JOBS_HEARTBEAT_SEGUNDOS=0.05)
+    executor = app.extensions["jobs"]
+
+    with app.app_context():
+        (uid,) = criar_usuarios(1)
+        antigo = datetime.utcnow() - timedelta(minutes=5)
+        db.session.add(_job(uid, 0, atualizado_em=antigo))
+        db.session.commit()
+
+        executor.ativos.add("job0")
+        executor.pool()
+        for _ in range(100):
+            db.session.expire_all()
+            if db.session.get(Job, "job0").atualizado_em > antigo:
+                break
+            time.sleep(0.02)
+        executor.ativos.discard("job0")
+        assert db.session.get(Job, "job0").atualizado_em > antigo
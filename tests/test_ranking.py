@@ -0,0 +1,123 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+import sqlalchemy as sa
+from flask_jwt_extended import create_access_token
+
+from app import db, ranking
+from app.models import RankingDeficit
+from app.routes.calculos import gravar_balanco
+from app.sharding import shard_do_usuario
+
+SEGUNDA = date(2026, 3, 2)
+
+
+def _gravar(uid, dia, consumidas, gastas):
+    with shard_do_usuario(uid):
+        gravar_balanco(
+            uid,
+            dia,
+            {
+                "total_consumido": consumidas,
+                "total_gasto": gastas,
+                "metabolismo_basal": 0,
+                "gasto_profissional": 0,
+            },
+        )
+        db.session.commit()
+
+
+def _rank_esperado(periodo, inicio):
+    linhas = RankingDeficit.query.filter_by(periodo=periodo, inicio=inicio).all()
+    return {
+        linha.user_id: 1 + sum(1 for outra in linhas if outra.deficit > linha.deficit)
+        for linha in linhas
+    }
+
+
+def _posicoes(periodo, inicio):
+    return {
+        linha.user_id: linha.posicao
+        for linha in RankingDeficit.query.filter_by(periodo=periodo, inicio=inicio)
+    }
+
+
+@pytest.fixture
+def escritas_no_banco():
+    """Lista das instruções de escrita enviadas a qualquer engine."""
+    escritas = []
+
+    def ouvir(conn, cursor, instrucao, parametros, contexto, executemany):
+        if instrucao.lstrip().split()[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            escritas.append(instrucao)
+
+    sa.event.listen(sa.engine.Engine, "before_cursor_execute", ouvir)
+    yield escritas
+    sa.event.remove(sa.engine.Engine, "before_cursor_execute", ouvir)
+
+
+def test_posicoes_incrementais_iguais_ao_rank(criar_app, criar_usuarios):
+    app = criar_app(SHARD_COUNT=2)
+    rnd = random.Random(7)
+
+    with app.app_context():
+        uids = criar_usuarios(12)
+
+        # Valores pequenos forçam empates; o mesmo usuário sobe e desce
+        for _ in range(60):
+            uid = rnd.choice(uids)
+            dia = SEGUNDA + timedelta(days=rnd.randint(0, 6))
+            _gravar(uid, dia, rnd.choice([1500, 1800, 2000]), rnd.choice([1800, 2000, 2300]))
+
+            for periodo in ranking.PERIODOS:
+                inicio, _ = ranking.intervalo(periodo, SEGUNDA)
+                assert _posicoes(periodo, inicio) == _rank_esperado(periodo, inicio)
+
+        # A carga completa chega ao mesmo resultado
+        inicio, _ = ranking.intervalo("semana", SEGUNDA)
+        incremental = _posicoes("semana", inicio)
+        ranking.materializar("semana", inicio)
+        db.session.commit()
+        assert _posicoes("semana", inicio) == incremental
+
+
+def test_get_do_ranking_nao_escreve(criar_app, criar_usuarios, escritas_no_banco):
+    app = criar_app(SHARD_COUNT=2)
+
+    with app.app_context():
+        uids = criar_usuarios(3)
+        for uid, consumidas in zip(uids, (1500, 2500, 1500)):
+            _gravar(uid, SEGUNDA, consumidas, 2000)
+
+        # Mês anterior: só ConsumoCalorico, período nunca materializado
+        anterior = SEGUNDA - timedelta(days=5)
+        for uid, consumidas in zip(uids, (1000, 1900, 2500)):
+            _gravar(uid, anterior, consumidas, 2000)
+        RankingDeficit.query.filter(RankingDeficit.inicio < SEGUNDA.replace(day=1)).delete()
+        ranking.RankingPeriodo.query.filter(ranking.RankingPeriodo.inicio < SEGUNDA.replace(day=1)).delete()
+        db.session.commit()
+
+        token = create_access_token(identity=str(uids[0]))
+
+    cliente = app.test_client()
+    cabecalho = {"Authorization": f"Bearer {token}"}
+    escritas_no_banco.clear()
+
+    semana = cliente.get(f"/api/ranking/?data={SEGUNDA.isoformat()}", headers=cabecalho).get_json()
+    mes = cliente.get(
+        f"/api/ranking/?periodo=mes&data={anterior.isoformat()}", headers=cabecalho
+    ).get_json()
+
+    assert escritas_no_banco == []
+    assert [(r["user_id"], r["posicao"]) for r in semana["ranking"]] == [
+        (uids[0], 1),
+        (uids[2], 1),
+        (uids[1], 3),
+    ]
+    assert [(r["user_id"], r["posicao"], r["deficit"]) for r in mes["ranking"]] == [
+        (uids[0], 1, 1000),
+        (uids[1], 2, 100),
+        (uids[2], 3, -500),
+    ]
+    assert mes["total_participantes"] == 3
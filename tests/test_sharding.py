@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app import db, tendencia
+from app.models import AderenciaAnual, CaloriasExtras, MetaPeso
+from app.sharding import (
+    colunas_para_mover,
+    engine_do_shard,
+    mover_usuario,
+    shard_do_usuario,
+    shard_por_hash,
+    tabelas_por_usuario,
+)
+
+
+def _popular(user_id):
+    """Linhas em tabelas com chave substituta e com chave natural."""
+    with shard_do_usuario(user_id):
+        inicio = datetime(2024, 1, 1)
+        for d in range(3):
+            meta = MetaPeso(user_id=user_id, peso_atual=100 - user_id - d, peso_meta=80)
+            meta.data_registro = inicio + timedelta(days=d)
+            db.session.add(meta)
+        db.session.add(CaloriasExtras(user_id=user_id, descricao=f"u{user_id}", calorias=user_id))
+        db.session.add(AderenciaAnual(user_id=user_id, ano=2024, bits=bytes([user_id]) * 276))
+        db.session.flush()
+        tendencia.reconstruir(user_id)
+        db.session.commit()
+
+
+def _retrato(engine, user_id):
+    """Linhas do usuário por tabela, sem as chaves substitutas."""
+    retrato = {}
+    with engine.connect() as conn:
+        for tabela in tabelas_por_usuario(db.metadata):
+            colunas = colunas_para_mover(tabela)
+            linhas = conn.execute(sa.select(*colunas).where(tabela.c.user_id == user_id))
+            retrato[tabela.name] = sorted(tuple(r) for r in linhas)
+    return retrato
+
+
+def test_mover_usuario_preserva_chaves_naturais(criar_app, criar_usuarios):
+    app = criar_app(SHARD_COUNT=2)
+    with app.app_context():
+        user_ids = criar_usuarios(8)
+        for uid in user_ids:
+            _popular(uid)
+
+        no_shard = {n: [u for u in user_ids if shard_por_hash(u, 2) == n] for n in (0, 1)}
+        assert no_shard[0] and no_shard[1]
+        alvo = no_shard[0][-1]
+
+        antes = {uid: _retrato(engine_do_shard(db, shard_por_hash(uid, 2)), uid) for uid in user_ids}
+        assert antes[alvo]["tendencia_peso"] and antes[alvo]["aderencia_anual"]
+
+        # Destino já tem tendência/aderência de outros usuários
+        mover_usuario(db, alvo, 0, 1)
+
+        assert _retrato(engine_do_shard(db, 1), alvo) == antes[alvo]
+        assert not any(_retrato(engine_do_shard(db, 0), alvo).values())
+        for uid in user_ids:
+            if uid != alvo:
+                assert _retrato(engine_do_shard(db, shard_por_hash(uid, 2)), uid) == antes[uid]
+
+        # A sessão passa a rotear pelo diretório
+        with shard_do_usuario(alvo) as shard:
+            assert shard == 1
+            assert tendencia.obter(alvo).n == 3
+            assert db.session.get(AderenciaAnual, (alvo, 2024)).bits == bytes([alvo]) * 276
+
+        # Ida e volta
+        mover_usuario(db, alvo, 1, 0)
+        assert _retrato(engine_do_shard(db, 0), alvo) == antes[alvo]
+        assert not any(_retrato(engine_do_shard(db, 1), alvo).values())
+
+
+def test_todas_as_tabelas_por_usuario_declaram_modo_do_mover(app):
+    with app.app_context():
+        for tabela in tabelas_por_usuario(db.metadata):
+            colunas = {c.name for c in colunas_para_mover(tabela)}
+            assert "user_id" in colunas, tabela.name
+
+
+@pytest.mark.parametrize(
+    "info, chave",
+    [
+        ({"por_usuario": True}, "id"),  # sem declaração
+        ({"por_usuario": True, "mover": "id"}, "user_id"),  # chave natural declarada como id
+        ({"por_usuario": True, "mover": "natural"}, "id"),  # natural sem user_id na chave
+    ],
+)
+def test_mover_recusa_tabela_sem_modo_valido(info, chave):
+    colunas = [sa.Column("user_id", sa.Integer, primary_key=chave == "user_id")]
+    if chave == "id":
+        colunas.insert(0, sa.Column("id", sa.Integer, primary_key=True))
+    tabela = sa.Table("nova", sa.MetaData(), *colunas, info=info)
+
+    with pytest.raises(RuntimeError, match="nova"):
+        colunas_para_mover(tabela)
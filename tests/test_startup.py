@@ -0,0 +1,41 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from app import em_contexto_cli
+
+
+def test_primeiras_requisicoes_concorrentes(app, monkeypatch):
+    registros = []
+    info = app.logger.info
+
+    def info_lento(mensagem, *args, **kwargs):
+        # Alarga a janela entre a medição e o fim do hook
+        time.sleep(0.01)
+        registros.append(mensagem)
+        info(mensagem, *args, **kwargs)
+
+    monkeypatch.setattr(app.logger, "info", info_lento)
+    largada = threading.Barrier(8)
+
+    def pedir(_):
+        largada.wait()
+        return app.test_client().get("/api/user/me").status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        status = list(pool.map(pedir, range(8)))
+
+    assert status == [401] * 8
+    assert len([r for r in registros if "primeira requisição" in r]) == 1
+    assert "primeira_requisicao_ms" in app.extensions["startup"]
+
+
+def test_flask_run_conta_como_servidor():
+    assert not em_contexto_cli()
+    with click.Context(click.Command("run"), info_name="run"):
+        assert not em_contexto_cli()
+    for comando in ("shell", "db", "import-history"):
+        with click.Context(click.Command(comando), info_name=comando):
+            assert em_contexto_cli()